@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""bsolve.py: Batch multi year solution wrapper openCEM"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+
+import argparse
+import datetime
+import os
+import time
+
+from cemo.batch import BatchRun, collect_cfgfiles
+
+# start the clock on the run
+start_time = time.time()
+
+# create parser object
+parser = argparse.ArgumentParser(description="openCEM batch multiyear model solver")
+
+parser.add_argument(
+    "configs",
+    help="Configuration files, directories containing them or glob patterns (e.g. 'runs/*.cfg')",
+    nargs="+",
+    metavar="CONFIG",
+)
+parser.add_argument(
+    "--solver",
+    help="Specify solver used by model."
+    + " For Pyomo supported solvers installed in your system ",
+    type=str,
+    metavar="SOLVER",
+    default="cbc",
+)
+parser.add_argument(
+    "--cores",
+    help="Number of cores available to the batch, default all cores",
+    type=int,
+    default=os.cpu_count(),
+)
+parser.add_argument(
+    "--threads",
+    help="Solver threads allocated to each scenario, default 1",
+    type=int,
+    default=1,
+)
+parser.add_argument(
+    "--retries",
+    help="Number of times a failed scenario is retried before skipping it, default 1",
+    type=int,
+    default=1,
+)
+parser.add_argument(
+    "-o",
+    "--status",
+    help="Consolidated status and timing table, default batch_status.csv",
+    type=str,
+    metavar="FILE",
+    default="batch_status.csv",
+)
+parser.add_argument(
+    "--log",
+    help="Request solver logging and traceback information",
+    action="store_true",
+)
+parser.add_argument(
+    "-r",
+    "--resume",
+    help="Resume simulations from last succesfully run year",
+    action="store_true",
+)
+parser.add_argument(
+    "-c",
+    "--checkpoint",
+    help="Save checkpoints after each phase of a simulation year, retries resume from them",
+    action="store_true",
+)
+parser.add_argument(
+    "-s",
+    "--share-prefix",
+    help="Solve years shared by scenarios once, forking scenarios that differ in later years",
+    action="store_true",
+)
+parser.add_argument(
+    "-j",
+    "--json",
+    help="Store results in openCEM v1.0 JSON format",
+    action="store_true",
+)
+
+# parse arguments into args structure
+args = parser.parse_args()
+
+cfgfiles = collect_cfgfiles(args.configs)
+if not cfgfiles:
+    raise SystemExit("openCEM bsolve.py: No configuration files found")
+
+batch = BatchRun(cfgfiles,
+                 cores=args.cores,
+                 threads=args.threads,
+                 solver=args.solver,
+                 retries=args.retries,
+                 resume=args.resume,
+                 json_output=args.json,
+                 log=args.log,
+                 status=args.status,
+                 checkpoint=args.checkpoint,
+                 share_prefix=args.share_prefix)
+print("openCEM bsolve.py: Running %d scenarios, %d at a time"
+      % (len(cfgfiles), batch.workers))
+table = batch.run()
+print(table.to_string(index=False))
+print(
+    "openCEM bsolve.py: Runtime %s"
+    % str(datetime.timedelta(seconds=(time.time() - start_time)))
+)
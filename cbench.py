@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""cbench.py: Cluster count benchmark for openCEM"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+
+import argparse
+
+from cemo.benchmark import ClusterBenchmark
+from cemo.cluster import CSVCluster, InstanceCluster
+from cemo.model import CreateModel, model_options
+
+# create parser object
+parser = argparse.ArgumentParser(description="openCEM cluster count benchmark")
+
+parser.add_argument(
+    "--source",
+    help="CSV demand data used for clustering, default tests/SampleDemand.csv.gz",
+    type=str,
+    metavar="CSV",
+    default="tests/SampleDemand.csv.gz",
+)
+parser.add_argument(
+    "--template",
+    help="Year template (.dat) used for clustering and for clustered vs full year solves."
+    + " Overrides --source",
+    type=str,
+    metavar="TEMPLATE",
+)
+parser.add_argument(
+    "--max_d",
+    help="List of cluster counts to benchmark",
+    type=int,
+    nargs="+",
+    default=[3, 6, 9, 12],
+)
+parser.add_argument(
+    "--methods",
+    help="List of hierarchical clustering methods to benchmark",
+    type=str,
+    nargs="+",
+    default=["average"],
+)
+parser.add_argument(
+    "--metrics",
+    help="List of distance metrics to benchmark",
+    type=str,
+    nargs="+",
+    default=["cityblock"],
+)
+parser.add_argument(
+    "--solver",
+    help="Specify solver used by model."
+    + " For Pyomo supported solvers installed in your system ",
+    type=str,
+    metavar="SOLVER",
+    default="cbc",
+)
+parser.add_argument(
+    "--tolerance",
+    help="Accuracy tolerance used to select the fastest setting",
+    type=float,
+    default=0.05,
+)
+parser.add_argument(
+    "--measure",
+    help="Accuracy measure used to select the fastest setting",
+    type=str,
+    default="duration_rmse",
+)
+parser.add_argument(
+    "-o",
+    "--output",
+    help="Save benchmark table to CSV file",
+    type=str,
+    metavar="FILE",
+)
+parser.add_argument(
+    "--log",
+    help="Request solver logging and traceback information",
+    action="store_true",
+)
+
+# parse arguments into args structure
+args = parser.parse_args()
+
+if args.template is not None:
+    options = model_options()
+    instance = CreateModel('benchmark', options).create_model().create_instance(args.template)
+    cluster = InstanceCluster(instance, max(args.max_d))
+else:
+    options = None
+    cluster = CSVCluster(max_d=max(args.max_d), source=args.source)
+
+bench = ClusterBenchmark(cluster,
+                         max_d=args.max_d,
+                         methods=args.methods,
+                         metrics=args.metrics,
+                         template=args.template,
+                         model_options=options,
+                         solver=args.solver,
+                         log=args.log)
+table = bench.run()
+print(table.to_string())
+if args.output:
+    table.to_csv(args.output, index=False)
+print("openCEM cbench.py: Fastest setting within %s %s tolerance:" % (args.tolerance, args.measure))
+print(bench.select(args.tolerance, measure=args.measure))
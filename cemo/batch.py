@@ -0,0 +1,285 @@
+'''Batch runner for multiple openCEM scenario configuration files'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import contextlib
+import datetime
+import glob
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+
+from cemo.checkpoint import Checkpoint, fingerprint
+from cemo.multi import SolveTemplate
+
+STATUS_COLUMNS = ['config', 'status', 'attempts', 'start', 'end', 'runtime', 'error']
+
+# Scenario that a scenario forks from and the years they share
+Fork = namedtuple('Fork', ['parent', 'years'])
+
+
+def collect_cfgfiles(paths):
+    '''Return sorted list of cfg files from a list of files, directories or glob patterns'''
+    cfgfiles = set()
+    for path in paths:
+        if Path(path).is_dir():
+            cfgfiles.update(Path(path).glob('*.cfg'))
+        else:
+            cfgfiles.update(Path(p) for p in glob.glob(str(path)) if p.endswith('.cfg'))
+    return sorted(cfgfiles)
+
+
+def simulation_dir(cfgfile):
+    '''Return simulation directory of a scenario, named after its cfg file'''
+    cfgfile = Path(cfgfile)
+    return cfgfile.parent / cfgfile.stem
+
+
+def plan_prefixes(cfgfiles, solver='cbc', threads=None):
+    '''Return the Fork of each cfg file, i.e. the earlier scenario sharing the longest
+    prefix of years with it, or Fork(None, []) if it shares none.
+
+    Years are shared while their fingerprints (see SolveTemplate.year_fingerprints) match,
+    so scenarios form a tree in which each distinct prefix of years is solved once'''
+    keys = {}
+    for cfgfile in cfgfiles:
+        wrkdir = Path(tempfile.mkdtemp())
+        try:
+            sim = SolveTemplate(cfgfile, solver=solver, wrkdir=wrkdir, threads=threads)
+            keys[cfgfile] = list(zip(sim.Years, sim.year_fingerprints()))
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            # Broken scenarios share nothing, their error is reported when solved
+            keys[cfgfile] = []
+        finally:
+            shutil.rmtree(wrkdir, ignore_errors=True)
+    plan = {}
+    for idx, cfgfile in enumerate(cfgfiles):
+        plan[cfgfile] = Fork(None, [])
+        for parent in cfgfiles[:idx]:
+            shared = []
+            for key, parent_key in zip(keys[cfgfile], keys[parent]):
+                if key != parent_key:
+                    break
+                shared.append(key[0])
+            if len(shared) > len(plan[cfgfile].years):
+                plan[cfgfile] = Fork(parent, shared)
+    return plan
+
+
+def input_fingerprint(cfgfile):
+    '''Return fingerprint of the input files of a scenario as recorded in its checkpoints,
+    None if the scenario cannot be read'''
+    wrkdir = Path(tempfile.mkdtemp())
+    try:
+        return fingerprint(SolveTemplate(cfgfile, wrkdir=wrkdir).input_files())
+    except (Exception, SystemExit):  # pylint: disable=broad-except
+        return None
+    finally:
+        shutil.rmtree(wrkdir, ignore_errors=True)
+
+
+def shared_years_saved(fork, inputs):
+    '''True if the parent of a Fork has checkpointed the output of the last year it shares,
+    so the shared years can be copied while it solves the remaining ones'''
+    return inputs is not None and Checkpoint(simulation_dir(fork.parent), fork.years[-1],
+                                             inputs).done('output')
+
+
+def fork_scenario(parent_dir, sim_dir, shared, years, keep=False):
+    '''Copy results and carry forward state of shared years from a parent simulation directory.
+
+    Checkpoints and results of the remaining years are removed unless keep (i.e. resuming),
+    so that they are solved again'''
+    sim_dir.mkdir(exist_ok=True)
+    for y in years:
+        if not keep:
+            Checkpoint(sim_dir, y, None).clear()
+        for name in [str(y), str(y) + '.json', str(y) + '.json.idx',
+                     'carry_forward' + str(y) + '.pkl']:
+            if y in shared:
+                if (parent_dir / name).exists() and not (keep and (sim_dir / name).exists()):
+                    _copy(parent_dir / name, sim_dir / name)
+            elif not keep:
+                _remove(sim_dir / name)
+    if list(shared) == list(years):
+        # Nothing left to solve, summaries of the parent are those of all years
+        for name in ['cdeu.csv', 'cost.csv']:
+            if (parent_dir / name).exists():
+                _copy(parent_dir / name, sim_dir / name)
+
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(str(path))
+    elif path.exists():
+        path.unlink()
+
+
+def _copy(src, dst):
+    _remove(dst)
+    if src.is_dir():
+        shutil.copytree(str(src), str(dst))
+    else:
+        shutil.copy2(str(src), str(dst))
+
+
+def run_scenario(cfgfile, solver='cbc', threads=None, resume=False, json_output=False,
+                 log=False, checkpoint=False, fork=None):
+    '''Solve a scenario in its own simulation directory and return its status.
+
+    With a Fork, the results of shared years are copied from the parent scenario
+    and the simulation resumes from them.
+    Python output is written to batch.log in the simulation directory.
+    Failures are reported in the status instead of raised'''
+    cfgfile = Path(cfgfile)
+    start = time.time()
+    row = {'config': str(cfgfile),
+           'start': datetime.datetime.fromtimestamp(start).isoformat(timespec='seconds')}
+    sim_dir = simulation_dir(cfgfile)
+    try:
+        sim_dir.mkdir(exist_ok=True)
+        with open(sim_dir / 'batch.log', 'a') as out, contextlib.redirect_stdout(out):
+            sim = SolveTemplate(cfgfile,
+                                solver=solver,
+                                log=log,
+                                wrkdir=sim_dir,
+                                resume=resume,
+                                json_output=json_output,
+                                threads=threads,
+                                checkpoint=checkpoint)
+            if fork is not None:
+                print("openCEM batch: Years %s shared with %s" % (fork.years, fork.parent))
+                fork_scenario(simulation_dir(fork.parent), sim_dir, fork.years, sim.Years,
+                              keep=resume)
+                sim.resume = True
+            sim.solve()
+        row.update({'status': 'ok', 'error': ''})
+    except (Exception, SystemExit) as exc:  # pylint: disable=broad-except
+        row.update({'status': 'failed',
+                    'error': ''.join(traceback.format_exception_only(type(exc), exc)).strip()})
+    row['end'] = datetime.datetime.now().isoformat(timespec='seconds')
+    row['runtime'] = time.time() - start
+    return row
+
+
+class BatchRun:
+    '''Run a batch of scenarios on a process pool sized to a core budget.
+
+    Each scenario solver uses threads cores, so the pool runs cores // threads
+    scenarios at a time. Failed scenarios are retried up to retries times and then
+    skipped. With checkpoint, retries resume from the last completed phase.
+    With share_prefix, scenarios sharing their first years with an earlier scenario
+    fork from its results (see plan_prefixes). They start once it has saved the shared
+    years if checkpoints are on (polling every POLL seconds), otherwise once it finishes.
+    The status of each scenario is written to a CSV table as they finish.
+    Scenarios share the same template and data sources on disk'''
+
+    # Seconds between checks of whether scenarios waiting for a parent can start
+    POLL = 10
+
+    def __init__(self,
+                 cfgfiles,
+                 cores=None,
+                 threads=1,
+                 solver='cbc',
+                 retries=1,
+                 resume=False,
+                 json_output=False,
+                 log=False,
+                 status='batch_status.csv',
+                 checkpoint=False,
+                 share_prefix=False):
+        self.cfgfiles = [Path(c) for c in cfgfiles]
+        self.cores = os.cpu_count() if cores is None else cores
+        self.threads = threads
+        self.workers = max(1, self.cores // self.threads)
+        self.solver = solver
+        self.retries = retries
+        self.resume = resume
+        self.json_output = json_output
+        self.log = log
+        self.status = Path(status)
+        self.checkpoint = checkpoint
+        self.share_prefix = share_prefix
+        self.forks = {}
+        self.table = pd.DataFrame(columns=STATUS_COLUMNS)
+
+    def _submit(self, pool, cfgfile, retry=False):
+        return pool.submit(run_scenario, cfgfile,
+                           solver=self.solver,
+                           threads=self.threads,
+                           resume=self.resume or (retry and self.checkpoint),
+                           json_output=self.json_output,
+                           log=self.log,
+                           checkpoint=self.checkpoint,
+                           fork=self.forks.get(cfgfile))
+
+    def run(self):
+        '''Run all scenarios and return the consolidated status table'''
+        rows = {}
+        attempts = {cfgfile: 1 for cfgfile in self.cfgfiles}
+        if self.share_prefix:
+            plan = plan_prefixes(self.cfgfiles, self.solver, self.threads)
+            self.forks = {c: plan[c] for c in self.cfgfiles if plan[c].parent is not None}
+            for cfgfile, fork in self.forks.items():
+                print("openCEM batch: %s shares %d years with %s"
+                      % (cfgfile.name, len(fork.years), fork.parent.name))
+        # scenarios waiting for the scenario they fork from
+        waiting = dict(self.forks)
+        inputs = {}
+        if self.checkpoint:
+            for fork in waiting.values():
+                inputs[fork.parent] = input_fingerprint(fork.parent)
+                if not self.resume:
+                    # only outputs saved in this run release the scenarios forking from it
+                    Checkpoint(simulation_dir(fork.parent), fork.years[-1], None).clear()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = {self._submit(pool, c): c for c in self.cfgfiles if c not in waiting}
+            while pending:
+                done, _ = wait(pending, timeout=self.POLL if inputs else None,
+                               return_when=FIRST_COMPLETED)
+                for child in [c for c in waiting
+                              if shared_years_saved(waiting[c], inputs.get(waiting[c].parent))]:
+                    print("openCEM batch: %s saved years shared with %s"
+                          % (waiting[child].parent.name, child.name))
+                    del waiting[child]
+                    pending[self._submit(pool, child)] = child
+                for future in done:
+                    cfgfile = pending.pop(future)
+                    row = future.result()
+                    row['attempts'] = attempts[cfgfile]
+                    if row['status'] != 'ok' and attempts[cfgfile] <= self.retries:
+                        attempts[cfgfile] += 1
+                        row['status'] = 'retrying'
+                        pending[self._submit(pool, cfgfile, retry=True)] = cfgfile
+                    else:
+                        for child in [c for c in waiting if waiting[c].parent == cfgfile]:
+                            del waiting[child]
+                            if row['status'] != 'ok':
+                                # solve all years if the scenario it forks from failed
+                                del self.forks[child]
+                            pending[self._submit(pool, child)] = child
+                    rows[cfgfile] = row
+                    print("openCEM batch: %s %s (%d/%d)"
+                          % (cfgfile.name, row['status'],
+                             sum(r['status'] in ['ok', 'failed'] for r in rows.values()),
+                             len(self.cfgfiles)))
+                self._save(rows)
+        return self.table
+
+    def _save(self, rows):
+        '''Save status table in the order of the scenario list'''
+        self.table = pd.DataFrame([rows[c] for c in self.cfgfiles if c in rows],
+                                  columns=STATUS_COLUMNS)
+        self.table.to_csv(self.status, index=False)
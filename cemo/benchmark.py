@@ -0,0 +1,192 @@
+'''Benchmark suite to choose the number of clusters in openCEM simulations'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import value
+from pyomo.opt import SolverFactory
+
+from cemo.cluster import ClusterRun
+from cemo.model import CreateModel, model_options as default_model_options
+from cemo.multi import setinstancecapacity
+
+# Capacity decision variables compared between clustered and reference solves
+CAPACITY_VARS = ['gen_cap_new', 'stor_cap_new', 'hyb_cap_new', 'intercon_cap_new', 'gen_cap_ret']
+
+
+def _capacity_decisions(data):
+    '''Return capacity decisions from an ef solution or instance as {name: value} in MW'''
+    if isinstance(data, dict):
+        return {key: entry['solution'] for key, entry in data.items()
+                if key.split('[')[0] in CAPACITY_VARS}
+    out = {}
+    for var in CAPACITY_VARS:
+        for idx, val in getattr(data, var).extract_values().items():
+            out['%s[%d,%d]' % (var, idx[0], idx[1])] = val if val is not None else 0
+    return out
+
+
+def _capacity_difference(cap, ref):
+    '''Return total absolute capacity difference relative to total reference capacity decisions'''
+    keys = set(cap) | set(ref)
+    diff = sum(abs(cap.get(k, 0) - ref.get(k, 0)) for k in keys)
+    total = sum(abs(ref.get(k, 0)) for k in keys)
+    return diff / total if total > 0 else diff
+
+
+class ClusterBenchmark:
+    '''Cluster count benchmark.
+
+    Sweeps the number of clusters and the clustering method/metric of a ClusterData
+    object (e.g. CSVCluster for offline studies or InstanceCluster) and records
+    clustering wall time, peak memory and accuracy of the representative weeks
+    against the full year of data. As in simulations, stress periods (e.g. the
+    dunkelflaute and peak weeks of an InstanceCluster) are appended to each cluster set.
+    If a template is given, each setting also solves the clustered capacity problem,
+    dispatches the full year with the resulting capacity and compares objective
+    and capacity decisions against a full year reference solve.'''
+
+    def __init__(self,
+                 cluster,
+                 max_d=(3, 6, 9, 12),
+                 methods=('average',),
+                 metrics=('cityblock',),
+                 template=None,
+                 model_options=None,
+                 solver='cbc',
+                 solver_options=None,
+                 log=False):
+        self.cluster = cluster
+        self.max_d = list(max_d)
+        self.methods = list(methods)
+        self.metrics = list(metrics)
+        self.template = template
+        self.model_options = default_model_options() if model_options is None else model_options
+        self.solver = solver
+        self.solver_options = solver_options
+        self.log = log
+        self.reference = None
+        self.table = None
+
+    def _create_instance(self):
+        model = CreateModel('benchmark', self.model_options).create_model()
+        return model.create_instance(self.template)
+
+    def reference_solve(self):
+        '''Solve full year capacity and dispatch instance used as reference'''
+        inst = self._create_instance()
+        opt = SolverFactory(self.solver)
+        start = time.time()
+        opt.solve(inst, tee=self.log, keepfiles=False)
+        self.reference = {
+            'time': time.time() - start,
+            'objective': value(inst.Obj),
+            'capacity': _capacity_decisions(inst),
+        }
+        return self.reference
+
+    def accuracy(self):
+        '''Measure how well the current clusters represent the full year of data.
+
+        Returns within cluster error, relative error in total energy and peak demand,
+        and the relative RMS error of the weighted duration curve of the representative
+        weeks (including appended stress periods) against the duration curve of all weeks'''
+        clus = self.cluster
+        X = clus.X[:, :clus.nplen]
+        full = X.reshape(clus.periods, len(clus.regions), clus.plen).sum(axis=1)
+        rep = np.vstack([clus.observation(date).reshape(len(clus.regions), clus.plen).sum(axis=0)
+                         for date in clus.Xcluster['date']])
+        # number of periods each representative stands for
+        members = np.round(clus.Xcluster['weight'].values * clus.periods).astype(int)
+        synth = np.repeat(rep, members, axis=0)
+        full_curve = np.sort(full.ravel())[::-1]
+        synth_curve = np.sort(synth.ravel())[::-1]
+        scale = np.abs(full_curve).mean()
+        return {
+            'within_error': clus.cluster_error(),
+            'energy_error': abs(synth.sum() - full.sum()) / abs(full.sum()),
+            'peak_error': abs(rep.max() - full.max()) / abs(full.max()),
+            'duration_rmse': np.sqrt(((synth_curve - full_curve)**2).mean()) / scale,
+        }
+
+    def _cluster_solve(self):
+        '''Solve capacity on clusters, dispatch full year and compare with reference'''
+        if self.reference is None:
+            self.reference_solve()
+        start = time.time()
+        ccap = ClusterRun(self.cluster,
+                          self.template,
+                          model_options=self.model_options,
+                          solver=self.solver,
+                          solver_options=self.solver_options,
+                          log=self.log).run_cluster()
+        cluster_time = time.time() - start
+        inst = setinstancecapacity(self._create_instance(), ccap.data)
+        SolverFactory(self.solver).solve(inst, tee=self.log, keepfiles=False)
+        objective = value(inst.Obj)
+        reference = self.reference['objective']
+        return {
+            'cluster_time': cluster_time,
+            'objective': objective,
+            'objective_gap': (objective - reference) / reference,
+            'capacity_diff': _capacity_difference(_capacity_decisions(ccap.data),
+                                                  self.reference['capacity']),
+        }
+
+    def run(self):
+        '''Run benchmark for every combination of max_d, method and metric'''
+        rows = []
+        for method in self.methods:
+            for metric in self.metrics:
+                for max_d in self.max_d:
+                    if self.log:
+                        print("openCEM benchmark: %s clusters, %s method, %s metric"
+                              % (max_d, method, metric))
+                    tracemalloc.start()
+                    start = time.time()
+                    self.cluster.clusterset(max_d, method=method, metric=metric)
+                    self.cluster.append_stress_periods()
+                    elapsed = time.time() - start
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    row = {'max_d': max_d,
+                           'method': method,
+                           'metric': metric,
+                           'time': elapsed,
+                           'peak_mem': peak / 2**20}
+                    row.update(self.accuracy())
+                    if self.template is not None:
+                        row.update(self._cluster_solve())
+                    rows.append(row)
+        self.table = pd.DataFrame(rows)
+        return self.table
+
+    def plot_data(self, measure='duration_rmse'):
+        '''Return accuracy measure and run time per max_d for each method/metric pair'''
+        if self.table is None:
+            self.run()
+        timing = 'cluster_time' if 'cluster_time' in self.table else 'time'
+        return self.table.pivot_table(index='max_d',
+                                      columns=['method', 'metric'],
+                                      values=[measure, timing])
+
+    def select(self, tolerance, measure='duration_rmse'):
+        '''Return fastest setting whose accuracy measure is within tolerance.
+
+        Returns None if no setting meets the tolerance'''
+        if self.table is None:
+            self.run()
+        candidates = self.table[self.table[measure].abs() <= tolerance]
+        if candidates.empty:
+            return None
+        # Without cluster solves, fewer clusters is the proxy for a faster solve
+        order = ['cluster_time', 'max_d'] if 'cluster_time' in self.table else ['max_d', 'time']
+        return candidates.sort_values(by=order).iloc[0]
@@ -0,0 +1,151 @@
+'''Capacity and costs carried forward between investment periods of openCEM simulations'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import json
+import os
+import pickle
+from collections import namedtuple
+
+from pyomo.environ import value
+
+from cemo.rules import (cost_build_per_zone_exo, cost_build_per_zone_model,
+                        cost_trans_build_per_zone_exo,
+                        cost_trans_build_per_zone_model)
+
+# Parameters of the next investment period and the variables they are carried from
+CARRY_FORWARD_CAP = [('gen_cap_initial', 'gen_cap_op'),
+                     ('stor_cap_initial', 'stor_cap_op'),
+                     ('hyb_cap_initial', 'hyb_cap_op'),
+                     ('intercon_cap_initial', 'intercon_cap_op')]
+
+
+# Constraints defining operating capacity from initial capacity and capacity decisions
+CAPACITY_CONSTRAINTS = [('con_gen_cap', 'gen_cap_op'),
+                        ('con_stor_cap', 'stor_cap_op'),
+                        ('con_hyb_cap', 'hyb_cap_op'),
+                        ('con_intercon_cap', 'intercon_cap_op')]
+
+
+def carry_value(val, scale=1):
+    '''Return value to carry forward, catching small negatives due to solver tolerance'''
+    return 0 if -1e-6 < val < 0 else scale * val
+
+
+class CarryForward(namedtuple('CarryForward', ['year',
+                                               'gen_cap_initial',
+                                               'stor_cap_initial',
+                                               'hyb_cap_initial',
+                                               'intercon_cap_initial',
+                                               'cost_cap_carry_forward_sim'])):
+    '''Operating capacity and annualised capital costs at the end of an investment period.
+
+    Each parameter is a dictionary of values keyed by model index, used to initialise
+    the instance of the next investment period without JSON files or data commands'''
+    __slots__ = ()
+
+    @classmethod
+    def from_instance(cls, inst, year):
+        '''Return carry forward state of a solved instance for year'''
+        state = {param: {i: carry_value(getattr(inst, var)[i].value, 1e-3)
+                         for i in getattr(inst, var).keys()}
+                 for param, var in CARRY_FORWARD_CAP}
+        state['cost_cap_carry_forward_sim'] = {
+            zone: value(cost_build_per_zone_model(inst, zone)
+                        + cost_build_per_zone_exo(inst, zone)
+                        + cost_trans_build_per_zone_model(inst, zone)
+                        + cost_trans_build_per_zone_exo(inst, zone)
+                        + inst.cost_cap_carry_forward_sim[zone])
+            for zone in inst.zones}
+        return cls(year=year, **state)
+
+    @classmethod
+    def from_json(cls, filename, year):
+        '''Return carry forward state of year from a gen_cap_op{year}.json file, as saved
+        by simulations before carry forward state was pickled'''
+        with open(filename) as f:
+            data = json.load(f)
+        state = {name: {tuple(entry['index']) if isinstance(entry['index'], list)
+                        else entry['index']: entry['value'] for entry in data[name]}
+                 for name in cls._fields[1:]}
+        return cls(year=year, **state)
+
+    def params(self):
+        '''Return dictionary of parameter names and values'''
+        return {name: getattr(self, name) for name in self._fields[1:]}
+
+    def difference(self, other):
+        '''Return largest difference relative to values of other (at least 1) of any parameter'''
+        diff = 0
+        for name, values in self.params().items():
+            others = getattr(other, name)
+            for idx in set(values) | set(others):
+                val, oval = values.get(idx, 0), others.get(idx, 0)
+                diff = max(diff, abs(val - oval) / max(1, abs(oval)))
+        return diff
+
+    def update(self, data):
+        '''Set carried forward parameters in a DataPortal'''
+        for name, values in self.params().items():
+            data[name] = dict(values)
+        return data
+
+    def data_commands(self):
+        '''Return carried forward parameters as data commands, e.g. for cluster runs'''
+        out = "\n# Carried forward from %s\n" % self.year
+        for name, values in self.params().items():
+            if not values:
+                continue
+            out += "param %s :=\n" % name
+            for idx, val in values.items():
+                if not isinstance(idx, tuple):
+                    idx = (idx,)
+                out += " ".join(str(i) for i in idx) + " %r\n" % val
+            out += ";\n"
+        return out
+
+    def dump(self, filename):
+        '''Save carry forward state to file to resume simulations'''
+        tmp = str(filename) + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, str(filename))
+
+    @staticmethod
+    def load(filename):
+        '''Load carry forward state saved with dump'''
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+
+def predict_capacity(inst):
+    '''Set values of capacity variables of an instance whose capacity decisions are fixed
+    (e.g. by a cluster solution) before it is solved.
+
+    Capacity decisions take the value of their fixed bounds and operating capacities are
+    solved from the capacity constraints, which are linear in operating capacity'''
+    for var in [inst.gen_cap_new, inst.gen_cap_ret, inst.stor_cap_new,
+                inst.hyb_cap_new, inst.intercon_cap_new]:
+        for idx in var:
+            if var[idx].lb is not None and var[idx].lb == var[idx].ub:
+                var[idx].value = var[idx].lb
+            elif var[idx].value is None:
+                var[idx].value = 0
+    for con, var in CAPACITY_CONSTRAINTS:
+        con, var = getattr(inst, con), getattr(inst, var)
+        for idx in con:
+            var[idx].value = 0
+            body = value(con[idx].body)
+            var[idx].value = 1
+            slope = value(con[idx].body) - body
+            var[idx].value = (value(con[idx].upper) - body) / slope
+
+
+def predict_carry_forward(inst, year):
+    '''Return carry forward state predicted from an instance with fixed capacity decisions'''
+    predict_capacity(inst)
+    return CarryForward.from_instance(inst, year)
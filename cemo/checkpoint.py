@@ -0,0 +1,105 @@
+'''Checkpoints of the phases of a simulation year to resume openCEM simulations'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+# Phases of a simulation year in the order they are completed
+PHASES = ['template', 'instance', 'cluster', 'dispatch', 'output']
+
+
+def fingerprint(files):
+    '''Return sha256 digest of the name and contents of a list of files'''
+    digest = hashlib.sha256()
+    for name in files:
+        digest.update(str(name).encode())
+        try:
+            with open(name, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        except FileNotFoundError:
+            digest.update(b'missing')
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    '''Manifest of completed phases of a simulation year.
+
+    The manifest is saved as checkpoint{year}.json in the simulation directory and
+    objects needed to resume (e.g. the model instance before it is solved) in a
+    checkpoint{year} directory.
+    A manifest whose input fingerprint does not match is discarded.
+    If save is False, existing checkpoints are read but no new ones are written'''
+
+    def __init__(self, wrkdir, year, inputs, save=True):
+        self.manifest_file = Path(wrkdir) / ('checkpoint%s.json' % year)
+        self.dir = Path(wrkdir) / ('checkpoint%s' % year)
+        self.inputs = inputs
+        self.save = save
+        self.manifest = {'year': year, 'fingerprint': inputs, 'phases': {}}
+        self.stale = False
+        if self.manifest_file.exists():
+            with open(self.manifest_file) as f:
+                manifest = json.load(f)
+            if manifest['fingerprint'] == inputs:
+                self.manifest = manifest
+            else:
+                self.stale = True
+
+    @property
+    def exists(self):
+        '''True if a valid manifest exists for this year'''
+        return self.manifest_file.exists() and not self.stale
+
+    def done(self, phase):
+        '''True if phase has been completed'''
+        return phase in self.manifest['phases']
+
+    def info(self, phase):
+        '''Return information recorded with a completed phase'''
+        return self.manifest['phases'][phase]
+
+    def complete(self, phase, **info):
+        '''Record phase as completed with optional information'''
+        if not self.save:
+            return
+        self.manifest['phases'][phase] = info
+        self._write(self.manifest_file, lambda f: json.dump(self.manifest, f, indent=0), 'w')
+
+    def dump(self, name, obj):
+        '''Save object needed to resume from a later phase'''
+        if not self.save:
+            return
+        self.dir.mkdir(exist_ok=True)
+        self._write(self.dir / (name + '.pkl'),
+                    lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL), 'wb')
+
+    def load(self, name):
+        '''Load object saved with dump'''
+        with open(self.dir / (name + '.pkl'), 'rb') as f:
+            return pickle.load(f)
+
+    def clear(self):
+        '''Remove checkpoints for this year'''
+        shutil.rmtree(self.dir, ignore_errors=True)
+        if self.manifest_file.exists():
+            self.manifest_file.unlink()
+        self.manifest = {'year': self.manifest['year'], 'fingerprint': self.inputs, 'phases': {}}
+        self.stale = False
+
+    @staticmethod
+    def _write(path, writer, mode):
+        '''Write file atomically so that an interrupted write does not corrupt a checkpoint'''
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, mode) as f:
+            writer(f)
+        os.replace(str(tmp), str(path))
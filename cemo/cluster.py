@@ -9,6 +9,7 @@ __email__ = "jose.zapata@itpau.com.au"
 
 import datetime
 import json
+import os
 import shutil
 import subprocess
 import sys
@@ -19,10 +20,11 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 from scipy.cluster.hierarchy import fcluster, linkage
-from scipy.spatial.distance import pdist
+from scipy.spatial.distance import cdist, pdist
 
-from cemo.jsonify import fill_complex_param, fill_complex_mutable_param
-from cemo.const import GEN_TECH, HYB_TECH, TRACE_TECH
+from cemo.const import TRACE_TECH
+from cemo.portfolio import race_commands
+from cemo.results import Results
 
 
 def next_weekday(date, int_weekday):
@@ -43,6 +45,31 @@ def prev_weekday(date, int_weekday):
     return date - datetime.timedelta(days_behind)
 
 
+def circular_moving_average(x, width):
+    '''Centred moving average of width along the last axis of x, wrapping around its ends.
+
+    Same result as a centred boxcar rolling mean of the series padded by wrapping,
+    computed with cumulative sums'''
+    x = np.asarray(x, dtype=float)
+    n = x.shape[-1]
+    wrapped = np.take(x, np.arange(-(width // 2), n - width // 2 + width), axis=-1, mode='wrap')
+    csum = np.cumsum(wrapped, axis=-1)
+    csum = np.concatenate((np.zeros(csum.shape[:-1] + (1,)), csum), axis=-1)
+    return (csum[..., width:width + n] - csum[..., :n]) / width
+
+
+def timeseries_array(values, time):
+    '''Arrange {(key, ..., timestamp): value} into a list of keys and an array with
+    one row per key and one column per timestamp in time'''
+    tpos = {t: j for j, t in enumerate(time)}
+    keys = sorted({idx[:-1] for idx in values})
+    kpos = {key: i for i, key in enumerate(keys)}
+    out = np.zeros((len(keys), len(tpos)))
+    for idx, val in values.items():
+        out[kpos[idx[:-1]], tpos[idx[-1]]] = val
+    return keys, out
+
+
 class ClusterData:
     '''Demand clustering class.
       It takes a financial year of demand data for 1 or multiple regions and uses
@@ -53,28 +80,57 @@ class ClusterData:
       but other metrics are possible.
       Class returns the weight of each cluster (number of individuals) and the
       representative individual for the cluster. Representative individuals are
-      the closest to an average for the cluster.'''
+      the closest to an average for the cluster.
+      In adaptive mode (error_threshold or time_budget given), max_d is the upper
+      bound for the number of clusters, see adaptive_clusterset.
+      If daily is True, individuals are single days over the whole year and the
+      chronology attribute holds the cluster each day in the year belongs to.
+      If previous ClusterData is given, e.g. from the previous investment period, its
+      partition is reused when profiles are alike, see incremental_clusterset.'''
+
+    # Relative difference of normalised profiles to reuse or update a previous partition
+    MATCH_TOL = 1e-6
+    RESEMBLE_TOL = 0.05
 
     def __init__(self,
                  firstdow=4,
                  lastdow=3,
                  max_d=12,
                  regions=None,
-                 maxsynth=False):
+                 maxsynth=False,
+                 error_threshold=None,
+                 time_budget=None,
+                 period_solve_time=None,
+                 daily=False,
+                 previous=None):
         self.firstdow = firstdow  # Day of week starting period
         self.lastdow = lastdow  # Day of week ending period
         self.max_d = max_d  # Maximum number of clusters
         # NEM region tuple
         self.regions = range(1, 6) if regions is None else regions
         self.maxsynth = maxsynth
-
-        # make week pattern into a list
-        self.pdays = (self.lastdow - self.firstdow + 8) % 7
-        if self.pdays == 0:
-            self.pdays = 7
-        dq = deque(range(7), maxlen=7)
-        dq.rotate(-self.lastdow)  # rotate to first day in yrange
-        self.days = list(dq)[:self.pdays]  # trim week to pdays
+        # Adaptive cluster number selection settings
+        self.error_threshold = error_threshold
+        self.time_budget = time_budget
+        self.period_solve_time = period_solve_time  # seconds per scenario in extensive form
+        self.selection = None
+        self._linkage = {}  # linkage matrices cached by (method, metric)
+        self.daily = daily
+        self.chronology = None
+        self.cluster = None
+
+        if self.daily:
+            # every day of the year is an individual
+            self.pdays = 1
+            self.days = list(range(7))
+        else:
+            # make week pattern into a list
+            self.pdays = (self.lastdow - self.firstdow + 8) % 7
+            if self.pdays == 0:
+                self.pdays = 7
+            dq = deque(range(7), maxlen=7)
+            dq.rotate(-self.lastdow)  # rotate to first day in yrange
+            self.days = list(dq)[:self.pdays]  # trim week to pdays
 
         # these are initialised after the first call to _init_timeseries_data
         self.plen = None
@@ -86,7 +142,7 @@ class ClusterData:
         self.nplen = len(self.regions) * self.plen
 
         # generate a set of max_d clusters
-        self.generate_cluster()
+        self.generate_cluster(previous)
 
     def __repr__(self):
         return 'Cluster Data generator\n %r' % self.Xcluster
@@ -104,9 +160,11 @@ class ClusterData:
         df.set_index([df.index.date, df.index.time], inplace=True)
         df = df.unstack()
         # top and tail year to start and finish within week interval
-        first_doy = next_weekday(datetime.date(
-            self.year - 1, 7, 1), self.firstdow)
-        last_doy = prev_weekday(datetime.date(self.year, 6, 30), self.lastdow)
+        first_doy = datetime.date(self.year - 1, 7, 1)
+        last_doy = datetime.date(self.year, 6, 30)
+        if not self.daily:
+            first_doy = next_weekday(first_doy, self.firstdow)
+            last_doy = prev_weekday(last_doy, self.lastdow)
         df = df[df.index >= pd.to_datetime(first_doy)]
         df = df[df.index <= pd.to_datetime(last_doy)]
         # now keep those days you want to keep, eg. sunday to Wednesday
@@ -145,11 +203,21 @@ class ClusterData:
 
     def clusterset(self, max_d, method='average', metric='cityblock'):
         """Group period observations into clusters and save into Xcluster"""
-        self.max_d = max_d
         # Perform selected clustering algorithm on dataset
-        Z = linkage(self.X, method, metric=metric)
+        if (method, metric) not in self._linkage:
+            self._linkage[(method, metric)] = linkage(self.X, method, metric=metric)
+        Z = self._linkage[(method, metric)]
         # vector indicating the cluster to which each member of X belongs
-        self.cluster = fcluster(Z, self.max_d, criterion='maxclust')
+        self.cluster = fcluster(Z, max_d, criterion='maxclust')
+        self.representatives(metric=metric)
+
+    def representatives(self, metric='cityblock'):
+        """Calculate weights and representative observations of current partition"""
+        # fcluster may return fewer clusters than requested
+        self.max_d = int(self.cluster.max())
+        self.appended = []  # dates of periods appended with append_to_cluster
+        if self.daily:
+            self.chronology = self.cluster.copy()
         # Add index to dataset to backtrack day of the year
         X2 = np.column_stack((self.X, range(1, self.X.shape[0] + 1)))
         # Break down X into a list of numpy arrays, one for each cluster
@@ -181,19 +249,123 @@ class ClusterData:
         self.Xcluster = pd.DataFrame(
             Xcl, columns=['week', 'date', 'weight'])
 
+    def normalised(self):
+        '''Return observations scaled by the mean of each region'''
+        X = self.X[:, :self.nplen].reshape(self.periods, len(self.regions), self.plen)
+        scale = X.mean(axis=(0, 2), keepdims=True)
+        scale[scale == 0] = 1
+        return (X / scale).reshape(self.periods, self.nplen)
+
+    def incremental_clusterset(self, previous, metric='cityblock'):
+        '''Reuse the partition of a previous ClusterData if profiles are alike.
+
+        Profiles are compared normalised by regional means, so traces rescaled from
+        the same reference year match. Matching profiles keep the previous partition,
+        resembling ones are assigned to the nearest previous cluster centroid.
+        Weights and representative observations are recalculated in both cases.
+        Returns 'match', 'resemble' or None if profiles are too different to reuse'''
+        if previous is None or previous.cluster is None \
+                or previous.X.shape != self.X.shape or previous.daily != self.daily \
+                or list(previous.regions) != list(self.regions):
+            return None
+        Xn = self.normalised()
+        Xprev = previous.normalised()
+        diff = np.abs(Xn - Xprev).sum() / np.abs(Xprev).sum()
+        if diff <= self.MATCH_TOL:
+            self.cluster = previous.cluster.copy()
+            reuse = 'match'
+        elif diff <= self.RESEMBLE_TOL:
+            labels = np.arange(1, previous.cluster.max() + 1)
+            centroids = np.vstack([Xprev[previous.cluster == k].mean(axis=0) for k in labels])
+            nearest = cdist(Xn, centroids, metric=metric).argmin(axis=1)
+            # relabel so that clusters that lost all members are dropped
+            self.cluster = np.unique(nearest, return_inverse=True)[1] + 1
+            reuse = 'resemble'
+        else:
+            return None
+        self.representatives(metric=metric)
+        if previous.selection is not None:
+            self.selection = dict(previous.selection, clusters=self.max_d,
+                                  error=self.cluster_error(metric=metric))
+        return reuse
+
+    def cluster_error(self, metric='cityblock'):
+        '''Return the within cluster error of the current set of clusters.
+
+        It is the sum of distances between each observation and the representative
+        of its cluster, relative to the sum of distances between each observation
+        and the mean of all observations. 0 means a perfect representation'''
+        X = self.X[:, :self.nplen]
+        total = cdist(X, X.mean(axis=0, keepdims=True), metric=metric).sum()
+        within = 0
+        for k in range(self.cluster.max()):
+            members = X[self.cluster == k + 1]
+            rep = X[self.Xcluster['week'][k] - 1]
+            within += cdist(members, rep[np.newaxis, :], metric=metric).sum()
+        return within / total if total > 0 else 0.0
+
+    def estimate_solve_time(self, max_d):
+        '''Estimate extensive form solve time in seconds for max_d clusters plus
+        appended weeks, or None if no time per scenario is known'''
+        if self.period_solve_time is None:
+            return None
+        extra = sum(week is not None
+                    for week in (self.dunkelflaute_week(), self.system_peak_week()))
+        return self.period_solve_time * (max_d + extra)
+
+    def adaptive_clusterset(self, min_d=2, method='average', metric='cityblock'):
+        '''Choose the number of clusters between min_d and max_d.
+
+        Picks the smallest number of clusters whose within cluster error is below
+        error_threshold. Without a threshold, it picks the largest number of clusters
+        whose estimated solve time fits within time_budget. A time budget also caps
+        the number of clusters chosen by error threshold.
+        The choice is stored in the selection attribute'''
+        upper = self.max_d
+        chosen = None
+        for max_d in range(min(min_d, upper), upper + 1):
+            estimate = self.estimate_solve_time(max_d)
+            if self.time_budget is not None and estimate is not None \
+                    and estimate > self.time_budget and chosen is not None:
+                break
+            chosen = max_d
+            if self.error_threshold is not None:
+                self.clusterset(max_d, method=method, metric=metric)
+                if self.cluster_error(metric=metric) <= self.error_threshold:
+                    break
+        self.clusterset(chosen, method=method, metric=metric)
+        self.selection = {
+            'clusters': self.max_d,
+            'max_clusters': upper,
+            'error': self.cluster_error(metric=metric),
+            'error_threshold': self.error_threshold,
+            'estimated_time': self.estimate_solve_time(self.max_d),
+            'time_budget': self.time_budget,
+        }
+
     def append_to_cluster(self, date):
-        '''Append arbitrary weeks to cluster'''
-        if date is None:
+        '''Append arbitrary weeks to cluster, once per date (e.g. the dunkelflaute
+        and peak periods may start on the same day)'''
+        if date is None or pd.Timestamp(date) in self.appended:
             return
+        self.appended.append(pd.Timestamp(date))
         cluster = self.Xcluster
         # rescale weights to weeks
         cluster.weight *= self.periods
         # deduct 1 week from the largest cluster
         row = cluster.weight.idxmax()
+        week = 52 if cluster.week.max() < 52 else cluster.week.max()+1
+        if self.chronology is not None:
+            # move injected day to its own cluster in the chronology
+            day = np.flatnonzero(self.dates == np.datetime64(date))
+            if day.size:
+                row = self.chronology[day[0]] - 1
+                self.chronology[day[0]] = self.max_d + 1
+                week = day[0] + 1
         cluster.at[row, 'weight'] -= 1
         # Add injected week
         clus = cluster.append(pd.DataFrame.from_dict(
-            {'week': [52 if cluster.week.max() < 52 else cluster.week.max()+1],
+            {'week': [week],
              'date': [pd.Timestamp(date)],
              'weight': [1]
              }
@@ -205,7 +377,28 @@ class ClusterData:
         self.Xcluster = clus
         self.max_d += 1
 
-    def _calculate_dunkelflaute(self):
+    def append_stress_periods(self):
+        '''Append the dunkelflaute and system peak periods to the current clusters'''
+        self.append_to_cluster(self.dunkelflaute_week())
+        self.append_to_cluster(self.system_peak_week())
+
+    def observation(self, date):
+        '''Return the observation (row of X) of the period starting at date.
+
+        Periods that are not individuals in X, e.g. appended stress weeks, are read from
+        the data, wrapping around the end of the year'''
+        row = np.flatnonzero(self.dates == np.datetime64(pd.Timestamp(date)))
+        if row.size:
+            return self.X[row[0], :self.nplen]
+        out = []
+        for region in self.regions:
+            df = self._data_query(region)
+            start = df.index.searchsorted(pd.Timestamp(date))
+            out.append(np.take(df.values.ravel(), np.arange(start, start + self.plen),
+                               mode='wrap'))
+        return np.concatenate(out)
+
+    def _calculate_stress_indices(self):
         pass
 
     def dunkelflaute_week(self, summer=False):
@@ -214,11 +407,15 @@ class ClusterData:
     def system_peak_week(self):
         return None
 
-    def generate_cluster(self):
-        self.clusterset(self.max_d)
-        self._calculate_dunkelflaute()
-        self.append_to_cluster(self.dunkelflaute_week())
-        self.append_to_cluster(self.system_peak_week())
+    def generate_cluster(self, previous=None):
+        self._calculate_stress_indices()
+        self.reuse = self.incremental_clusterset(previous)
+        if self.reuse is None:
+            if self.error_threshold is not None or self.time_budget is not None:
+                self.adaptive_clusterset()
+            else:
+                self.clusterset(self.max_d)
+        self.append_stress_periods()
 
 
 class CSVCluster(ClusterData):
@@ -228,9 +425,20 @@ class CSVCluster(ClusterData):
             self,
             max_d=12,
             source='tests/SampleDemand.csv.gz',
+            error_threshold=None,
+            time_budget=None,
+            period_solve_time=None,
+            daily=False,
+            previous=None,
     ):
         self.source = source
-        ClusterData.__init__(self, max_d=max_d)
+        ClusterData.__init__(self,
+                             max_d=max_d,
+                             error_threshold=error_threshold,
+                             time_budget=time_budget,
+                             period_solve_time=period_solve_time,
+                             daily=daily,
+                             previous=previous)
 
     def _data_query(self, region):
         try:
@@ -246,90 +454,88 @@ class CSVCluster(ClusterData):
 
 
 class InstanceCluster(ClusterData):
-    """Create weekly clusters from demand data in model instance"""
-
-    def __init__(self, instance, max_d=12):
-        self.demand = fill_complex_param(instance.region_net_demand)
-        self.time = instance.t
-        self.gen_cap_factor = fill_complex_mutable_param(instance.gen_cap_factor)
-        self.hyb_cap_factor = fill_complex_mutable_param(instance.hyb_cap_factor)
-        self.regions = instance.regions
-        self.zones_per_region = instance.zones_per_region
-        self.windowidth = 24*7
-        ClusterData.__init__(self, max_d=max_d, regions=instance.regions)
+    """Create weekly clusters from demand data in model instance.
+
+    Demand and capacity factor traces are arranged once into arrays with one row per
+    region and one column per timestamp. Extreme weeks are searched over hourly stress
+    indices smoothed with a weekly circular moving average. New stress period types
+    are added by registering a method returning an hourly index in STRESS_INDICES"""
+
+    # Hourly stress indices, name: (method returning an array over time, extreme sought)
+    STRESS_INDICES = {
+        'dunkelflaute': ('_dunkelflaute_ratio', 'min'),
+        'peak': ('_system_demand', 'max'),
+    }
+
+    def __init__(self, instance, max_d=12, error_threshold=None, time_budget=None,
+                 period_solve_time=None, daily=False, previous=None, results=None):
+        results = results or Results(instance)
+        # Plain copies of instance sets, so clusters can be kept (and pickled) without it
+        self.time = list(instance.t)
+        self.TIME = np.array([np.datetime64(t) for t in self.time], dtype='M8[s]')
+        self.regions = list(instance.regions)
+        self.zones_per_region = {r: list(instance.zones_per_region[r]) for r in self.regions}
+        # Demand per region and aggregate variable renewable resource per region
+        keys, self.region_demand = results.frame('region_net_demand').timeseries()
+        self.region_pos = {key[0]: row for row, key in enumerate(keys)}
+        self.region_vre = np.zeros(self.region_demand.shape)
+        zone_region = {z: r for r in self.regions for z in self.zones_per_region[r]}
+        for param in ('gen_cap_factor', 'hyb_cap_factor'):
+            keys, traces = results.frame(param).timeseries()
+            for (zone, tech), trace in zip(keys, traces):
+                if tech in TRACE_TECH and zone in zone_region:
+                    self.region_vre[self.region_pos[zone_region[zone]]] += trace
+        self.windowidth = 24 if daily else 24*7
+        ClusterData.__init__(self,
+                             max_d=max_d,
+                             regions=self.regions,
+                             error_threshold=error_threshold,
+                             time_budget=time_budget,
+                             period_solve_time=period_solve_time,
+                             daily=daily,
+                             previous=previous)
 
     def _data_query(self, region):
-        # Pandas from demandionary
-        df = pd.DataFrame.from_dict(self.demand)
-        # split the index string into two columns, region and timestamp
-        df2 = pd.DataFrame(
-            df['index'].values.tolist(), columns=['region', 'timestamp'])
-        # replace index with region and timestamp
-        df = pd.concat([df2, df['value']], axis=1)
-        # filter by region
-        df = df[df['region'] == region]
-        # drop region column
-        df = df.drop('region', axis=1)
-        # format timestamp as a datetime object and index
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.set_index(pd.DatetimeIndex(df['timestamp']))
-        # drop timestamp column now that we have an index
-        df = df.drop('timestamp', axis=1)
+        df = pd.DataFrame({'value': self.region_demand[self.region_pos[region]]},
+                          index=pd.DatetimeIndex(self.TIME, name='timestamp'))
         # set year parameter based on trace data
         self.year = df.iloc[-1].name.year
         return df
 
-    def _calculate_dunkelflaute(self):  # REVIEW, maybe this doesnt need to be 2 steps
-        '''Compute aggregate dark doldrum index for data in instance'''
-        MAXLOAD = np.array([i['value'] for i in self.demand]).max()
-        TIME = np.array([np.datetime64(i) for i in self.time])
-        RATIO = np.zeros(len(TIME))
-        for region in self.regions:
-            LOAD = np.array([j if j >= 100 else 100
-                             for j in [i['value'] for i in self.demand if i['index'][0] == region]])
-            VRE_RESOURCE = np.zeros(len(TIME))
-            for tech in TRACE_TECH:
-                if tech in GEN_TECH:
-                    tech_trace = 'gen_cap_factor'
-                if tech in HYB_TECH:
-                    tech_trace = 'hyb_cap_factor'
-                for zone in self.zones_per_region[region]:
-                    TRACE = np.array([i['value']
-                                      for i in getattr(self, tech_trace)
-                                      if i['index'][0] == zone and i['index'][1] == tech])
-                    if len(TRACE) == len(TIME):
-                        VRE_RESOURCE += TRACE
-            RATIO += (VRE_RESOURCE / LOAD) * MAXLOAD
-        ww = int(self.windowidth / 2)
-        RATIO = np.pad(RATIO, (ww, ww), 'wrap')
-        W_RATIO = pd.Series(RATIO).rolling(self.windowidth,
-                                           center=True,
-                                           win_type='boxcar').mean()[ww:-ww].reset_index(drop=True)
-        self.dunkelflaute_index = pd.DataFrame(W_RATIO).set_index(TIME)
+    def _dunkelflaute_ratio(self):
+        '''Aggregate ratio of renewable resource to load, low in dark calm periods'''
+        load = np.maximum(self.region_demand, 100)
+        return (self.region_vre / load).sum(axis=0) * self.region_demand.max()
+
+    def _system_demand(self):
+        '''Aggregate demand across regions'''
+        return self.region_demand.sum(axis=0)
+
+    def _calculate_stress_indices(self):
+        '''Compute all registered stress indices smoothed over a week in one pass'''
+        names = list(self.STRESS_INDICES)
+        hourly = np.vstack([getattr(self, self.STRESS_INDICES[n][0])() for n in names])
+        self.stress_index = pd.DataFrame(circular_moving_average(hourly, self.windowidth).T,
+                                         index=self.TIME, columns=names)
+
+    def stress_week(self, name, months=None, exclude=False):
+        '''Return start date of the most extreme period of a stress index as a string.
+
+        Optionally restrict the search to (or exclude if exclude is True) a list of months'''
+        index = self.stress_index[name]
+        if months is not None:
+            in_months = index.index.month.isin(months)
+            index = index[~in_months if exclude else in_months]
+        extreme = index.idxmin() if self.STRESS_INDICES[name][1] == 'min' else index.idxmax()
+        return str(extreme - np.timedelta64((self.pdays - 1) // 2, 'D'))[:10]
 
     def dunkelflaute_week(self, summer=False):
         '''Return dark calm week in winter or summer period as a string'''
-        IS_SUMMER = self.dunkelflaute_index.index.month.isin([11, 12, 1, 2])
-        if summer:
-            return str(
-                     self.dunkelflaute_index[IS_SUMMER].idxmin()[0]
-                     - np.timedelta64(3, 'D'))[:10]
-        return str(
-                 self.dunkelflaute_index[~IS_SUMMER].idxmin()[0]
-                 - np.timedelta64(3, 'D'))[:10]
+        return self.stress_week('dunkelflaute', months=[11, 12, 1, 2], exclude=not summer)
 
     def system_peak_week(self):
-        '''Compute aggregate demand peak index for instance'''
-        TIME = np.array([np.datetime64(i) for i in self.time])
-        DEMAND = np.zeros(len(TIME))
-        for region in self.regions:
-            DEMAND += np.array([i['value'] for i in self.demand if i['index'][0] == region])
-        ww = int(self.windowidth / 2)
-        DEMAND = np.pad(DEMAND, (ww, ww), 'wrap')
-        W_DEMAND = pd.Series(DEMAND).rolling(self.windowidth,
-                                             center=True,
-                                             win_type='boxcar').mean()[ww:-ww].reset_index(drop=True)  # noqa
-        return str(TIME[W_DEMAND.idxmax()] - np.timedelta64(3, 'D'))[:10]
+        '''Return week of aggregate demand peak as a string'''
+        return self.stress_week('peak')
 
 
 class ClusterRun:
@@ -341,7 +547,10 @@ class ClusterRun:
                  model_options,
                  solver='cbc',
                  solver_options=None,
-                 log=False):
+                 log=False,
+                 seed=None,
+                 carry_forward=None,
+                 portfolio=None):
         self.cluster = cluster
         self.model_options = model_options
         if self.cluster:
@@ -351,6 +560,13 @@ class ClusterRun:
         self.solver = solver
         self.solver_options = solver_options
         self.log = log
+        # Capacity decisions to seed first stage values, in cluster solution format
+        self.seed = seed
+        # CarryForward state from previous investment period, written into each member
+        self.carry_forward = carry_forward
+        # SolverConfig list to race instead of solver, and the configuration that won
+        self.portfolio = portfolio
+        self.winner = None
         # Internal variables to class
         self.data = None
         self.tmpdir = tempfile.mkdtemp()
@@ -359,7 +575,7 @@ class ClusterRun:
         print(self.year)
 
     def _gen_dat_files(self):
-        """generate a 1 week timestamp range for each cluster member.
+        """generate a timestamp range of the period length for each cluster member.
 
          and produce a data control file for each member, must be athena compliant"""
         for k in range(self.cluster.max_d):
@@ -380,6 +596,20 @@ class ClusterRun:
                             else:
                                 line = drange
                         fo.write(line)
+                    if self.carry_forward is not None:
+                        fo.write(self.carry_forward.data_commands())
+                    if self.cluster.daily:
+                        fo.write(self._chronology_data(k + 1))
+
+    def _chronology_data(self, rep):
+        '''Return data commands for the chronology of days of a representative day'''
+        days = range(1, len(self.cluster.chronology) + 1)
+        data = "\n# Chronology of representative days\n"
+        data += "set days := " + " ".join(str(d) for d in days) + ";\n"
+        data += "param day_rep := " + " ".join(
+            "%d %d" % (d, r) for d, r in zip(days, self.cluster.chronology)) + ";\n"
+        data += "param rep := %d;\n" % rep
+        return data
 
     def _gen_scen_struct(self):
         setNodes = 'set Nodes:= Root '
@@ -419,6 +649,10 @@ class ClusterRun:
             'set StageVariables[SS] := gen_cap_new[*,*] stor_cap_new[*,*] hyb_cap_new[*,*] intercon_cap_new[*,*] gen_cap_ret[*,*];',  # noqa
             'stagecost': 'param StageCost := FS FSCost SS SSCost;',
         }
+        if self.cluster.daily:
+            # storage levels at the start of each day are shared by all scenarios
+            template['setstagevars1'] = template['setstagevars1'][:-1] \
+                + ' stor_level_inter[*,*,*] hyb_level_inter[*,*,*];'
         with open(self.tmpdir + '/ScenarioStructure.dat', 'wt') as fo:
             for t in template:
                 line = template[t] + '\n\n'
@@ -430,35 +664,62 @@ class ClusterRun:
             refmodel = "'''Temporary openCEM model instance for runef simulations'''\n"
             refmodel += "from cemo.model import CreateModel, model_options\n"
             refmodel += "options = " + str(self.model_options) + "  # noqa\n"
-            refmodel += "model = CreateModel('openCEM', options).create_model()\n"
+            if self.cluster.daily:
+                refmodel += "model = CreateModel('openCEM', options).create_model(chrono=True)\n"
+            else:
+                refmodel += "model = CreateModel('openCEM', options).create_model()\n"
+            if self.seed is not None:
+                with open(self.tmpdir + '/seed.json', 'w') as seed:
+                    json.dump(self.seed, seed)
+                refmodel += "from pyomo.environ import BuildAction  # noqa\n"
+                refmodel += "from cemo.warmstart import seed_capacity  # noqa\n"
+                refmodel += "model.seed = BuildAction(rule=lambda m: seed_capacity(m, '%s'))\n" \
+                    % (self.tmpdir + '/seed.json')
             fo.write(refmodel)
 
-    def run_cluster(self):
-        '''Create a stochastic program to run in pyomo runef based on demand
-         clustering. The objective is to find a set of capacity expansion
-         decisions that work across all clusters'''
-        self._gen_dat_files()  # generate .dat files for cluster members
-        self._gen_scen_struct()  # generate .dat file for runef tree
-        self._gen_ref_model()  # generate reference model for runef
+    def _runef_cmd(self, solver, solver_options):
         cmd = [
             "runef", "-m", self.tmpdir, "-s", self.tmpdir, "--solve",
-            "--solver=" + self.solver,
+            "--solver=" + solver,
             "--solution-writer=pyomo.pysp.plugins.jsonsolutionwriter",
         ]
-        stdout = subprocess.DEVNULL
-        if self.solver_options is not None:
-            cmd.append("--solver-options='"+self.solver_options+"'")
+        if solver_options is not None:
+            cmd.append("--solver-options='"+solver_options+"'")
 
         if self.log:
             cmd.append("--output-solver-log")
             cmd.append("--traceback")
-            stdout = None
+        return cmd
 
-        proc = subprocess.run(cmd, stdout=stdout)
-        if proc.returncode == 0:
-            shutil.move("ef_solution.json", self.wrkdir / ('ef_sol'+self.year+'.json'))
+    def run_cluster(self):
+        '''Create a stochastic program to run in pyomo runef based on demand
+         clustering. The objective is to find a set of capacity expansion
+         decisions that work across all clusters'''
+        self._gen_dat_files()  # generate .dat files for cluster members
+        self._gen_scen_struct()  # generate .dat file for runef tree
+        self._gen_ref_model()  # generate reference model for runef
+        stdout = None if self.log else subprocess.DEVNULL
+        if self.portfolio:
+            cwds = []
+            for k in range(len(self.portfolio)):
+                cwds.append(self.tmpdir + '/race' + str(k))
+                os.mkdir(cwds[-1])
+            cmds = [self._runef_cmd(config.solver, ' '.join(
+                '%s=%s' % option for option in config.options.items()) or None)
+                for config in self.portfolio]
+            k = race_commands(cmds, cwds, stdout=stdout)
+            if k is None:
+                sys.exit("openCEM cluster: No solver in portfolio solved the cluster run")
+            self.winner = self.portfolio[k]
+            solution = cwds[k] + '/ef_solution.json'
         else:
-            sys.exit(proc.returncode)
+            # runef writes its solution in its working directory, keep it per run
+            proc = subprocess.run(self._runef_cmd(self.solver, self.solver_options),
+                                  cwd=self.tmpdir, stdout=stdout)
+            if proc.returncode != 0:
+                sys.exit(proc.returncode)
+            solution = self.tmpdir + '/ef_solution.json'
+        shutil.move(solution, self.wrkdir / ('ef_sol'+self.year+'.json'))
 
         with open(self.wrkdir / ('ef_sol' + self.year+'.json')) as f:
             clusterresult = json.load(f)
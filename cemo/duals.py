@@ -0,0 +1,77 @@
+'''Selective import of constraint duals of openCEM instances into compact arrays'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+from cemo.results import DUAL_FRAMES, make_frame
+
+# Constraint families whose duals are used by outputs (srmc in parquetify and summaries)
+DUALS = ['ldbal']
+
+# Labels of the rows of a constraint in LP files, by its symbol
+ROW_LABELS = ['c_e_%s_', 'c_l_%s_', 'c_u_%s_', 'r_l_%s_', 'r_u_%s_']
+
+
+def parse_duals(option):
+    '''Return list of constraint families from a comma separated option string.
+
+    `all` imports duals of every constraint with the model dual Suffix (None)
+    and `none` (or an empty string) imports no duals'''
+    names = [name.strip() for name in option.split(',') if name.strip()]
+    if names == ['all']:
+        return None
+    if names == ['none']:
+        return []
+    if 'all' in names or 'none' in names:
+        raise ValueError("openCEM-duals: all and none cannot be combined with constraint names")
+    return names
+
+
+def row_dual(rows, symbol):
+    '''Return dual of a constraint from solution rows by its symbol, the largest in magnitude
+    if it has more than one row (e.g. ranges). None if the solution has no dual for it'''
+    dual = None
+    for label in ROW_LABELS:
+        entry = rows.get(label % symbol)
+        if entry is not None and (dual is None or abs(entry['Dual']) > abs(dual)):
+            dual = entry['Dual']
+    return dual
+
+
+def load_results(inst, results, duals):
+    '''Load solver results into instance, importing duals of the constraint families in
+    duals only. Duals are kept as Frames (see cemo.results) by family in an instance
+    attribute (DUAL_FRAMES) and the remaining constraint rows are dropped before Pyomo
+    loads the solution'''
+    smap = results.__dict__.get('_smap')
+    if smap is None:
+        smap = inst.solutions.symbol_map[results._smap_id]
+    frames = {}
+    time = list(inst.t) if hasattr(inst, 't') else None
+    if len(results.solution) and duals:
+        rows = results.solution(0).constraint
+        for name in duals:
+            con = getattr(inst, name)
+            keys = list(con.keys())
+            frames[name] = make_frame(
+                keys, [row_dual(rows, smap.byObject.get(id(con[i]))) for i in keys], time)
+    for i in range(len(results.solution)):
+        results.solution(i).constraint.clear()
+    inst.solutions.load_from(results)
+    setattr(inst, DUAL_FRAMES, frames)
+
+
+def solve_instance(opt, inst, duals=None, **kwargs):
+    '''Solve instance with solver opt importing duals of the constraint families in duals.
+
+    With duals None all duals are imported through the dual Suffix of the model
+    (see CreateModel). Return solver results'''
+    if duals is None:
+        return opt.solve(inst, **kwargs)
+    results = opt.solve(inst, load_solutions=False,
+                        suffixes=['dual'] if duals else [], **kwargs)
+    load_results(inst, results, duals)
+    return results
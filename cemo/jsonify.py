@@ -12,246 +12,135 @@ __maintainer__ = "Andrew Hall"
 __email__ = "andrew.hall@itpau.com.au"
 
 import json
-import linecache
+import os
+from functools import partial
+from pathlib import Path
 
+import numpy as np
 from pyomo.environ import value
 
-from cemo.rules import (cost_build_per_zone_model,
-                        cost_build_per_zone_exo, system_cost,
-                        cost_trans_build_per_zone_model,
-                        cost_trans_build_per_zone_exo)
+from cemo.rules import system_cost
 
 from cemo import const
+from cemo.carryforward import CarryForward
+from cemo.parquetify import MAP
+from cemo.results import Results
+from cemo.utils import system_cost_value
+
+
+# Groups of components in the JSON output of each year
+JSON_GROUPS = ['sets', 'params', 'vars', 'duals']
+
+
+def json_components(inst, group, datasets=None, results=None):
+    '''Yield name and a function returning the value of each component of a group of
+    JSON output, so that components can be filled one at a time.
+
+    With datasets (see parquetify.output_datasets) only the components of those datasets
+    are included, without sets. Components are filled from results (a cemo.results.Results
+    of inst, created if not given; inst may be None with results)'''
+    results = results or Results(inst)
+    names = None if datasets is None else dataset_components(datasets)
+    if group == 'sets':
+        items = [] if datasets is not None else [
+            (name, partial(fill, results.members(name))) for name, fill in JSON_SETS]
+    elif group == 'params':
+        params = JSON_PARAMS + [(name, fill) for name, fill in JSON_OPTIONAL_PARAMS
+                                if results.has(name)]
+        items = [(name, partial(const.GEN_COMMIT.get, name.replace('gen_com_', '')) if fill is None
+                  else partial(fill, results.values(name)))
+                 for name, fill in params if names is None or name in names]
+    elif group == 'vars':
+        items = [(name, partial(fill_frame, results.frame, name, scale))
+                 for name, scale in JSON_VARS]
+    else:
+        items = []
+        if results.has_dual('ldbal'):
+            items.append(('srmc', partial(fill_frame, results.dual, 'ldbal', scale=1e-1,
+                                          clip=False)))
+    for name, fill in items:
+        if names is None or name in names:
+            yield name, fill
+
+
+def jsonify(inst, year, datasets=None, results=None):
+    '''Produce full JSON model output for one year.
+
+    With datasets (see parquetify.output_datasets) only the components of those datasets
+    are included, without sets'''
+    results = results or Results(inst)
+    out = {year: {group: {name: fill() for name, fill
+                          in json_components(inst, group, datasets, results)}
+                  for group in JSON_GROUPS}}
+    out[year]['objective_value'] = objective_value(inst, results)
+    return out
 
 
-def jsonify(inst, year):
-    '''Produce full JSON model output for one year'''
-    out = {
-        year: {
-            'sets': {
-                inst.regions.name:
-                list(inst.regions),
-                inst.zones.name:
-                list(inst.zones),
-                inst.all_tech.name:
-                list(inst.all_tech),
-                inst.fuel_gen_tech.name:
-                list(inst.fuel_gen_tech),
-                inst.commit_gen_tech.name:
-                list(inst.commit_gen_tech),
-                inst.retire_gen_tech.name:
-                list(inst.retire_gen_tech),
-                inst.nobuild_gen_tech.name:
-                list(inst.nobuild_gen_tech),
-                inst.hyb_tech.name:
-                list(inst.hyb_tech),
-                inst.stor_tech.name:
-                list(inst.stor_tech),
-                inst.t.name:
-                list(inst.t),
-                inst.zones_in_regions.name:
-                list(inst.zones_in_regions),
-                inst.gen_tech_in_zones.name:
-                list(inst.gen_tech_in_zones),
-                inst.fuel_gen_tech_in_zones.name:
-                list(inst.fuel_gen_tech_in_zones),
-                inst.retire_gen_tech_in_zones.name:
-                list(inst.retire_gen_tech_in_zones),
-                inst.commit_gen_tech_in_zones.name:
-                list(inst.commit_gen_tech_in_zones),
-                inst.hyb_tech_in_zones.name:
-                list(inst.hyb_tech_in_zones),
-                inst.stor_tech_in_zones.name:
-                list(inst.stor_tech_in_zones),
-                inst.intercons_in_zones.name:
-                list(inst.intercons_in_zones),
-                # Complex sets of sets
-                inst.zones_per_region.name:
-                fill_complex_set(inst.zones_per_region),
-                inst.gen_tech_per_zone.name:
-                fill_complex_set(inst.gen_tech_per_zone),
-                inst.fuel_gen_tech_per_zone.name:
-                fill_complex_set(inst.fuel_gen_tech_per_zone),
-                inst.retire_gen_tech_per_zone.name:
-                fill_complex_set(inst.retire_gen_tech_per_zone),
-                inst.commit_gen_tech_per_zone.name:
-                fill_complex_set(inst.commit_gen_tech_per_zone),
-                inst.hyb_tech_per_zone.name:
-                fill_complex_set(inst.hyb_tech_per_zone),
-                inst.stor_tech_per_zone.name:
-                fill_complex_set(inst.stor_tech_per_zone),
-                inst.intercon_per_zone.name:
-                fill_complex_set(inst.intercon_per_zone)
-            },
-            'params': {
-                # params with complex tuple keys
-                inst.cost_gen_build.name:
-                fill_complex_mutable_param(inst.cost_gen_build),
-                inst.cost_stor_build.name:
-                fill_complex_mutable_param(inst.cost_stor_build),
-                inst.cost_hyb_build.name:
-                fill_complex_mutable_param(inst.cost_hyb_build),
-                inst.cost_intercon_build.name:
-                fill_complex_param(inst.cost_intercon_build),
-                inst.cost_fuel.name:
-                fill_complex_param(inst.cost_fuel),
-                inst.fuel_heat_rate.name:
-                fill_complex_param(inst.fuel_heat_rate),
-                inst.intercon_loss_factor.name:
-                fill_complex_param(inst.intercon_loss_factor),
-                inst.gen_cap_factor.name:
-                fill_complex_mutable_param(inst.gen_cap_factor),
-                inst.hyb_cap_factor.name:
-                fill_complex_mutable_param(inst.hyb_cap_factor),
-                inst.gen_build_limit.name:
-                fill_complex_param(inst.gen_build_limit),
-                inst.gen_cap_initial.name:
-                fill_complex_mutable_param(inst.gen_cap_initial),
-                inst.stor_cap_initial.name:
-                fill_complex_param(inst.stor_cap_initial),
-                inst.hyb_cap_initial.name:
-                fill_complex_param(inst.hyb_cap_initial),
-                inst.intercon_cap_initial.name:
-                fill_complex_param(inst.intercon_cap_initial),
-                inst.gen_cap_exo.name:
-                fill_complex_mutable_param(inst.gen_cap_exo),
-                inst.stor_cap_exo.name:
-                fill_complex_param(inst.stor_cap_exo),
-                inst.hyb_cap_exo.name:
-                fill_complex_param(inst.hyb_cap_exo),
-                inst.intercon_cap_exo.name:
-                fill_complex_param(inst.intercon_cap_exo),
-                inst.ret_gen_cap_exo.name:
-                fill_complex_mutable_param(inst.ret_gen_cap_exo),
-                inst.region_net_demand.name:
-                fill_complex_param(inst.region_net_demand),
-
-                # params with many scalar keys and
-                inst.cost_gen_fom.name:
-                fill_scalar_key_param(inst.cost_gen_fom),
-                inst.cost_gen_vom.name:
-                fill_scalar_key_param(inst.cost_gen_vom),
-                inst.cost_stor_fom.name:
-                fill_scalar_key_param(inst.cost_stor_fom),
-                inst.cost_stor_vom.name:
-                fill_scalar_key_param(inst.cost_stor_vom),
-                inst.cost_hyb_fom.name:
-                fill_scalar_key_param(inst.cost_hyb_fom),
-                inst.cost_hyb_vom.name:
-                fill_scalar_key_param(inst.cost_hyb_vom),
-                inst.all_tech_lifetime.name:
-                fill_scalar_key_param(inst.all_tech_lifetime),
-                inst.fixed_charge_rate.name:
-                fill_scalar_key_param(inst.fixed_charge_rate),
-                inst.cost_retire.name:
-                fill_scalar_key_param(inst.cost_retire),
-                inst.stor_rt_eff.name:
-                fill_scalar_key_param(inst.stor_rt_eff),
-                inst.stor_charge_hours.name:
-                fill_scalar_key_param(inst.stor_charge_hours),
-                inst.hyb_col_mult.name:
-                fill_scalar_key_param(inst.hyb_col_mult),
-                inst.hyb_charge_hours.name:
-                fill_scalar_key_param(inst.hyb_charge_hours),
-                inst.fuel_emit_rate.name:
-                fill_scalar_key_param(inst.fuel_emit_rate),
-                inst.cost_cap_carry_forward.name:
-                fill_scalar_key_mutable_param(inst.cost_cap_carry_forward),
-                'gen_com_mincap': const.GEN_COMMIT['mincap'],
-                'gen_com_penalty': const.GEN_COMMIT['penalty'],
-                'gen_com_effrate': const.GEN_COMMIT['effrate'],
-
-                # params with scalar value
-                inst.cost_unserved.name:
-                inst.cost_unserved.value,
-                inst.cost_emit.name:
-                inst.cost_emit.value,
-                inst.cost_trans.name:
-                inst.cost_trans.value,
-                inst.all_tech_discount_rate.name:
-                inst.all_tech_discount_rate.value,
-                inst.year_correction_factor.name:
-                inst.year_correction_factor.value,
-                inst.intercon_fixed_charge_rate.name:
-                inst.intercon_fixed_charge_rate.value,
-            },
-            'vars': {
-                inst.gen_cap_new.name:
-                fill_complex_var(inst.gen_cap_new, 1e-3),
-                inst.gen_cap_op.name:
-                fill_complex_var(inst.gen_cap_op, 1e-3),
-                inst.stor_cap_new.name:
-                fill_complex_var(inst.stor_cap_new, 1e-3),
-                inst.stor_cap_op.name:
-                fill_complex_var(inst.stor_cap_op, 1e-3),
-                inst.hyb_cap_new.name:
-                fill_complex_var(inst.hyb_cap_new, 1e-3),
-                inst.hyb_cap_op.name:
-                fill_complex_var(inst.hyb_cap_op, 1e-3),
-                inst.intercon_cap_new.name:
-                fill_complex_var(inst.intercon_cap_new, 1e-3),
-                inst.intercon_cap_op.name:
-                fill_complex_var(inst.intercon_cap_op, 1e-3),
-                inst.gen_cap_ret.name:
-                fill_complex_var(inst.gen_cap_ret, 1e-3),
-                inst.gen_disp.name:
-                fill_complex_var(inst.gen_disp),
-                inst.gen_disp_com.name:
-                fill_complex_var(inst.gen_disp_com),
-                inst.gen_disp_com_p.name:
-                fill_complex_var(inst.gen_disp_com_p),
-                inst.stor_disp.name:
-                fill_complex_var(inst.stor_disp),
-                inst.stor_charge.name:
-                fill_complex_var(inst.stor_charge),
-                inst.hyb_disp.name:
-                fill_complex_var(inst.hyb_disp),
-                inst.hyb_charge.name:
-                fill_complex_var(inst.hyb_charge),
-                inst.stor_level.name:
-                fill_complex_var(inst.stor_level),
-                inst.hyb_level.name:
-                fill_complex_var(inst.hyb_level),
-                inst.unserved.name:
-                fill_complex_var(inst.unserved),
-                inst.surplus.name:
-                fill_complex_var(inst.surplus),
-                inst.intercon_disp.name:
-                fill_complex_var(inst.intercon_disp)
-            },
-            'duals': {
-                'srmc': fill_dual_suffix(inst.dual, inst.ldbal, scale=1e-1)
-            },
-            'objective_value': value(system_cost(inst))
-        }
+def json_stream(inst, year, out_file, datasets=None, results=None):
+    '''Write JSON model output for one year to out_file, one component at a time.
+
+    Output is the same as json.dump(jsonify(inst, year, datasets), out_file) while
+    only the values of one component are held in memory at a time.
+    Return byte [offset, length] of the value of each component by group, relative
+    to the start of the output (JSON output is ASCII so characters are bytes)'''
+    encoder = json.JSONEncoder()
+    results = results or Results(inst)
+    spans = {}
+    pos = 0
+
+    def write(text):
+        nonlocal pos
+        out_file.write(text)
+        pos += len(text)
+
+    write('{%s: {' % encoder.encode(str(year)))
+    for idx, group in enumerate(JSON_GROUPS):
+        write('%s%s: {' % (', ' if idx else '', encoder.encode(group)))
+        spans[group] = {}
+        for jdx, (name, fill) in enumerate(json_components(inst, group, datasets, results)):
+            write('%s%s: ' % (', ' if jdx else '', encoder.encode(name)))
+            start = pos
+            for chunk in encoder.iterencode(fill()):
+                write(chunk)
+            spans[group][name] = [start, pos - start]
+        write('}')
+    write(', "objective_value": %s}}' % encoder.encode(objective_value(inst, results)))
+    return spans
+
+
+def objective_value(inst, results):
+    '''Return system cost of inst, as extracted in results (see Results.snapshot) or
+    evaluated from results if the solution was read directly from the solver solution
+    file (see cemo.solution)'''
+    if results.objective is not None:
+        return results.objective
+    if results.solution_read:
+        return system_cost_value(results)
+    return value(system_cost(inst))
+
+
+def json_snapshot(datasets=None):
+    '''Return names of the components read by json_components for datasets (all if None),
+    as keyword arguments of cemo.results.Results.snapshot'''
+    names = None if datasets is None else dataset_components(datasets)
+    params = [(name, fill) for name, fill in JSON_PARAMS + JSON_OPTIONAL_PARAMS
+              if fill is not None]
+    return {
+        'frames': [name for name, _ in JSON_VARS if names is None or name in names],
+        'duals': ['ldbal'] if names is None or 'srmc' in names else [],
+        'values': [name for name, _ in params if names is None or name in names],
+        'members': [name for name, _ in JSON_SETS] if datasets is None else [],
     }
-    if hasattr(inst, 'nem_emit_limit'):
-        out[year]['params'].update({
-            inst.nem_emit_limit.name:
-            inst.nem_emit_limit.value
-        })
-    if hasattr(inst, 'nem_ret_ratio'):
-        out[year]['params'].update({
-            inst.nem_ret_ratio.name: inst.nem_ret_ratio.value
-        })
-    if hasattr(inst, 'nem_ret_gwh'):
-        out[year]['params'].update({inst.nem_ret_gwh.name: inst.nem_ret_gwh.value})
-    if hasattr(inst, 'region_ret_ratio'):
-        out[year]['params'].update({
-            inst.region_ret_ratio.name:
-            fill_scalar_key_param(inst.region_ret_ratio)
-        })
-    if hasattr(inst, 'nem_disp_ratio'):
-        out[year]['params'].update({
-            inst.nem_disp_ratio.name:
-            inst.nem_disp_ratio.value
-        })
-    if hasattr(inst, 'nem_re_disp_ratio'):
-        out[year]['params'].update({
-            inst.nem_re_disp_ratio.name:
-            inst.nem_re_disp_ratio.value
-        })
-    return out
+
+
+def dataset_components(datasets):
+    '''Return set of JSON component names in datasets, duals by their dataset name'''
+    names = set(datasets) & set(MAP['duals'])
+    for group in MAP.values():
+        for key, entry in group.items():
+            if key in datasets:
+                names.update(entry['vars'])
+    return names
 
 
 def jsoninit(inst, year):
@@ -277,28 +166,8 @@ def jsoninit(inst, year):
 
 def json_carry_forward_cap(inst):
     '''Produce JSON output of capacity data to carry forward to next investment period'''
-    out = {
-        inst.gen_cap_initial.name:
-        fill_complex_var(inst.gen_cap_op, 1e-3),
-        inst.stor_cap_initial.name:
-        fill_complex_var(inst.stor_cap_op, 1e-3),
-        inst.hyb_cap_initial.name:
-        fill_complex_var(inst.hyb_cap_op, 1e-3),
-        inst.intercon_cap_initial.name:
-        fill_complex_var(inst.intercon_cap_op, 1e-3),
-        inst.cost_cap_carry_forward_sim.name: [{
-            "index":
-            zone,
-            "value":
-            value(
-                cost_build_per_zone_model(inst, zone)
-                + cost_build_per_zone_exo(inst, zone)
-                + cost_trans_build_per_zone_model(inst, zone)
-                + cost_trans_build_per_zone_exo(inst, zone)
-                + inst.cost_cap_carry_forward_sim[zone])
-        } for zone in inst.zones]
-    }
-    return out
+    return {name: [{"index": i, "value": val} for i, val in values.items()]
+            for name, values in CarryForward.from_instance(inst, None).params().items()}
 
 
 def jsonopcap0(inst):
@@ -325,16 +194,101 @@ def json_readr_meta(filename):
     '''Read metadata for openCEM JSON file.
 
     Return metadata entry for file in a single dictionary'''
-    return json.loads(linecache.getline(filename, 1))
+    index = load_json_index(filename)
+    if index is not None:
+        return read_span(filename, index['meta'])
+    with open(filename, 'rb') as in_file:
+        return json.loads(in_file.readline())
 
 
 def json_readr_year(filename, year):
     '''Read single year from openCEM JSON file.
 
-    Return year entry for file in a single dictionary'''
+    Return year entry for file in a single dictionary.
+    Only that year is read if the file has an index (see save_json_index)'''
+    index = load_json_index(filename)
+    if index is not None:
+        return read_span(filename, index['years'][str(year)])
     metadata = json_readr_meta(filename)
-    line = metadata['meta']['Years'].index(int(year)) + 2
-    return json.loads(linecache.getline(filename, line))
+    line = metadata['meta']['Years'].index(int(year)) + 1
+    with open(filename, 'rb') as in_file:
+        for number, text in enumerate(in_file):
+            if number == line:
+                return json.loads(text)
+    raise KeyError(year)
+
+
+def json_readr_component(filename, year, group, name):
+    '''Read the value of a single component (e.g. 'vars', 'gen_cap_op') of a year
+    from openCEM JSON file, reading only that component if the file index has it'''
+    index = load_json_index(filename)
+    if index is not None:
+        span = index['components'].get(str(year), {}).get(group, {}).get(name)
+        if span is not None:
+            return read_span(filename, span)
+    return json_readr_year(filename, year)[str(year)][group][name]
+
+
+def index_path(filename):
+    '''Return path of sidecar index of an openCEM JSON file'''
+    return Path(str(filename) + '.idx')
+
+
+def read_span(filename, span):
+    '''Read JSON value at byte [offset, length] span of a file'''
+    with open(filename, 'rb') as in_file:
+        in_file.seek(span[0])
+        return json.loads(in_file.read(span[1]))
+
+
+def load_json_index(filename):
+    '''Return sidecar index of openCEM JSON file, None if missing or older than the file'''
+    path = index_path(filename)
+    if not path.exists() or path.stat().st_mtime < Path(filename).stat().st_mtime:
+        return None
+    with open(path) as in_file:
+        return json.load(in_file)
+
+
+def save_json_index(filename, lines, years, components=None):
+    '''Save sidecar index of openCEM JSON file.
+
+    lines are byte [offset, length] of the metadata line and of each year line, and
+    components optional dictionaries of component spans in each year line (as returned
+    by json_stream) by year'''
+    index = {'meta': lines[0],
+             'years': {str(year): span for year, span in zip(years, lines[1:])},
+             'components': {}}
+    for year, span in zip(years, lines[1:]):
+        if components is not None and components.get(year) is not None:
+            index['components'][str(year)] = {
+                group: {name: [span[0] + start, length] for name, (start, length) in named.items()}
+                for group, named in components[year].items()}
+    tmp = str(index_path(filename)) + '.tmp'
+    with open(tmp, 'w') as out_file:
+        json.dump(index, out_file)
+    os.replace(tmp, str(index_path(filename)))
+
+
+def build_json_index(filename, chunk_size=16 * 1024 * 1024):
+    '''Save sidecar index of an existing openCEM JSON file (without component spans).
+
+    The file is scanned for line ends in chunks, so lines are never held in memory'''
+    lines = []
+    start = 0
+    pos = 0
+    with open(filename, 'rb') as in_file:
+        for chunk in iter(partial(in_file.read, chunk_size), b''):
+            end = chunk.find(b'\n')
+            while end >= 0:
+                lines.append([start, pos + end - start])
+                start = pos + end + 1
+                end = chunk.find(b'\n', end + 1)
+            pos += len(chunk)
+    if start < pos:
+        lines.append([start, pos - start])
+    years = read_span(filename, lines[0])['meta']['Years']
+    save_json_index(filename, lines, years)
 
 
 # Helper functions for marshalling various objects into appropriate json values
@@ -383,6 +337,11 @@ def fill_scalar_key_mutable_param(par):
     return out
 
 
+def fill_scalar_param(par):
+    '''Return value of a parameter with scalar value'''
+    return par.value
+
+
 def fill_complex_var(var, scale=1):
     '''Return complex variable dictionary'''
     out = []
@@ -395,6 +354,21 @@ def fill_complex_var(var, scale=1):
     return out
 
 
+def fill_scalar_value(values):
+    '''Return value of a parameter with scalar value from its values by index'''
+    return values[None]
+
+
+def fill_frame(frame, name, scale=1, clip=True):
+    '''Return complex variable (or dual) dictionary of a results Frame returned by
+    frame(name), clipping small negatives due to solver tolerance to 0'''
+    frm = frame(name)
+    values = frm.values * scale
+    clipped = (frm.values > -1e-6) & (frm.values < 0) if clip else np.zeros(frm.size, bool)
+    return [{'index': i, 'value': 0 if c else v}
+            for i, v, c in zip(frm.index(), values.tolist(), clipped.tolist())]
+
+
 def fill_dual_suffix(dual, name, scale=1):
     '''Return dual suffix dictionary'''
     out = []
@@ -410,3 +384,84 @@ def simple_as_complex(dic):
     for i in dic:
         out.append({'index': int(i), 'value': dic[i]})
     return out
+
+
+# Components of JSON output in order, with the functions filling their values from the
+# members of sets and the values of parameters by index (see cemo.results.Results)
+# (defined after the fill functions)
+JSON_SETS = [(name, list) for name in [
+    'regions', 'zones', 'all_tech', 'fuel_gen_tech', 'commit_gen_tech', 'retire_gen_tech',
+    'nobuild_gen_tech', 'hyb_tech', 'stor_tech', 't', 'zones_in_regions', 'gen_tech_in_zones',
+    'fuel_gen_tech_in_zones', 'retire_gen_tech_in_zones', 'commit_gen_tech_in_zones',
+    'hyb_tech_in_zones', 'stor_tech_in_zones', 'intercons_in_zones']] + [
+    # Complex sets of sets
+    (name, fill_complex_set) for name in [
+        'zones_per_region', 'gen_tech_per_zone', 'fuel_gen_tech_per_zone',
+        'retire_gen_tech_per_zone', 'commit_gen_tech_per_zone', 'hyb_tech_per_zone',
+        'stor_tech_per_zone', 'intercon_per_zone']]
+
+JSON_PARAMS = [
+    # params with complex tuple keys
+    ('cost_gen_build', fill_complex_param),
+    ('cost_stor_build', fill_complex_param),
+    ('cost_hyb_build', fill_complex_param),
+    ('cost_intercon_build', fill_complex_param),
+    ('cost_fuel', fill_complex_param),
+    ('fuel_heat_rate', fill_complex_param),
+    ('intercon_loss_factor', fill_complex_param),
+    ('gen_cap_factor', fill_complex_param),
+    ('hyb_cap_factor', fill_complex_param),
+    ('gen_build_limit', fill_complex_param),
+    ('gen_cap_initial', fill_complex_param),
+    ('stor_cap_initial', fill_complex_param),
+    ('hyb_cap_initial', fill_complex_param),
+    ('intercon_cap_initial', fill_complex_param),
+    ('gen_cap_exo', fill_complex_param),
+    ('stor_cap_exo', fill_complex_param),
+    ('hyb_cap_exo', fill_complex_param),
+    ('intercon_cap_exo', fill_complex_param),
+    ('ret_gen_cap_exo', fill_complex_param),
+    ('region_net_demand', fill_complex_param),
+    # params with many scalar keys
+    ('cost_gen_fom', fill_scalar_key_param),
+    ('cost_gen_vom', fill_scalar_key_param),
+    ('cost_stor_fom', fill_scalar_key_param),
+    ('cost_stor_vom', fill_scalar_key_param),
+    ('cost_hyb_fom', fill_scalar_key_param),
+    ('cost_hyb_vom', fill_scalar_key_param),
+    ('all_tech_lifetime', fill_scalar_key_param),
+    ('fixed_charge_rate', fill_scalar_key_param),
+    ('cost_retire', fill_scalar_key_param),
+    ('stor_rt_eff', fill_scalar_key_param),
+    ('stor_charge_hours', fill_scalar_key_param),
+    ('hyb_col_mult', fill_scalar_key_param),
+    ('hyb_charge_hours', fill_scalar_key_param),
+    ('fuel_emit_rate', fill_scalar_key_param),
+    ('cost_cap_carry_forward', fill_scalar_key_param),
+    ('gen_com_mincap', None),
+    ('gen_com_penalty', None),
+    ('gen_com_effrate', None),
+    # params with scalar value
+    ('cost_unserved', fill_scalar_value),
+    ('cost_emit', fill_scalar_value),
+    ('cost_trans', fill_scalar_value),
+    ('all_tech_discount_rate', fill_scalar_value),
+    ('year_correction_factor', fill_scalar_value),
+    ('intercon_fixed_charge_rate', fill_scalar_value),
+]
+
+# params of optional model constraints
+JSON_OPTIONAL_PARAMS = [
+    ('nem_emit_limit', fill_scalar_value),
+    ('nem_ret_ratio', fill_scalar_value),
+    ('nem_ret_gwh', fill_scalar_value),
+    ('region_ret_ratio', fill_scalar_key_param),
+    ('nem_disp_ratio', fill_scalar_value),
+    ('nem_re_disp_ratio', fill_scalar_value),
+]
+
+JSON_VARS = [(name, 1e-3) for name in [
+    'gen_cap_new', 'gen_cap_op', 'stor_cap_new', 'stor_cap_op', 'hyb_cap_new', 'hyb_cap_op',
+    'intercon_cap_new', 'intercon_cap_op', 'gen_cap_ret']] + [(name, 1) for name in [
+    'gen_disp', 'gen_disp_com', 'gen_disp_com_p', 'stor_disp', 'stor_charge', 'hyb_disp',
+    'hyb_charge', 'stor_level', 'hyb_level', 'unserved', 'surplus', 'intercon_disp']]
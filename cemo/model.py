@@ -30,7 +30,10 @@ from cemo.rules import (ScanForHybridperZone, ScanForStorageperZone,
                         con_caplim, con_max_cap_factor_per_zone,
                         con_committed_cap, con_disp_ramp_down, con_disp_ramp_up, con_emissions,
                         con_gen_cap, con_hyb_cap, con_hyb_flow_lim,
+                        con_hyb_level_inter, con_hyb_level_inter_max, con_hyb_level_inter_min,
+                        con_hyb_level_intra_max, con_hyb_level_intra_min,
                         con_hyb_level_max, con_hyb_reserve_lim, con_hybcharge,
+                        con_hybcharge_chrono,
                         con_intercon_cap, con_ldbal, con_max_mhw_per_zone,
                         con_max_mwh_nem_wide, con_max_trans, con_maxcap,
                         con_maxcharge, con_maxchargehy, con_min_load_commit,
@@ -38,8 +41,11 @@ from cemo.rules import (ScanForHybridperZone, ScanForStorageperZone,
                         con_nem_ret_gwh, con_nem_ret_ratio,
                         con_ramp_down_uptime, con_region_ret_ratio,
                         con_stor_cap,
-                        con_stor_flow_lim, con_stor_reserve_lim,
-                        con_storcharge, con_uns, con_uptime_commitment,
+                        con_stor_flow_lim, con_stor_level_inter,
+                        con_stor_level_inter_max, con_stor_level_inter_min,
+                        con_stor_level_intra_max, con_stor_level_intra_min,
+                        con_stor_reserve_lim,
+                        con_storcharge, con_storcharge_chrono, con_uns, con_uptime_commitment,
                         obj_cost)
 
 
@@ -59,9 +65,13 @@ def model_options(**kwargs):
 
 
 class CreateModel():
-    def __init__(self, namestr, model_options):
+    def __init__(self, namestr, model_options, duals=None):
         self.m = AbstractModel(name=namestr)
         self.model_options = model_options
+        # Constraints whose duals are imported selectively (see cemo.duals),
+        # None to import all duals through the dual Suffix
+        self.duals = duals
+        self.chrono = False
 
     def create_sets(self):
         # Sets
@@ -469,7 +479,8 @@ class CreateModel():
 
         # Storage charge/discharge dynamic
         self.m.StCharDis = Constraint(
-            self.m.stor_tech_in_zones, self.m.t, rule=con_storcharge)
+            self.m.stor_tech_in_zones, self.m.t,
+            rule=con_storcharge_chrono if self.chrono else con_storcharge)
         # Maxiumum rate of storage charge
         self.m.con_stor_flow_lim = Constraint(
             self.m.stor_tech_in_zones, self.m.t, rule=con_stor_flow_lim)
@@ -485,7 +496,8 @@ class CreateModel():
 
         # Hybrid charge/discharge dynamic
         self.m.HybCharDis = Constraint(
-            self.m.hyb_tech_in_zones, self.m.t, rule=con_hybcharge)
+            self.m.hyb_tech_in_zones, self.m.t,
+            rule=con_hybcharge_chrono if self.chrono else con_hybcharge)
         # Maxiumum level of hybrid storage discharge
         self.m.con_hyb_level_max = Constraint(
             self.m.hyb_tech_in_zones, self.m.t, rule=con_hyb_level_max)
@@ -502,6 +514,46 @@ class CreateModel():
         self.m.con_hyb_cap = Constraint(
             self.m.hyb_tech_in_zones, rule=con_hyb_cap)
 
+    def create_chronology(self):
+        """Link storage levels of representative days across the original sequence of days.
+
+        Each scenario instance models one representative day (rep). Levels at the start of
+        each original day are first stage variables shared by all scenarios, and each
+        scenario constrains the days it represents (day_rep)"""
+        # Original days in year and the representative day of each
+        self.m.days = Set(ordered=True)
+        self.m.day_rep = Param(self.m.days)
+        self.m.rep = Param()
+        for var, techs in [('stor_level', self.m.stor_tech_in_zones),
+                           ('hyb_level', self.m.hyb_tech_in_zones)]:
+            # Level at start of each original day
+            setattr(self.m, var + '_inter', Var(techs, self.m.days, within=NonNegativeReals))
+            # Level at start of representative day and its range within the day
+            setattr(self.m, var + '_start', Var(techs, within=NonNegativeReals))
+            setattr(self.m, var + '_min', Var(techs, within=NonNegativeReals))
+            setattr(self.m, var + '_max', Var(techs, within=NonNegativeReals))
+
+        self.m.con_stor_level_inter = Constraint(
+            self.m.stor_tech_in_zones, self.m.days, rule=con_stor_level_inter)
+        self.m.con_stor_level_inter_min = Constraint(
+            self.m.stor_tech_in_zones, self.m.days, rule=con_stor_level_inter_min)
+        self.m.con_stor_level_inter_max = Constraint(
+            self.m.stor_tech_in_zones, self.m.days, rule=con_stor_level_inter_max)
+        self.m.con_stor_level_intra_min = Constraint(
+            self.m.stor_tech_in_zones, self.m.t, rule=con_stor_level_intra_min)
+        self.m.con_stor_level_intra_max = Constraint(
+            self.m.stor_tech_in_zones, self.m.t, rule=con_stor_level_intra_max)
+        self.m.con_hyb_level_inter = Constraint(
+            self.m.hyb_tech_in_zones, self.m.days, rule=con_hyb_level_inter)
+        self.m.con_hyb_level_inter_min = Constraint(
+            self.m.hyb_tech_in_zones, self.m.days, rule=con_hyb_level_inter_min)
+        self.m.con_hyb_level_inter_max = Constraint(
+            self.m.hyb_tech_in_zones, self.m.days, rule=con_hyb_level_inter_max)
+        self.m.con_hyb_level_intra_min = Constraint(
+            self.m.hyb_tech_in_zones, self.m.t, rule=con_hyb_level_intra_min)
+        self.m.con_hyb_level_intra_max = Constraint(
+            self.m.hyb_tech_in_zones, self.m.t, rule=con_hyb_level_intra_max)
+
     def create_objective(self):
         # @@ Objective
         # Minimise capital, variable and fixed costs of system
@@ -511,15 +563,22 @@ class CreateModel():
         self.m.Obj = Objective(expr=self.m.FSCost + self.m.SSCost)
 
         # Short run marginal prices
-        self.m.dual = Suffix(direction=Suffix.IMPORT)
+        if self.duals is None:
+            self.m.dual = Suffix(direction=Suffix.IMPORT)
+
+    def create_model(self, test=False, chrono=False):
+        """Creates an instance of the pyomo definition of openCEM.
 
-    def create_model(self, test=False):
-        """Creates an instance of the pyomo definition of openCEM"""
+        chrono creates a representative day model for clustered runs with storage
+        levels linked across the original sequence of days"""
+        self.chrono = chrono
         self.create_sets()
         self.create_params()
         if test:
             return self.m
         self.create_vars()
+        if self.chrono:
+            self.create_chronology()
         self.create_constraints()
         self.create_objective()
         return self.m
@@ -7,27 +7,52 @@ __maintainer__ = "José Zapata"
 __email__ = "jose.zapata@itpau.com.au"
 
 import configparser
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import datetime
+import hashlib
 import json
 from pathlib import Path
 import tempfile
 import re
 import ast
 import shutil
+import time
 
 import pandas as pd
+from pyomo.environ import DataPortal
 from pyomo.opt import SolverFactory
 
 import cemo.const
+from cemo.carryforward import CarryForward, predict_carry_forward
+from cemo.checkpoint import Checkpoint, fingerprint
+from cemo.duals import DUALS, parse_duals, solve_instance
 from cemo.cluster import ClusterRun, InstanceCluster
-from cemo.jsonify import json_carry_forward_cap, jsonify
-from cemo.parquetify import parquetify
+from cemo.jsonify import (index_path, json_snapshot, json_stream, objective_value,
+                          save_json_index)
+from cemo.parquetify import (LAYOUTS, output_datasets, parquet_snapshot, parquetify,
+                             remove_datasets)
 from cemo.model import CreateModel, model_options
-from cemo.utils import printstats
-from cemo.summary import Summary
+from cemo.portfolio import SolverConfig, config_label, solve_portfolio
+from cemo.profiles import options_string, solver_profile
+from cemo.results import Results
+from cemo.solution import solve_direct
+from cemo.utils import STATS_COMPONENTS, STATS_SETS, STATS_VALUES, printstats
+from cemo.warmstart import apply_warm_start, solution_snapshot
+from cemo.summary import SUMMARY_DATASETS, Summary, summarise_year
 
 from shutil import copyfileobj
 
+# Buffer size used to merge year JSON outputs
+COPY_BUFFER = 16 * 1024 * 1024
+
+# Settings of a simulation that change the results or the outputs of each year
+SOLUTION_SETTINGS = ['solver', 'cluster', 'cluster_max_d', 'cluster_error_threshold',
+                     'cluster_time_budget', 'cluster_period_solve_time', 'cluster_period',
+                     'cluster_incremental', 'cluster_solver_options',
+                     'dispatch_solver_options', 'warmstart', 'portfolio', 'duals',
+                     'output_datasets', 'output_layout']
+
 
 def parse_solver_options(option_string):
     """Turn solver options in string format into JSON"""
@@ -46,6 +71,22 @@ def parse_solver_options(option_string):
     return option_dict
 
 
+def parse_portfolio(option_string):
+    """Turn solver portfolio in the form 'solver key=value; solver key=value' into a list
+    of SolverConfig"""
+    portfolio = []
+    for entry in option_string.split(';'):
+        solver, _, options = entry.strip().partition(' ')
+        if solver:
+            portfolio.append(SolverConfig(solver, parse_solver_options(options)))
+    return portfolio
+
+
+def solver_threads_option(solver):
+    """Return name of option setting the number of threads of a solver, None if not supported"""
+    return {'cbc': 'threads', 'cplex': 'threads', 'gurobi': 'Threads'}.get(solver)
+
+
 def make_file_path(pathstring, cfgroot):
     '''Return a full path for a file reference in cfg file, whether relative or absolute'''
     if Path(pathstring).is_absolute():
@@ -152,15 +193,91 @@ def setinstancecapacity(instance, data):
     return instance
 
 
+def written_datasets(datasets):
+    """Return datasets written for an output profile (see output_datasets), including
+    those summaries need, None for all"""
+    return None if datasets is None else datasets | set(SUMMARY_DATASETS)
+
+
+def output_snapshot(inst, json_output, datasets=None):
+    """Return Snapshot (see cemo.results) of the components of a solved instance read by
+    write_year_output, so that outputs are written without the instance"""
+    results = Results(inst)
+    if not json_output:
+        return results.snapshot(**parquet_snapshot(written_datasets(datasets)))
+    names = json_snapshot(datasets)
+    return results.snapshot(frames=names['frames'] + STATS_COMPONENTS, duals=names['duals'],
+                            values=names['values'] + STATS_VALUES,
+                            members=names['members'] + STATS_SETS,
+                            objective=objective_value(inst, results))
+
+
+def write_year_output(results, y, wrkdir, years, json_output, layout='partitioned', workers=1,
+                      datasets=None):
+    """Save results (a cemo.results.Snapshot, see output_snapshot) for year and summaries
+    for years so far.
+
+    Summaries are assembled from per-year partial summaries so only year is processed.
+    With datasets (see output_datasets), datasets outside it that summaries need are
+    removed once the year is summarised"""
+    if json_output:
+        with open(wrkdir / (str(y) + '.json'), 'w') as json_out:
+            spans = json_stream(None, y, json_out, datasets, results)
+            json_out.write('\n')
+        # Component offsets within the year, indexed when years are merged
+        with open(index_path(wrkdir / (str(y) + '.json')), 'w') as idx_out:
+            json.dump(spans, idx_out)
+    else:
+        written = written_datasets(datasets)
+        parquetify(None, wrkdir, y, layout, workers, written, results)
+
+    if json_output:
+        printstats(None, results)
+    summarise_year(wrkdir, y)
+    if datasets is not None and not json_output:
+        remove_datasets(wrkdir, y, written - datasets)
+    [cdu, cost] = Summary(wrkdir, years, partial=True).get_summary()
+    cdu.to_csv(wrkdir/("cdeu.csv"))
+    cost.to_csv(wrkdir/("cost.csv"))
+
+
+# Outcome of a speculative solve (see SolveTemplate.solve_speculative_year): saved state
+# and output of the year plus what the solving process learnt about clusters and solvers
+SpeculativeYear = namedtuple('SpeculativeYear', ['carry_forward', 'snapshot', 'capacity',
+                                                 'solution', 'selection', 'cluster',
+                                                 'period_solve_time', 'wins'])
+
+# SolveTemplate attributes handed to a speculative solve, as if solving in the main process
+SPECULATIVE_STATE = ['cluster_period_solve_time', 'portfolio_wins', '_prev_cluster',
+                     '_prev_capacity']
+
+
+def solve_speculative(sim_args, y, carry_forward, state):
+    """Solve year in a separate process using a predicted carry forward state
+    and the state (see SPECULATIVE_STATE) of the main process"""
+    sim = SolveTemplate(**sim_args)
+    sim._carry_forward = carry_forward
+    for name, val in state.items():
+        setattr(sim, name, val)
+    return sim.solve_speculative_year(y)
+
+
 class SolveTemplate:
     """Solve Multi year openCEM simulation based on template"""
 
+    # Maximum number of years waiting to be saved in pipeline mode
+    OUTPUT_QUEUE = 2
+
     def __init__(self, cfgfile,
                  solver='cbc',
                  log=False, wrkdir=Path(tempfile.mkdtemp()),
                  resume=False,
                  templatetest=False,
-                 json_output=False):
+                 json_output=False,
+                 threads=None,
+                 checkpoint=False,
+                 pipeline=False,
+                 speculative=False):
         config = configparser.ConfigParser(interpolation=None)
         try:
             with open(cfgfile) as f:
@@ -171,6 +288,19 @@ class SolveTemplate:
 
         self.resume = resume
         self.templatetest = templatetest
+        self.checkpoint = checkpoint
+        # Write results in a background process while the next year solves
+        self.pipeline = pipeline
+        self._output_pool = None
+        self._output = deque()
+        self._output_errors = []
+        # Solve next year in a background process with carry forward predicted from clusters
+        self.speculative = speculative
+        self._spec_pool = None
+        self._speculation = {}
+        self._sim_args = {'cfgfile': cfgfile, 'solver': solver, 'log': log, 'wrkdir': wrkdir,
+                          'templatetest': templatetest, 'json_output': json_output,
+                          'threads': threads}
         Scenario = config['Scenario']
         self.Name = Scenario['Name']
         self.Years = json.loads(Scenario['Years'])
@@ -217,6 +347,56 @@ class SolveTemplate:
         self.cluster = Advanced.getboolean('cluster')
 
         self.cluster_max_d = int(Advanced['cluster_sets'])
+        # Adaptive cluster number selection, cluster_sets becomes the upper bound
+        self.cluster_error_threshold = None
+        if config.has_option('Advanced', 'cluster_error_threshold'):
+            self.cluster_error_threshold = Advanced.getfloat('cluster_error_threshold')
+        self.cluster_time_budget = None
+        if config.has_option('Advanced', 'cluster_time_budget'):
+            self.cluster_time_budget = Advanced.getfloat('cluster_time_budget')
+        # Initial guess of solve time per cluster, calibrated after each clustered year
+        self.cluster_period_solve_time = None
+        if config.has_option('Advanced', 'cluster_period_solve_time'):
+            self.cluster_period_solve_time = Advanced.getfloat('cluster_period_solve_time')
+        if self.cluster_time_budget is not None and self.cluster_period_solve_time is None:
+            raise ValueError("openCEM-cluster_time_budget: "
+                             "requires cluster_period_solve_time to estimate solve times")
+        self.cluster_selection = {}
+        # Representative period length, week or day with chronological storage
+        self.cluster_period = 'week'
+        if config.has_option('Advanced', 'cluster_period'):
+            self.cluster_period = Advanced['cluster_period']
+            if self.cluster_period not in ['week', 'day']:
+                raise ValueError("openCEM-cluster_period: must be either week or day")
+        # Reuse clusters from previous year if profiles are alike
+        self.cluster_incremental = False
+        if config.has_option('Advanced', 'cluster_incremental'):
+            self.cluster_incremental = Advanced.getboolean('cluster_incremental')
+        self._prev_cluster = None
+        # Largest relative difference between predicted and actual carry forward
+        # for which a speculative solve of the next year is accepted
+        self.speculative_tolerance = 1e-4
+        if config.has_option('Advanced', 'speculative_tolerance'):
+            self.speculative_tolerance = Advanced.getfloat('speculative_tolerance')
+            if self.speculative_tolerance < 0:
+                raise ValueError("openCEM-speculative_tolerance: must be non negative")
+
+        # Parquet output in partitioned directories or a single file per dataset
+        self.output_layout = 'partitioned'
+        if config.has_option('Advanced', 'output_layout'):
+            self.output_layout = Advanced['output_layout']
+            if self.output_layout not in LAYOUTS:
+                raise ValueError("openCEM-output_layout: must be one of %s" % LAYOUTS)
+        # Datasets saved each year, None for all
+        self.output_datasets = None
+        if config.has_option('Advanced', 'output_profile'):
+            self.output_datasets = output_datasets(Advanced['output_profile'])
+        # Threads writing parquet datasets concurrently
+        self.output_workers = 1
+        if config.has_option('Advanced', 'output_workers'):
+            self.output_workers = Advanced.getint('output_workers')
+            if self.output_workers < 1:
+                raise ValueError("openCEM-output_workers: must be at least 1")
 
         self.regions = cemo.const.REGION.keys()
         if config.has_option('Advanced', 'regions'):
@@ -238,20 +418,85 @@ class SolveTemplate:
         else:
             self.solver = solver
 
+        # Named solver option profile for each stage (see cemo.profiles),
+        # explicit stage options take precedence
+        self.profile = None
+        self.profile_file = None
+        if config.has_option('Solver', 'profile'):
+            self.profile = config['Solver']['profile']
+        if config.has_option('Solver', 'profile_file'):
+            self.profile_file = make_file_path(config['Solver']['profile_file'], self.cfgfile)
+
         if config.has_option('Solver', 'cluster_solver_options'):
             self.cluster_solver_options = config['Solver']['cluster_solver_options']
+        elif self.profile is not None:
+            self.cluster_solver_options = options_string(solver_profile(
+                self.solver, 'cluster', self.profile, self.profile_file)) or None
         else:
             self.cluster_solver_options = None
 
         if config.has_option('Solver', 'dispatch_solver_options'):
             self.dispatch_solver_options = parse_solver_options(config['Solver']['dispatch_solver_options'])
-
+        elif self.profile is not None:
+            self.dispatch_solver_options = solver_profile(
+                self.solver, 'dispatch', self.profile, self.profile_file)
         else:
             self.dispatch_solver_options = {}
 
+        # Warm start each year from the solution of the previous year
+        self.warmstart = False
+        if config.has_option('Solver', 'warmstart'):
+            self.warmstart = config['Solver'].getboolean('warmstart')
+        self._prev_solution = None
+        self._prev_capacity = None
+
+        # Race a portfolio of solver configurations in each cluster and dispatch solve,
+        # preferring those that won more often so far
+        self.portfolio = None
+        if config.has_option('Solver', 'portfolio'):
+            self.portfolio = parse_portfolio(config['Solver']['portfolio'])
+            if not self.portfolio:
+                raise ValueError("openCEM-portfolio: must list at least one solver")
+        self.portfolio_size = None
+        if config.has_option('Solver', 'portfolio_size'):
+            self.portfolio_size = config['Solver'].getint('portfolio_size')
+            if self.portfolio_size < 1:
+                raise ValueError("openCEM-portfolio_size: must be at least 1")
+        self.portfolio_wins = {'cluster': {}, 'dispatch': {}}
+
+        # Constraints whose duals are imported after each dispatch solve (see cemo.duals)
+        self.duals = DUALS
+        if config.has_option('Solver', 'duals'):
+            self.duals = parse_duals(config['Solver']['duals'])
+
+        # Read dispatch solutions from the CBC solution file instead of loading them in Pyomo
+        self.solution_reader = False
+        if config.has_option('Solver', 'solution_reader'):
+            self.solution_reader = config['Solver'].getboolean('solution_reader')
+        if self.solution_reader:
+            if self.solver != 'cbc':
+                raise ValueError("openCEM-solution_reader: only supported with cbc")
+            if self.duals is None:
+                raise ValueError("openCEM-solution_reader: duals must list constraints")
+            if self.warmstart or self.portfolio is not None:
+                raise ValueError("openCEM-solution_reader: "
+                                 "cannot be combined with warmstart or portfolio")
+
+        # Allocate solver threads (e.g. in batch runs) unless set in cfg options
+        self.threads = threads
+        option = solver_threads_option(self.solver)
+        if threads is not None and option is not None:
+            self.dispatch_solver_options.setdefault(option, threads)
+            if self.cluster_solver_options is None:
+                self.cluster_solver_options = '%s=%d' % (option, threads)
+            elif option + '=' not in self.cluster_solver_options:
+                self.cluster_solver_options += ' %s=%d' % (option, threads)
+
         self.wrkdir = wrkdir
         self.log = log
         self.json_output = json_output
+        # CarryForward state of the last saved year
+        self._carry_forward = None
         # initialisation functions
         self.tracetechs()  # TODO refactor this
 
@@ -508,12 +753,14 @@ class SolveTemplate:
     def carryforwardcap(self, year):
         '''Generate initial capacity for each year.
         For the first year it is a database query of the capacity table.
-        For subsequent years it is the net carry forward capacity stored in JSON
-        in the temporary directory'''
+        For subsequent years it is the net carry forward capacity of the previous year,
+        set directly in the model instance from its CarryForward state.
+        Templates of later years (Sim{year}.dat) therefore lack initial capacity and
+        carry forward costs, so they cannot be solved on their own with ssolve.py'''
         if self.Years.index(year):
             prevyear = self.Years[self.Years.index(year) - 1]
-            opcap0 = "load '" + str(self.wrkdir / ('gen_cap_op' + str(prevyear) + '.json')) \
-                     + "' : [zones,all_tech] gen_cap_initial stor_cap_initial hyb_cap_initial intercon_cap_initial;"
+            opcap0 = "# gen_cap_initial stor_cap_initial hyb_cap_initial intercon_cap_initial" \
+                     + " carried forward from " + str(prevyear)
         else:
             opcap0 = '''#operating capacity for generating techs regions
 load "opencem-isp2020.cyisekdyolmb.ap-southeast-2.rds.amazonaws.com" database=opencem_input
@@ -551,13 +798,13 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
         return opcap0
 
     def carry_forward_cap_costs(self, year):
-        '''Fill template to retrieve carry forward annualised capital costs from gen_cap_op json'''
+        '''Fill template to note carry forward annualised capital costs from previous year'''
         carry_fwd_cost = ''
         if self.Years.index(year):
             carry_fwd_cost = "#Carry forward annualised capital costs\n"
             prevyear = self.Years[self.Years.index(year) - 1]
-            carry_fwd_cost += "load '" + str(self.wrkdir / ('gen_cap_op' + str(prevyear) + '.json'))\
-                              + "' : cost_cap_carry_forward_sim;\n"
+            carry_fwd_cost += "# cost_cap_carry_forward_sim carried forward from " \
+                              + str(prevyear) + "\n"
         return carry_fwd_cost
 
     def produce_custom_costs(self, y):
@@ -849,101 +1096,389 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
         )
         return model_options(**OPTIONS)
 
+    def year_fingerprints(self):
+        """Return fingerprint of the inputs of each year chained with those of earlier years.
+
+        Inputs are the generated year template, model options and solve settings.
+        Simulations with equal fingerprints up to a year have the same results
+        (and carry forward state) up to that year"""
+        settings = [getattr(self, s) for s in SOLUTION_SETTINGS]
+        # Sets (e.g. output_datasets) in a repeatable order
+        settings = [sorted(s) if isinstance(s, set) else s for s in settings]
+        digest = hashlib.sha256(repr(settings).encode())
+        out = []
+        for y in self.Years:
+            digest.update(repr((y, self.get_model_options(y))).encode())
+            with open(self.generateyeartemplate(y, self.templatetest), 'rb') as template:
+                digest.update(template.read())
+            out.append(digest.hexdigest())
+        return out
+
     def solve(self):
         """
         Multi year simulation:
         Instantiate a template instance for each year in the simulation.
         Calcualte capacity using clustering and dispatch with full year.
         Alternatively caculate capacity and dispatch simultanteously using full year instance
-        Save capacity results for carry forward in json file.
+        Carry forward capacity results to next year, saving them to resume simulations.
         Save full results for year in parquet/JSON file.
         Assemble full simulation output as metadata + full year results in each simulated year
         """
+        inputs = fingerprint(self.input_files())
+        if self.pipeline:
+            self._output_pool = ProcessPoolExecutor(max_workers=1)
+        if self.speculative and self.cluster and not self.templatetest:
+            self._spec_pool = ProcessPoolExecutor(max_workers=1)
+        try:
+            self._solve_years(inputs)
+        finally:
+            if self._output_pool is not None:
+                self._drain_output()
+                self._output_pool.shutdown()
+                self._output_pool = None
+            if self._spec_pool is not None:
+                self._spec_pool.shutdown()
+                self._spec_pool = None
+                self._speculation = {}
+        if self._output_errors:
+            raise self._output_errors[0]
+
+        if self.json_output:
+            # Merge JSON output for all investment periods
+            if self.log:
+                print("openCEM multi: Saving final results to JSON file")
+            if not self.templatetest:
+                self.mergejsonyears()
+        else:
+            meta = self.generate_metadata()
+            with open(self.wrkdir / (self.cfgfile.stem + '_meta.json'), 'w') as metadata:
+                json.dump(meta, metadata, indent=0)
+
+    def _solve_years(self, inputs):
+        """Solve each year in the simulation, skipping or resuming completed years"""
         for y in self.Years:
-            if self.resume:
-                if self.json_output:
-                    if (self.wrkdir / (str(y)+'.json')).exists():
-                        print("Skipping year %s" % y)
-                        continue
-                else:
-                    if (self.wrkdir / (str(y))).exists():
-                        print("Skipping year %s" % y)
-                        continue
+            ckpt = Checkpoint(self.wrkdir, y, inputs, save=self.checkpoint)
+            if self.resume and ckpt.exists:
+                # resume from last completed phase of year
+                if ckpt.done('output'):
+                    print("Skipping year %s" % y)
+                    continue
+                shutil.rmtree(self.wrkdir/str(y), ignore_errors=True)
+            elif self.resume and not ckpt.stale and self.year_output_exists(y):
+                print("Skipping year %s" % y)
+                continue
             else:
+                if self.resume and ckpt.stale:
+                    print("openCEM multi: Inputs changed since checkpoint of year %s" % y)
+                ckpt.clear()
                 shutil.rmtree(self.wrkdir/str(y), ignore_errors=True)
 
-            if self.log:
-                print("openCEM multi: Starting simulation for year %s" % y)
-            # Populate template with this inv period's year and timestamps
+            self.solve_year(y, ckpt)
+
+    def solve_year(self, y, ckpt):
+        """Solve one investment period, resuming from the last phase completed in checkpoint"""
+        if self.log:
+            print("openCEM multi: Starting simulation for year %s" % y)
+        if y in self._speculation:
+            spec = self.accept_speculative(y)
+            if spec is not None:
+                ckpt.complete('template', file=str(self.wrkdir / ('Sim' + str(y) + '.dat')))
+                ckpt.dump('cluster', spec.capacity)
+                ckpt.complete('cluster', selection=spec.selection)
+                solved = (spec.carry_forward, spec.snapshot)
+                ckpt.dump('dispatch', solved)
+                ckpt.complete('dispatch')
+                self.save_year(y, *solved, ckpt=ckpt)
+                return
+        # Populate template with this inv period's year and timestamps
+        if ckpt.done('template'):
+            year_template = Path(ckpt.info('template')['file'])
+        else:
             year_template = self.generateyeartemplate(y, self.templatetest)
-            # Solve full year capacity and dispatch instance
-            # Create model based on policy configuration options
-            model = CreateModel(y, self.get_model_options(y)).create_model()
-            # create model instance based in template data
-            inst = model.create_instance(year_template)
+            ckpt.complete('template', file=str(year_template))
+
+        if ckpt.done('dispatch'):
+            solved = ckpt.load('dispatch')
+        else:
+            if ckpt.done('instance'):
+                inst = ckpt.load('instance')
+            else:
+                inst = self.create_instance(y, year_template)
+                ckpt.dump('instance', inst)
+                ckpt.complete('instance')
             # These solve capacity on a clustered form
             if self.cluster and not self.templatetest:
-                clus = InstanceCluster(inst, self.cluster_max_d)
-                ccap = ClusterRun(
-                    clus,
-                    year_template,
-                    model_options=self.get_model_options(y),
-                    solver=self.solver,
-                    solver_options=self.cluster_solver_options,
-                    log=self.log).run_cluster()
-                inst = setinstancecapacity(inst, ccap.data)
-
-            # Solve the model (or just dispatch if capacity has been solved)
-            opt = SolverFactory(self.solver)
-            opt.options = self.dispatch_solver_options
+                if ckpt.done('cluster'):
+                    data = ckpt.load('cluster')
+                    if ckpt.info('cluster').get('selection') is not None:
+                        self.cluster_selection[y] = ckpt.info('cluster')['selection']
+                else:
+                    data = self.cluster_capacity(y, inst, year_template)
+                    ckpt.dump('cluster', data)
+                    ckpt.complete('cluster', selection=self.cluster_selection.get(y))
+                inst = setinstancecapacity(inst, data)
+                if self._spec_pool is not None and y != self.Years[-1]:
+                    self.speculate(y, inst)
+            self.dispatch(inst, y)
+            solved = self.solved_year(y, inst)
+            del inst  # to keep memory down
+            ckpt.dump('dispatch', solved)
+            ckpt.complete('dispatch')
+
+        self.save_year(y, *solved, ckpt=ckpt)
+
+    def create_instance(self, y, year_template):
+        """Create model instance for year from template data and carry forward state"""
+        # Create model based on policy configuration options
+        model = CreateModel(y, self.get_model_options(y), self.duals).create_model()
+        data = DataPortal(model=model)
+        data.load(filename=str(year_template))
+        carry_forward = self.previous_carry_forward(y)
+        if carry_forward is not None:
+            carry_forward.update(data)
+        return model.create_instance(data)
+
+    def speculate(self, y, inst):
+        """Start solving the year after y in a background process, using carry forward
+        predicted from the capacity decisions fixed by the cluster solution of y"""
+        nexty = self.Years[self.Years.index(y) + 1]
+        predicted = predict_carry_forward(inst, y)
+        if self.log:
+            print("openCEM multi: Speculatively solving year %s" % nexty)
+        state = {name: getattr(self, name) for name in SPECULATIVE_STATE}
+        self._speculation[nexty] = (predicted, self._spec_pool.submit(
+            solve_speculative, self._sim_args, nexty, predicted, state))
+
+    def solve_speculative_year(self, y):
+        """Solve year with the current carry forward state, returning a SpeculativeYear.
+
+        The solved instance stays in this process, only its saved state, output snapshot
+        and solution values are returned"""
+        year_template = self.generateyeartemplate(y, self.templatetest)
+        inst = self.create_instance(y, year_template)
+        data = self.cluster_capacity(y, inst, year_template)
+        inst = setinstancecapacity(inst, data)
+        self.dispatch(inst, y)
+        carry_forward, snapshot = self.solved_year(y, inst)
+        return SpeculativeYear(carry_forward, snapshot, data, solution_snapshot(inst),
+                               self.cluster_selection.get(y), self._prev_cluster,
+                               self.cluster_period_solve_time,
+                               {stage: wins[y] for stage, wins in self.portfolio_wins.items()
+                                if y in wins})
+
+    def accept_speculative(self, y):
+        """Return SpeculativeYear solved for year if its predicted carry forward is within
+        tolerance of the actual one, taking on the cluster selection, incremental clusters
+        and portfolio wins of the speculative solve. Otherwise return None, keeping the
+        speculative solution to warm start solving year again"""
+        predicted, future = self._speculation.pop(y)
+        try:
+            spec = future.result()
+        except Exception as exc:  # pylint: disable=broad-except
+            print("openCEM multi: Speculative solve of year %s failed: %r" % (y, exc))
+            return None
+        diff = predicted.difference(self.previous_carry_forward(y))
+        if diff <= self.speculative_tolerance:
             if self.log:
-                print("openCEM multi: Starting full year dispatch simulation")
-            opt.solve(inst, tee=self.log, keepfiles=False)
-            del opt
-
-            # Carry forward operating capacity to next Inv period
-            opcap = json_carry_forward_cap(inst)
-            if y != self.Years[-1]:
-                with open(self.wrkdir / ('gen_cap_op' + str(y) + '.json'), 'w') as op:
-                    json.dump(opcap, op)
-            # Dump simulation result in JSON forma
+                print("openCEM multi: Accepted speculative solution for year %s" % y)
+            if spec.selection is not None:
+                self.cluster_selection[y] = spec.selection
+            if self.cluster_incremental:
+                self._prev_cluster = spec.cluster
+            self.cluster_period_solve_time = spec.period_solve_time
+            for stage, label in spec.wins.items():
+                self.portfolio_wins[stage][y] = label
+            if self.warmstart:
+                self._prev_capacity = spec.capacity
+                self._prev_solution = spec.solution
+            return spec
+        print("openCEM multi: Rejected speculative solution for year %s"
+              " (carry forward differs by %.3g)" % (y, diff))
+        self._prev_capacity = spec.capacity
+        self._prev_solution = spec.solution
+        return None
+
+    def cluster_capacity(self, y, inst, year_template):
+        """Solve capacity decisions for year on a clustered form of instance"""
+        clus = InstanceCluster(inst,
+                               self.cluster_max_d,
+                               error_threshold=self.cluster_error_threshold,
+                               time_budget=self.cluster_time_budget,
+                               period_solve_time=self.cluster_period_solve_time,
+                               daily=self.cluster_period == 'day',
+                               previous=self._prev_cluster)
+        if self.cluster_incremental:
+            self._prev_cluster = clus
+            if self.log and clus.reuse is not None:
+                print("openCEM multi: Reusing clusters from previous year (%s)"
+                      % clus.reuse)
+        start = time.time()
+        ccap = ClusterRun(
+            clus,
+            year_template,
+            model_options=self.get_model_options(y),
+            solver=self.solver,
+            solver_options=self.cluster_solver_options,
+            log=self.log,
+            seed=self._prev_capacity,
+            carry_forward=self.previous_carry_forward(y),
+            portfolio=self.portfolio_order('cluster')).run_cluster()
+        if ccap.winner is not None:
+            self.portfolio_wins['cluster'][y] = config_label(ccap.winner)
+        self._prev_capacity = ccap.data if self.warmstart else None
+        if clus.selection is not None:
+            # calibrate solve time per cluster for next year's selection
+            elapsed = time.time() - start
+            self.cluster_period_solve_time = elapsed / clus.max_d
+            clus.selection['solve_time'] = elapsed
+            self.cluster_selection[y] = clus.selection
             if self.log:
-                print("openCEM multi: Saving year %s results to directory" % y)
-            if self.json_output:
-                with open(self.wrkdir / (str(y) + '.json'), 'w') as json_out:
-                    json.dump(jsonify(inst, y), json_out)
-                    json_out.write('\n')
+                print("openCEM multi: Year %s solved with %s clusters"
+                      % (y, clus.max_d))
+        return ccap.data
+
+    def portfolio_order(self, stage):
+        """Return solver portfolio for stage, configurations with more wins first"""
+        if self.portfolio is None:
+            return None
+        wins = {}
+        for label in self.portfolio_wins[stage].values():
+            wins[label] = wins.get(label, 0) + 1
+        order = sorted(self.portfolio, key=lambda config: -wins.get(config_label(config), 0))
+        return order[:self.portfolio_size]
+
+    def dispatch(self, inst, y):
+        """Solve the model (or just dispatch if capacity has been solved)"""
+        opt = SolverFactory(self.solver)
+        opt.options = self.dispatch_solver_options
+        solve_options = {}
+        if self._prev_solution is not None:
+            # Initial values from previous year (or rejected speculative solve)
+            # matched by time of year
+            apply_warm_start(inst, self._prev_solution)
+            if opt.warm_start_capable():
+                solve_options['warmstart'] = True
+        if self.log:
+            print("openCEM multi: Starting full year dispatch simulation")
+        winner = None
+        if self.portfolio is not None:
+            winner = solve_portfolio(inst, self.portfolio_order('dispatch'), log=self.log,
+                                     duals=self.duals)
+            if winner is None:
+                print("openCEM multi: No solver in portfolio solved year %s, using %s"
+                      % (y, self.solver))
             else:
-                parquetify(inst, self.wrkdir, y)
-
-            if self.json_output:
-                printstats(inst)  # REVIEW this summary printing is slow compared to parquet summary
-            [cdu, cost] = Summary(self.wrkdir, [i for i in self.Years if i <= y], cache=False).get_summary()
-            cdu.to_csv(self.wrkdir/("cdeu.csv"))
-            cost.to_csv(self.wrkdir/("cost.csv"))
+                self.portfolio_wins['dispatch'][y] = config_label(winner)
+        if self.solution_reader:
+            solve_direct(inst, self.dispatch_solver_options, self.duals, log=self.log)
+        elif winner is None:
+            solve_instance(opt, inst, self.duals, tee=self.log, keepfiles=False,
+                           **solve_options)
+        del opt
+        self._prev_solution = solution_snapshot(inst) if self.warmstart else None
+
+    def solved_year(self, y, inst):
+        """Return CarryForward state and output Snapshot of the solved instance of year,
+        all that is needed to save it"""
+        return (CarryForward.from_instance(inst, y),
+                output_snapshot(inst, self.json_output, self.output_datasets))
+
+    def save_year(self, y, carry_forward, snapshot, ckpt):
+        """Save carry forward capacity for next year, then results and summaries for year
+        from its output Snapshot (see solved_year).
+
+        In pipeline mode results are written by a background process"""
+        # Carry forward operating capacity to next Inv period (or scenarios forking from it)
+        self._carry_forward = carry_forward
+        self._carry_forward.dump(self.carry_forward_file(y))
+        # Dump simulation result in JSON forma
+        if self.log:
+            print("openCEM multi: Saving year %s results to directory" % y)
+        args = (snapshot, y, self.wrkdir, [i for i in self.Years if i <= y], self.json_output,
+                self.output_layout, self.output_workers, self.output_datasets)
+        if self._output_pool is None:
+            write_year_output(*args)
+            ckpt.complete('output')
+        else:
+            self._queue_output(ckpt, write_year_output, *args)
+
+    def _queue_output(self, ckpt, func, *args):
+        """Submit output writing to background process, waiting if the queue is full"""
+        self._drain_output(self.OUTPUT_QUEUE - 1)
+        self._output.append((ckpt, self._output_pool.submit(func, *args)))
+
+    def _drain_output(self, pending=0):
+        """Wait for queued outputs until at most pending remain, collecting errors"""
+        while len(self._output) > pending:
+            ckpt, future = self._output.popleft()
+            try:
+                future.result()
+                ckpt.complete('output')
+            except Exception as exc:  # pylint: disable=broad-except
+                print("openCEM multi: Saving results failed for year %s: %r"
+                      % (ckpt.manifest['year'], exc))
+                self._output_errors.append(exc)
+
+    def carry_forward_file(self, y):
+        """Return file where the CarryForward state of year is saved"""
+        return self.wrkdir / ('carry_forward' + str(y) + '.pkl')
+
+    def previous_carry_forward(self, y):
+        """Return CarryForward state of the year before y (None for the first year),
+        loading it from file when resuming a simulation.
+
+        Simulation directories saved before carry forward state was pickled only have
+        gen_cap_op{year}.json files, which are read instead"""
+        if not self.Years.index(y):
+            return None
+        prevyear = self.Years[self.Years.index(y) - 1]
+        if self._carry_forward is None or self._carry_forward.year != prevyear:
+            legacy = self.wrkdir / ('gen_cap_op' + str(prevyear) + '.json')
+            if self.carry_forward_file(prevyear).exists():
+                self._carry_forward = CarryForward.load(self.carry_forward_file(prevyear))
+            elif legacy.exists():
+                self._carry_forward = CarryForward.from_json(legacy, prevyear)
+            else:
+                raise FileNotFoundError("openCEM multi: No carry forward state of year %s in %s,"
+                                        " solve it before year %s" % (prevyear, self.wrkdir, y))
+        return self._carry_forward
 
-            del inst  # to keep memory down
+    def year_output_exists(self, y):
+        """True if results for year have been saved"""
         if self.json_output:
-            # Merge JSON output for all investment periods
-            if self.log:
-                print("openCEM multi: Saving final results to JSON file")
-            if not self.templatetest:
-                self.mergejsonyears()
-        else:
-            meta = self.generate_metadata()
-            with open(self.wrkdir / (self.cfgfile.stem + '_meta.json'), 'w') as metadata:
-                json.dump(meta, metadata, indent=0)
+            return (self.wrkdir / (str(y)+'.json')).exists()
+        return (self.wrkdir / (str(y))).exists()
+
+    def input_files(self):
+        """Return list of input files of the simulation, used to fingerprint checkpoints"""
+        files = [self.cfgfile, self.Template]
+        for name in [self.custom_costs, self.exogenous_capacity, self.exogenous_transmission]:
+            if name is not None:
+                files.append(name)
+        return files
 
     def mergejsonyears(self):
-        '''Merge the full year JSON output for each simulated year in a single dictionary'''
+        '''Merge the full year JSON output for each simulated year in a single dictionary.
+
+        A sidecar index with the offsets of each line and component is saved alongside'''
         data = self.generate_metadata()
         # Save json output named after .cfg file
-        with open(self.cfgfile.with_name(self.cfgfile.stem + '.json'), 'w') as out_file:
-            json.dump(data, out_file)
-            out_file.write('\n')
+        filename = self.cfgfile.with_name(self.cfgfile.stem + '.json')
+        meta = (json.dumps(data) + '\n').encode()
+        lines = [[0, len(meta) - 1]]
+        components = {}
+        with open(filename, 'wb') as out_file:
+            out_file.write(meta)
             for year in self.Years:
-                with open(self.wrkdir / (str(year) + '.json'), 'r') as in_file:
-                    copyfileobj(in_file, out_file)
+                year_file = self.wrkdir / (str(year) + '.json')
+                # Year outputs are appended as bytes, without decoding or parsing them
+                with open(year_file, 'rb') as in_file:
+                    copyfileobj(in_file, out_file, COPY_BUFFER)
+                    lines.append([lines[-1][0] + lines[-1][1] + 1, in_file.tell() - 1])
+                if index_path(year_file).exists():
+                    with open(index_path(year_file)) as idx_file:
+                        components[year] = json.load(idx_file)
+        save_json_index(filename, lines, self.Years, components)
 
     def generate_metadata(self):
         '''Append simulation metadata to full JSON output'''
@@ -967,5 +1502,11 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
             "Exogenous Capacity decisions": pd.read_csv(self.exogenous_capacity).to_dict(orient='records') if self.exogenous_capacity is not None else None,  # noqa
             "Exogenous Transmission decisions": pd.read_csv(self.exogenous_transmission).to_dict(orient='records') if self.exogenous_transmission is not None else None,  # noqa
         }
+        if self.cluster and self.cluster_period != 'week':
+            meta["Cluster_period"] = self.cluster_period
+        if self.cluster and self.cluster_selection:
+            meta["Cluster_selection"] = self.cluster_selection
+        if self.portfolio is not None:
+            meta["Solver_portfolio"] = self.portfolio_wins
 
         return {'meta': meta}
@@ -1,7 +1,42 @@
 """Save Simulatin data as a series of parquet files"""
-import pandas as pd
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cemo.results import Results
+
+# Output layouts, partitioned directories or a single file per dataset
+LAYOUTS = ['partitioned', 'consolidated']
+
+# Minimum rows per row group of consolidated datasets
+ROW_GROUP_ROWS = 65536
+
+# Datasets of capacities and costs
+MINIMAL_DATASETS = ['cap_op', 'cap_new', 'cap_ret', 'cap_exo', 'cap_ret_exo',
+                    'intercon_cap_op', 'intercon_cap_new', 'intercon_cap_exo',
+                    'cost_build', 'cost_intercon_build', 'cost_cap_carry_forward',
+                    'opex_fom', 'opex_vom', 'fixed_charge_rate', 'cost_retire', 'misc']
+
+# Named output profiles, lists of datasets to save (None for all).
+# Annual summaries are saved in all profiles
+OUTPUT_PROFILES = {
+    'minimal': MINIMAL_DATASETS,
+    'standard': MINIMAL_DATASETS + ['disp', 'charge', 'intercon_disp', 'unserved', 'srmc',
+                                    'region_net_demand', 'cost_fuel', 'fuel_heat_rate',
+                                    'fuel_emit_rate'],
+    'full': None,
+}
+
 # Variable map used for postprocessing and analysis
 MAP = {
     'complex': {
@@ -207,99 +242,424 @@ MAP = {
 }
 
 
-def pyomo_to_parquet_dual(instance, var, columns):
-    """Obtain multi indexed variable values from dual as a list of tuples from instance and return pandas dataframe"""
-    dual = getattr(instance, 'dual')
-    names = getattr(instance, var)
-    data = [i+(dual[names[i]],) for i in names]
-    df = pd.DataFrame(data=data, columns=columns)
-    return df
+def index_dtype(column):
+    """Return numpy type of an index column"""
+    return object if column == 'time' else np.int16
 
 
-def pyomo_to_parquet_complex(instance, var, columns):
-    """Obtain multi indexed variable values as a list of tuples from instance and return pandas dataframe"""
-    obj = getattr(instance, var)
-    list_out = obj.extract_values().items()
-    data = [i[0]+(i[1],) for i in list_out]
-    df = pd.DataFrame(data=data, columns=columns)
-    return df
+def index_arrays(keys, columns):
+    """Return a typed numpy array for each position of the index keys of a component.
+
+    Time indices are kept as strings and all other indices (zone, tech, region) as int16"""
+    if not keys:
+        positions = [[] for _ in columns]
+    elif isinstance(keys[0], tuple):
+        positions = zip(*keys)
+    else:
+        positions = [keys]
+    return [np.array(position, dtype=index_dtype(name))
+            for position, name in zip(positions, columns)]
+
+
+def value_array(values, scale=1):
+    """Return float64 numpy array of values (None becomes NaN) multiplied by scale"""
+    return np.array(values, dtype=np.float64) * scale
+
+
+def arrow_array(array, column):
+    """Return arrow array of a numpy column, NaN values become nulls"""
+    if column == 'time':
+        return pa.array(array, type=pa.string())
+    return pa.array(array, from_pandas=True)
+
+
+def frame_arrays(frame, columns, scale=1):
+    """Return index columns of a results Frame as typed numpy arrays and its scaled values"""
+    if not frame.size:
+        return index_arrays([], columns[:-1]) + [value_array([], scale)]
+    return [frame.levels[k].astype(index_dtype(name))[frame.codes[k]]
+            for k, name in enumerate(columns[:len(frame.columns)])] \
+        + [value_array(frame.values, scale)]
+
+
+def pyomo_to_arrays_dual(results, var, columns, scale=1):
+    """Obtain index and dual values of an indexed constraint as typed numpy arrays"""
+    return frame_arrays(results.dual(var), columns, scale)
+
+
+def pyomo_to_arrays(results, var, columns, scale=1):
+    """Obtain index and values of an indexed variable or parameter as typed numpy arrays"""
+    return frame_arrays(results.frame(var), columns, scale)
+
+
+def sort_partitions(arrays, columns, part):
+    """Sort column arrays by the part columns with a stable sort.
+
+    Return sorted arrays and the start and end rows of each partition"""
+    pos = [columns.index(col) for col in part]
+    order = np.lexsort([arrays[k] for k in reversed(pos)])
+    arrays = [array[order] for array in arrays]
+    keys = np.stack([arrays[k] for k in pos], axis=1)
+    if not len(keys):
+        return arrays, []
+    bounds = list(np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1)
+    return arrays, list(zip([0] + bounds, bounds + [len(keys)]))
+
+
+def arrow_table(arrays, columns, skip=()):
+    """Return arrow table of column arrays, leaving out columns in skip"""
+    keep = [k for k, col in enumerate(columns) if col not in skip]
+    return pa.Table.from_arrays([arrow_array(arrays[k], columns[k]) for k in keep],
+                                names=[columns[k] for k in keep])
+
+
+def write_dataset(arrays, columns, path, part):
+    """Write columns as a parquet dataset partitioned by the part columns.
+
+    Rows are grouped by partition with a stable sort and each partition is written
+    as a slice of a single arrow table"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    arrays, partitions = sort_partitions(arrays, columns, part)
+    table = arrow_table(arrays, columns, skip=part)
+    for start, end in partitions:
+        folder = path.joinpath(*['%s=%s' % (col, arrays[columns.index(col)][start])
+                                 for col in part])
+        folder.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table.slice(start, end - start),
+                       str(folder / (uuid.uuid4().hex + '.parquet')),
+                       compression='snappy')
+
+
+def write_consolidated(arrays, columns, path, part, row_group_rows=ROW_GROUP_ROWS):
+    """Write columns as a single parquet file sorted by the part columns.
+
+    Consecutive partitions are gathered in row groups of at least row_group_rows rows,
+    whose column statistics let readers skip row groups (see read_dataset)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays, partitions = sort_partitions(arrays, columns, part)
+    table = arrow_table(arrays, columns)
+    tmp = str(path) + '.tmp'
+    writer = pq.ParquetWriter(tmp, table.schema, compression='snappy')
+    try:
+        start = 0
+        for _, end in partitions:
+            if end - start >= row_group_rows or end == table.num_rows:
+                writer.write_table(table.slice(start, end - start))
+                start = end
+        if not partitions:
+            writer.write_table(table)
+    finally:
+        writer.close()
+    os.replace(tmp, str(path))
+
+
+def write_output(arrays, columns, folder, year, key, part, layout):
+    """Write dataset key of year in the partitioned or consolidated layout"""
+    if layout == 'consolidated':
+        write_consolidated(arrays, columns, Path(folder) / str(year) / (key + '.parquet'), part)
+    else:
+        write_dataset(arrays, columns, Path(folder) / str(year) / key, part)
 
 
-def pyomo_to_parquet_scalar(instance, var, columns):
-    """Obtain scalar indexed variable as a list of tuples and return pandas dataframe"""
-    obj = getattr(instance, var)
-    data = obj.extract_values().items()
-    df = pd.DataFrame(data=data, columns=columns)
+def dataset_path(folder, year, key):
+    """Return path of dataset key of year, the consolidated file if there is one"""
+    path = Path(folder) / str(year) / key
+    if path.suffix != '.parquet' and path.with_name(key + '.parquet').exists():
+        return path.with_name(key + '.parquet')
+    return path
+
+
+def _match(low, high, op, val):
+    """Return whether values between low and high may satisfy a filter"""
+    if op in ['=', '==']:
+        return low <= val <= high
+    if op == 'in':
+        return any(low <= v <= high for v in val)
+    if op == '<':
+        return low < val
+    if op == '<=':
+        return low <= val
+    if op == '>':
+        return high > val
+    if op == '>=':
+        return high >= val
+    return True
+
+
+def _mask(df, filters):
+    """Return boolean mask of rows of df satisfying all filters"""
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, val in filters:
+        values = df[col].astype(type(val[0]) if op == 'in' else type(val))
+        if op in ['=', '==']:
+            mask &= (values == val).to_numpy()
+        elif op == 'in':
+            mask &= values.isin(val).to_numpy()
+        else:
+            mask &= {'<': values < val, '<=': values <= val,
+                     '>': values > val, '>=': values >= val}[op].to_numpy()
+    return mask
+
+
+def read_dataset(folder, year, key, filters=None):
+    """Read dataset key of year in either layout as a DataFrame.
+
+    filters is a list of (column, op, value) tuples (op one of =, in, <, <=, >, >=).
+    Consolidated files only read row groups whose statistics may satisfy filters and
+    partitioned datasets only read matching partitions"""
+    path = dataset_path(folder, year, key)
+    filters = filters or []
+    if path.is_dir():
+        part = pq.ParquetDataset(str(path)).partitions
+        names = part.partition_names if part is not None else set()
+        pushed = [f for f in filters if f[0] in names and f[1] != 'in']
+        df = pd.read_parquet(path, filters=pushed or None)
+    else:
+        pfile = pq.ParquetFile(str(path))
+        names = pfile.metadata.schema.names
+        groups = []
+        for idx in range(pfile.num_row_groups):
+            meta = pfile.metadata.row_group(idx)
+            keep = True
+            for col, op, val in filters:
+                stats = meta.column(names.index(col)).statistics
+                if stats is not None and stats.has_min_max:
+                    keep = keep and _match(stats.min, stats.max, op, val)
+            if keep:
+                groups.append(idx)
+        df = pfile.read_row_groups(groups).to_pandas()
+    if filters:
+        df = df[_mask(df, filters)].reset_index(drop=True)
     return df
 
 
-def convert_duals(instance, folder, year):
+def concat_arrays(parts):
+    """Concatenate the column arrays of several components"""
+    return [np.concatenate(columns) for columns in zip(*parts)]
+
+
+def timed(func, *args, **kwargs):
+    """Call func and return the time it took in seconds"""
+    start = time.time()
+    func(*args, **kwargs)
+    return time.time() - start
+
+
+class DatasetWriter:
+    """Write datasets on a pool of workers threads as they are extracted.
+
+    Writing (compression and encoding) mostly runs in pyarrow without the GIL.
+    At most workers extracted datasets wait to be written at any time, bounding memory.
+    With a single worker datasets are written as they are submitted.
+    Only datasets in datasets (all if None) are extracted and written"""
+
+    def __init__(self, workers=1, datasets=None):
+        self.workers = workers
+        self.datasets = datasets
+        self.pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.pending = deque()
+        self.timings = {}
+
+    def wants(self, key):
+        """Return whether dataset key is to be written"""
+        return self.datasets is None or key in self.datasets
+
+    def write(self, key, func, *args, **kwargs):
+        """Write dataset key calling func with args, timing the write"""
+        if self.pool is None:
+            self.timings[key] = timed(func, *args, **kwargs)
+            return
+        while len(self.pending) >= self.workers:
+            self._collect()
+        self.pending.append((key, self.pool.submit(timed, func, *args, **kwargs)))
+
+    def _collect(self):
+        key, future = self.pending.popleft()
+        self.timings[key] = future.result()
+
+    def close(self):
+        """Wait for pending writes and return dictionary of write time of each dataset"""
+        try:
+            while self.pending:
+                self._collect()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+        return self.timings
+
+
+def convert_duals(instance, folder, year, layout='partitioned', writer=None, results=None):
     """Scan MAP for dual variables in instance and save to 'folder' under 'year'"""
+    writer = writer or DatasetWriter()
+    results = results or Results(instance)
     for key in MAP['duals']:
+        if not writer.wants(key):
+            continue
+        parts = []
         for var in MAP['duals'][key]['vars']:
             try:
-                parq = pyomo_to_parquet_dual(instance, var, MAP['duals'][key]['cols'])
-                parq[key] = parq[key]*MAP['duals'][key].get('scale', 1)
-                parq = parq.astype({key: float})
-                p = Path(folder) / str(year) / key
-                parq.to_parquet(p,
-                                partition_cols=MAP['duals'][key]['part'],
-                                compression='snappy')
+                parts.append(pyomo_to_arrays_dual(results, var, MAP['duals'][key]['cols'],
+                                                  MAP['duals'][key].get('scale', 1)))
             except Exception as ex:
                 print("    %s NOT PROCESSED, reason: %s" % (var, ex))
+        if parts:
+            writer.write(key, write_output, concat_arrays(parts), MAP['duals'][key]['cols'],
+                         folder, year, key, MAP['duals'][key]['part'], layout)
 
 
-def convert_complex(instance, folder, year):
+def convert_complex(instance, folder, year, layout='partitioned', writer=None, results=None):
     """Scan MAP for complex variables in instance and save to 'folder' under 'year'"""
+    writer = writer or DatasetWriter()
+    results = results or Results(instance)
     print(year)
     for key in MAP['complex']:
+        if not writer.wants(key):
+            continue
+        parts = []
         for var in MAP['complex'][key]['vars']:
-            if getattr(instance, var, None) is not None:
-                parq = pyomo_to_parquet_complex(instance, var, MAP['complex'][key]['cols'])
-                parq[key] = parq[key]*MAP['complex'][key].get('scale', 1)
-                parq = parq.astype({key: float})
-                p = Path(folder) / str(year) / key
-                parq.to_parquet(p,
-                                partition_cols=MAP['complex'][key]['part'],
-                                compression='snappy')
+            if results.has(var):
+                parts.append(pyomo_to_arrays(results, var, MAP['complex'][key]['cols'],
+                                             MAP['complex'][key].get('scale', 1)))
             else:
                 print("    %s NOT PROCESSED" % var)
+        if parts:
+            writer.write(key, write_output, concat_arrays(parts), MAP['complex'][key]['cols'],
+                         folder, year, key, MAP['complex'][key]['part'], layout)
 
 
-def convert_scalar(instance, folder, year):
+def convert_scalar(instance, folder, year, layout='partitioned', writer=None, results=None):
     """Scan MAP for scalar indexed variables in instance and save to 'folder' under 'year'"""
+    writer = writer or DatasetWriter()
+    results = results or Results(instance)
     for key in MAP['scalar']:
+        if not writer.wants(key):
+            continue
+        parts = []
         for svar in MAP['scalar'][key]['vars']:
-            if getattr(instance, svar, None) is not None:
-                parq = pyomo_to_parquet_scalar(instance, svar,
-                                               columns=MAP['scalar'][key]['cols'])
-                parq = parq.astype({key: float})
-                p = Path(folder) / str(year) / key
-                parq.to_parquet(p,
-                                partition_cols=MAP['scalar'][key]['part'],
-                                compression='snappy')
+            if results.has(svar):
+                parts.append(pyomo_to_arrays(results, svar, MAP['scalar'][key]['cols']))
             else:
                 print("    %s NOT PROCESSED" % svar)
+        if parts:
+            writer.write(key, write_output, concat_arrays(parts), MAP['scalar'][key]['cols'],
+                         folder, year, key, MAP['scalar'][key]['part'], layout)
 
 
-def convert_unindexed(instance, folder, year):
+def convert_unindexed(instance, folder, year, writer=None, results=None):
     """Scan MAP for unindexed variables in instance and save to 'folder' under 'year'"""
+    writer = writer or DatasetWriter()
+    results = results or Results(instance)
     for key in MAP['unindexed']:
+        if not writer.wants(key):
+            continue
         d = {}
         for nvar in MAP['unindexed'][key]['vars']:
-            if getattr(instance, nvar, None) is not None:
-                d.update({nvar: [getattr(instance, nvar).extract_values()[None]]})
+            if results.has(nvar):
+                d.update({nvar: [results.values(nvar)[None]]})
             else:
                 d.update({nvar: 0})
         parq = pd.DataFrame(data=d)
         p = Path(folder) / str(year) / (key+'.parquet')
-        parq.to_parquet(p,
-                        compression='snappy')
+        writer.write(key, parq.to_parquet, p, compression='snappy')
+
+
+def parquetify(instance, folder, year, layout='partitioned', workers=1, datasets=None,
+               results=None):
+    """Scan instance for data and save in parquet for given year.
+
+    The partitioned layout writes a directory per dataset partitioned by zone/tech,
+    the consolidated layout a single sorted file per dataset (see write_consolidated).
+    Datasets are written by workers threads (see DatasetWriter), only those in
+    datasets if given (see output_datasets).
+    Values are taken from results (a cemo.results.Results of instance) if given,
+    instance may then be None. Return dictionary of write time of each dataset"""
+    if layout not in LAYOUTS:
+        raise ValueError("openCEM-output_layout: must be one of %s" % LAYOUTS)
+    writer = DatasetWriter(workers, datasets)
+    results = results or Results(instance)
+    try:
+        convert_complex(instance, folder, year, layout, writer, results)
+        convert_duals(instance, folder, year, layout, writer, results)
+        convert_scalar(instance, folder, year, layout, writer, results)
+        convert_unindexed(instance, folder, year, writer, results)
+    finally:
+        timings = writer.close()
+    print("    write times: " + ", ".join("%s %.1fs" % (key, seconds) for key, seconds
+                                          in sorted(timings.items(), key=lambda t: -t[1])))
+    return timings
+
+
+def parquet_snapshot(datasets=None):
+    """Return names of the components read by parquetify for datasets (all if None),
+    as keyword arguments of cemo.results.Results.snapshot"""
+    names = {'frames': [], 'duals': [], 'values': []}
+    for group, kind in [('complex', 'frames'), ('scalar', 'frames'), ('duals', 'duals'),
+                        ('unindexed', 'values')]:
+        for key, entry in MAP[group].items():
+            if datasets is None or key in datasets:
+                names[kind].extend(entry['vars'])
+    return names
+
+
+def all_datasets():
+    """Return list of dataset names in MAP"""
+    return [key for group in MAP.values() for key in group]
+
 
+def output_datasets(profile):
+    """Return set of datasets of an output profile, None for all.
 
-def parquetify(instance, folder, year):
-    """Scan instance for data and save in parquet for given year"""
-    convert_complex(instance, folder, year)
-    convert_duals(instance, folder, year)
-    convert_scalar(instance, folder, year)
-    convert_unindexed(instance, folder, year)
+    profile is the name of a profile in OUTPUT_PROFILES or a comma or space
+    separated list of dataset names"""
+    names = [name for name in re.split(r'[\s,]+', profile.strip()) if name]
+    if len(names) == 1 and names[0] in OUTPUT_PROFILES:
+        datasets = OUTPUT_PROFILES[names[0]]
+        return None if datasets is None else set(datasets)
+    unknown = [name for name in names if name not in all_datasets()]
+    if unknown or not names:
+        raise ValueError("openCEM-output_profile: %s must be one of %s or a list of datasets in %s"
+                         % (unknown or profile, list(OUTPUT_PROFILES), all_datasets()))
+    return set(names)
+
+
+def remove_datasets(folder, year, datasets):
+    """Remove saved datasets of year in either layout"""
+    for key in datasets:
+        path = dataset_path(folder, year, key)
+        if path.is_dir():
+            shutil.rmtree(str(path))
+        elif path.exists():
+            path.unlink()
+
+
+def dataset_columns(key):
+    """Return columns and partition columns of an indexed dataset in MAP"""
+    for group in ['complex', 'duals', 'scalar']:
+        if key in MAP[group]:
+            return MAP[group][key]['cols'], MAP[group][key]['part']
+    raise KeyError(key)
+
+
+def consolidate(folder, years=None):
+    """Convert partitioned datasets of a simulation folder to the consolidated layout.
+
+    Return list of converted dataset paths"""
+    folder = Path(folder)
+    if years is None:
+        years = sorted(int(p.name) for p in folder.iterdir() if p.is_dir() and p.name.isdigit())
+    converted = []
+    for year in years:
+        for path in sorted(p for p in (folder / str(year)).iterdir() if p.is_dir()):
+            try:
+                columns, part = dataset_columns(path.name)
+            except KeyError:
+                continue
+            df = pd.read_parquet(path)
+            arrays = [df[col].to_numpy(dtype=index_dtype(col)) for col in columns[:-1]]
+            arrays.append(value_array(df[columns[-1]]))
+            write_consolidated(arrays, columns, path.with_name(path.name + '.parquet'), part)
+            shutil.rmtree(str(path))
+            converted.append(path)
+    return converted
@@ -0,0 +1,130 @@
+'''Race a portfolio of solver configurations and keep the first optimal solution'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from queue import Empty
+
+from pyomo.core.base.suffix import active_import_suffix_generator
+from pyomo.opt import SolverFactory, TerminationCondition
+
+from cemo.duals import load_results
+
+# Solver name and dictionary of solver options
+SolverConfig = namedtuple('SolverConfig', ['solver', 'options'])
+
+
+def config_label(config):
+    '''Return label of a solver configuration, e.g. cbc threads=2'''
+    return ' '.join([config.solver] + ['%s=%s' % (k, v) for k, v in config.options.items()])
+
+
+def kill(proc):
+    '''Terminate a racing process and the solver processes it started'''
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def race_commands(cmds, cwds, stdout=subprocess.DEVNULL):
+    '''Run commands concurrently, each in its own working directory.
+
+    Return index of first command to finish successfully (None if all fail),
+    terminating the rest'''
+    procs = [subprocess.Popen(cmd, cwd=cwd, stdout=stdout, start_new_session=True)
+             for cmd, cwd in zip(cmds, cwds)]
+    winner = None
+    try:
+        running = set(range(len(procs)))
+        while running and winner is None:
+            for k in sorted(running):
+                if procs[k].poll() is not None:
+                    running.discard(k)
+                    if procs[k].returncode == 0:
+                        winner = k
+                        break
+            time.sleep(0.1)
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                kill(proc)
+            proc.wait()
+    return winner
+
+
+def _solve_file(idx, config, filename, suffixes, tee, queue):
+    '''Solve problem file with a solver configuration, reporting results in queue'''
+    # Own process group so that the solver is terminated with this process
+    os.setpgrp()
+    try:
+        opt = SolverFactory(config.solver)
+        opt.options.update(config.options)
+        results = opt.solve(filename, suffixes=suffixes, tee=tee)
+        optimal = results.solver.termination_condition == TerminationCondition.optimal
+        queue.put((idx, results if optimal else None,
+                   None if optimal else str(results.solver.termination_condition)))
+    except Exception as exc:  # pylint: disable=broad-except
+        queue.put((idx, None, repr(exc)))
+
+
+def solve_portfolio(instance, configs, log=False, duals=None):
+    '''Solve instance with a portfolio of solver configurations racing on the same LP file.
+
+    The solution of the first configuration to reach optimality is loaded into instance
+    and the rest are terminated, importing duals of the constraints in duals only
+    (see cemo.duals, all if None). Return the winning configuration, None if none succeeded'''
+    tmpdir = tempfile.mkdtemp()
+    filename = os.path.join(tmpdir, 'portfolio.lp')
+    _, smap_id = instance.write(filename, io_options={'symbolic_solver_labels': False})
+    if duals is None:
+        suffixes = [name for name, _ in active_import_suffix_generator(instance)]
+    else:
+        suffixes = ['dual'] if duals else []
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_solve_file,
+                                     args=(k, config, filename, suffixes, log, queue))
+             for k, config in enumerate(configs)]
+    winner = None
+    try:
+        for proc in procs:
+            proc.start()
+        pending = len(procs)
+        while pending:
+            try:
+                idx, results, error = queue.get(timeout=1)
+            except Empty:
+                if not any(proc.is_alive() for proc in procs) and queue.empty():
+                    break  # racers died without reporting
+                continue
+            pending -= 1
+            if results is not None:
+                winner = configs[idx]
+                results._smap_id = smap_id
+                if duals is None:
+                    instance.solutions.load_from(results)
+                else:
+                    load_results(instance, results, duals)
+                break
+            if log:
+                print("openCEM portfolio: %s failed (%s)" % (config_label(configs[idx]), error))
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                kill(proc)
+            proc.join()
+        if smap_id in instance.solutions.symbol_map:
+            instance.solutions.delete_symbol_map(smap_id)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return winner
@@ -0,0 +1,106 @@
+'''Named solver option profiles for each solve stage of openCEM and their tuning'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import copy
+import json
+import os
+import time
+from pathlib import Path
+
+from pyomo.opt import SolverFactory, TerminationCondition
+
+# Solve stages: cluster extensive form, full year dispatch and single (ssolve.py) solve
+STAGES = ['cluster', 'dispatch', 'single']
+
+# Built in profiles by solver, profile name and stage
+PROFILES = {
+    'cbc': {
+        'default': {'cluster': {}, 'dispatch': {}, 'single': {'threads': 4, 'ratio': 0.0001}},
+    },
+}
+
+# Options tried by the tuner for each solver
+TUNING_GRID = {
+    'cbc': [{'threads': 4},
+            {'threads': 4, 'ratio': 0.0001},
+            {'threads': 4, 'presolve': 'more'},
+            {'threads': 4, 'ratio': 0.0001, 'presolve': 'more'}],
+    'cplex': [{'threads': 4},
+              {'threads': 4, 'lpmethod': 4},
+              {'threads': 4, 'lpmethod': 2}],
+    'gurobi': [{'Threads': 4},
+               {'Threads': 4, 'Method': 2},
+               {'Threads': 4, 'Method': 1}],
+    'glpk': [{}],
+}
+
+
+def load_profiles(filename=None):
+    '''Return built in profiles updated with profiles saved in JSON file (if it exists)'''
+    profiles = copy.deepcopy(PROFILES)
+    if filename is not None and Path(filename).exists():
+        with open(filename) as f:
+            for solver, named in json.load(f).items():
+                for name, stages in named.items():
+                    profiles.setdefault(solver, {}).setdefault(name, {}).update(stages)
+    return profiles
+
+
+def solver_profile(solver, stage, name='default', filename=None):
+    '''Return dictionary of solver options of a named profile for a stage.
+
+    Solvers without a default profile use solver defaults'''
+    if stage not in STAGES:
+        raise ValueError("openCEM-profile: stage must be one of %s" % STAGES)
+    profiles = load_profiles(filename).get(solver, {})
+    if name not in profiles:
+        if name == 'default':
+            return {}
+        raise ValueError("openCEM-profile: No profile %s for solver %s" % (name, solver))
+    return dict(profiles[name].get(stage, {}))
+
+
+def options_string(options):
+    '''Return solver options in 'key=value key=value' form (e.g. for runef)'''
+    return ' '.join('%s=%s' % (k, v) for k, v in options.items())
+
+
+def save_profile(filename, solver, name, stages, options):
+    '''Save solver options as named profile for stages in JSON file'''
+    saved = {}
+    if Path(filename).exists():
+        with open(filename) as f:
+            saved = json.load(f)
+    for stage in stages:
+        saved.setdefault(solver, {}).setdefault(name, {})[stage] = options
+    tmp = str(filename) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(saved, f, indent=2)
+    os.replace(tmp, str(filename))
+
+
+def tune(instance, solver, grid=None, log=False):
+    '''Solve instance with each set of options in grid (default TUNING_GRID).
+
+    Return list of (options, seconds) of optimal solves, fastest first'''
+    if grid is None:
+        grid = TUNING_GRID.get(solver, [{}])
+    timings = []
+    for options in grid:
+        opt = SolverFactory(solver)
+        opt.options.update(options)
+        start = time.time()
+        results = opt.solve(instance, tee=log, load_solutions=False)
+        elapsed = time.time() - start
+        optimal = results.solver.termination_condition == TerminationCondition.optimal
+        if log:
+            print("openCEM tune: %s %s in %.1fs" % (options_string(options) or 'defaults',
+                                                    'optimal' if optimal else 'failed', elapsed))
+        if optimal:
+            timings.append((options, elapsed))
+    return sorted(timings, key=lambda timing: timing[1])
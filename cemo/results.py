@@ -0,0 +1,265 @@
+'''Columnar access to the values of variables, parameters and duals of openCEM instances'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Instance attribute holding selectively imported dual frames by constraint (see cemo.duals)
+DUAL_FRAMES = 'dual_frames'
+
+# Instance attribute holding variable frames read from a solution file (see cemo.solution)
+SOLUTION_FRAMES = 'solution_frames'
+
+
+class Frame(namedtuple('Frame', ['columns', 'codes', 'levels', 'values'])):
+    '''Values of an indexed component with integer coded index columns.
+
+    Each index column has an int32 array of codes into its array of levels (labels).
+    Time levels follow the order of the instance time set, other levels are sorted.
+    values is a float64 array with NaN for missing values'''
+    __slots__ = ()
+
+    @property
+    def size(self):
+        '''Number of values'''
+        return len(self.values)
+
+    def position(self, name):
+        '''Return position of index column name'''
+        return self.columns.index(name)
+
+    def column(self, name, dtype=None):
+        '''Return array of labels of index column name, cast to dtype if given'''
+        k = self.position(name)
+        levels = self.levels[k] if dtype is None else self.levels[k].astype(dtype)
+        return levels[self.codes[k]]
+
+    def index(self):
+        '''Return list of index keys (with Python labels), in component order.
+        Keys are tuples unless the component has a single index'''
+        labels = [self.levels[k][self.codes[k]].tolist() for k in range(len(self.columns))]
+        return labels[0] if len(labels) == 1 else list(zip(*labels))
+
+    def _group(self, by, mapping):
+        '''Return group code of each row and the labels of each group'''
+        codes, levels = [], []
+        for name in by:
+            k = self.position(name)
+            if name in mapping:
+                labels = np.array([mapping[name][label] for label in self.levels[k].tolist()],
+                                  dtype=object)
+                level, inverse = np.unique(labels, return_inverse=True)
+                codes.append(inverse[self.codes[k]])
+                levels.append(level)
+            else:
+                codes.append(self.codes[k])
+                levels.append(self.levels[k])
+        shape = tuple(len(level) for level in levels)
+        return np.ravel_multi_index(codes, shape) if codes else np.zeros(self.size, int), \
+            levels, shape
+
+    def sum(self, by=(), mapping=None):
+        '''Return dictionary of sums of values grouped by index columns in by.
+
+        mapping optionally maps the labels of columns to groups, e.g. {'zone': region_of_zone}.
+        Keys are labels (tuples of labels if grouping by several columns)'''
+        group, levels, shape = self._group(by, mapping or {})
+        size = int(np.prod(shape)) if by else 1
+        sums = np.bincount(group, weights=self.values, minlength=size)
+        present = np.bincount(group, minlength=size) > 0
+        out = {}
+        for flat in np.flatnonzero(present):
+            labels = tuple(levels[k][i] for k, i in enumerate(np.unravel_index(flat, shape)))
+            out[labels if len(by) > 1 else (labels[0] if by else None)] = sums[flat]
+        return out
+
+    def timeseries(self, time='time'):
+        '''Arrange values into a list of keys (tuples of the other index labels, sorted) and
+        an array with one row per key and one column per time level'''
+        if not self.size:
+            return [], np.zeros((0, 0))
+        t = self.position(time)
+        rest = [k for k in range(len(self.columns)) if k != t]
+        shape = tuple(len(self.levels[k]) for k in rest)
+        flat = np.ravel_multi_index([self.codes[k] for k in rest], shape)
+        rows, inverse = np.unique(flat, return_inverse=True)
+        out = np.zeros((len(rows), len(self.levels[t])))
+        out[inverse, self.codes[t]] = self.values
+        keys = [tuple(self.levels[k][i] for k, i in zip(rest, unravelled))
+                for unravelled in zip(*np.unravel_index(rows, shape))]
+        return keys, out
+
+    def to_pandas(self):
+        '''Return values as a DataFrame with a column per index column and a value column'''
+        data = {name: self.levels[k][self.codes[k]] for k, name in enumerate(self.columns)}
+        data['value'] = self.values
+        return pd.DataFrame(data)
+
+
+def make_frame(keys, values, time=None, columns=None):
+    '''Return Frame of lists of index keys and values.
+
+    String index positions are time columns, coded in the order of time if given.
+    Columns are named after columns, else 'time' or i0, i1...'''
+    if keys and not isinstance(keys[0], tuple):
+        keys = [(key,) for key in keys]
+    positions = list(zip(*keys)) if keys else [[] for _ in columns or []]
+    codes, levels, names = [], [], []
+    for k, position in enumerate(positions):
+        is_time = bool(position) and isinstance(position[0], str)
+        if is_time and time is not None and set(position) <= set(time):
+            level = list(time)
+        else:
+            level = sorted(set(position))
+        lookup = {label: code for code, label in enumerate(level)}
+        codes.append(np.fromiter((lookup[label] for label in position), dtype=np.int32,
+                                 count=len(position)))
+        levels.append(np.array(level, dtype=object))
+        names.append('time' if is_time else 'i%d' % k)
+    return Frame(columns=list(columns) if columns else names,
+                 codes=codes,
+                 levels=levels,
+                 values=np.array(values, dtype=np.float64))
+
+
+class Results:
+    '''Columnar accessor of a (solved) instance.
+
+    Each variable, parameter or dual family is extracted once into a Frame and cached,
+    so that all outputs and reports share a single traversal of each component.
+    Create a new Results after the instance is solved again'''
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.name = instance.name
+        self.time = list(instance.t) if hasattr(instance, 't') else None
+        # System cost, if extracted with the components (see snapshot)
+        self.objective = None
+        self._cache = {}
+
+    def frame(self, name, columns=None):
+        '''Return Frame of values of indexed variable or parameter name, from the solution
+        file if it was read directly (see cemo.solution) or else the instance'''
+        solution = getattr(self.instance, SOLUTION_FRAMES, None)
+        if solution is not None and name in solution:
+            return self._rename(solution[name], columns)
+        if name not in self._cache:
+            values = getattr(self.instance, name).extract_values()
+            self._cache[name] = make_frame(list(values), list(values.values()), self.time)
+        return self._rename(self._cache[name], columns)
+
+    def dual(self, name, columns=None):
+        '''Return Frame of duals of indexed constraint name, from the duals imported
+        selectively (see cemo.duals) or else the dual Suffix of the instance'''
+        imported = getattr(self.instance, DUAL_FRAMES, None)
+        if imported is not None and name in imported:
+            return self._rename(imported[name], columns)
+        key = ('dual', name)
+        if key not in self._cache:
+            dual = self.instance.dual
+            con = getattr(self.instance, name)
+            keys = list(con.keys())
+            self._cache[key] = make_frame(keys, [dual[con[i]] for i in keys], self.time)
+        return self._rename(self._cache[key], columns)
+
+    def values(self, name):
+        '''Return dictionary of values of parameter or variable name in the instance
+        by index (None if not indexed)'''
+        key = ('values', name)
+        if key not in self._cache:
+            self._cache[key] = getattr(self.instance, name).extract_values()
+        return self._cache[key]
+
+    def members(self, name):
+        '''Return list of members of set name, or dictionary of lists of members by index
+        if it is an indexed set'''
+        key = ('members', name)
+        if key not in self._cache:
+            component = getattr(self.instance, name)
+            if component.is_indexed():
+                self._cache[key] = {i: list(component[i]) for i in component.keys()}
+            else:
+                self._cache[key] = list(component)
+        return self._cache[key]
+
+    @property
+    def solution_read(self):
+        '''Whether variable values were read directly from a solution file'''
+        return getattr(self.instance, SOLUTION_FRAMES, None) is not None
+
+    def has(self, name):
+        '''Return whether instance has component name'''
+        return getattr(self.instance, name, None) is not None
+
+    def has_dual(self, name):
+        '''Return whether duals of constraint name were imported'''
+        imported = getattr(self.instance, DUAL_FRAMES, None)
+        if imported is not None and name in imported:
+            return True
+        return self.has('dual') and self.has(name)
+
+    def region_of_zone(self):
+        '''Return dictionary of region of each zone'''
+        return {zone: region for region, zones in self.members('zones_per_region').items()
+                for zone in zones}
+
+    def snapshot(self, frames=(), duals=(), values=(), members=(), objective=None):
+        '''Return Snapshot of the Frames of the components in frames, the duals of the
+        constraints in duals, the values of the components in values and the members of
+        the sets in members (those the instance has), and of the objective if given'''
+        cache = {}
+        for name in frames:
+            if self.has(name):
+                cache[name] = self.frame(name)
+        for name in duals:
+            if self.has_dual(name):
+                cache[('dual', name)] = self.dual(name)
+        for name in values:
+            if self.has(name):
+                cache[('values', name)] = self.values(name)
+        for name in members:
+            if self.has(name):
+                cache[('members', name)] = self.members(name)
+        return Snapshot(self.name, self.time, cache, objective)
+
+    def clear(self):
+        '''Drop cached frames'''
+        self._cache = {}
+
+    @staticmethod
+    def _rename(frame, columns):
+        if columns is None:
+            return frame
+        return frame._replace(columns=list(columns[:len(frame.columns)]))
+
+
+class Snapshot(Results):
+    '''Components of a solved instance extracted by Results.snapshot, to write outputs
+    without the instance (e.g. in another process, as it is much smaller to pickle).
+    Only the extracted components are available'''
+
+    def __init__(self, name, time, cache, objective=None):  # pylint: disable=super-init-not-called
+        self.instance = None
+        self.name = name
+        self.time = time
+        self.objective = objective
+        self._cache = cache
+
+    def has(self, name):
+        '''Return whether component name was extracted'''
+        return name in self._cache or ('values', name) in self._cache \
+            or ('members', name) in self._cache
+
+    def has_dual(self, name):
+        '''Return whether duals of constraint name were extracted'''
+        return ('dual', name) in self._cache
+
+    def clear(self):
+        '''Extracted components are kept'''
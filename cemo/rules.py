@@ -341,6 +341,109 @@ def con_hybcharge(model, z, h, t):
         + model.hyb_charge[z, h, t]
 
 
+def con_storcharge_chrono(model, z, s, t):
+    '''Storage charge dynamic in a representative day starting from its initial level'''
+    if t == model.t.first():
+        prev = model.stor_level_start[z, s]
+    else:
+        prev = model.stor_level[z, s, model.t.prev(t)]
+    return model.stor_level[z, s, t] \
+        == prev - model.stor_disp[z, s, t] + \
+        model.stor_rt_eff[s] * model.stor_charge[z, s, t]
+
+
+def con_hybcharge_chrono(model, z, h, t):
+    '''Hybrid charge dynamic in a representative day starting from its initial level'''
+    if t == model.t.first():
+        prev = model.hyb_level_start[z, h]
+    else:
+        prev = model.hyb_level[z, h, model.t.prev(t)]
+    return model.hyb_level[z, h, t] \
+        == prev \
+        - model.hyb_disp[z, h, t] \
+        + model.hyb_charge[z, h, t]
+
+
+def _level_inter(model, var, z, n, d):
+    '''Level at the start of the day after d is the level at start of day d plus the net
+    charge of its representative day. Only days represented by this scenario apply'''
+    if model.day_rep[d] != model.rep:
+        return Constraint.Skip
+    level = getattr(model, var)
+    return getattr(model, var + '_inter')[z, n, model.days.nextw(d)] \
+        == getattr(model, var + '_inter')[z, n, d] \
+        + level[z, n, model.t.last()] - getattr(model, var + '_start')[z, n]
+
+
+def _level_inter_min(model, var, z, n, d):
+    '''Level during day d must not fall below zero'''
+    if model.day_rep[d] != model.rep:
+        return Constraint.Skip
+    return getattr(model, var + '_inter')[z, n, d] \
+        + getattr(model, var + '_min')[z, n] - getattr(model, var + '_start')[z, n] >= 0
+
+
+def _level_inter_max(model, var, z, n, d, maxlevel):
+    '''Level during day d must not exceed maximum charge'''
+    if model.day_rep[d] != model.rep:
+        return Constraint.Skip
+    return getattr(model, var + '_inter')[z, n, d] \
+        + getattr(model, var + '_max')[z, n] - getattr(model, var + '_start')[z, n] \
+        <= maxlevel
+
+
+def con_stor_level_inter(model, z, s, d):
+    '''Storage level chronology across the original sequence of days'''
+    return _level_inter(model, 'stor_level', z, s, d)
+
+
+def con_stor_level_inter_min(model, z, s, d):
+    '''Storage level in each original day is not negative'''
+    return _level_inter_min(model, 'stor_level', z, s, d)
+
+
+def con_stor_level_inter_max(model, z, s, d):
+    '''Storage level in each original day is within maximum charge'''
+    return _level_inter_max(model, 'stor_level', z, s, d,
+                            1e-3 * model.stor_cap_op[z, s] * model.stor_charge_hours[s])
+
+
+def con_stor_level_intra_min(model, z, s, t):
+    '''Minimum storage level within representative day'''
+    return model.stor_level_min[z, s] <= model.stor_level[z, s, t]
+
+
+def con_stor_level_intra_max(model, z, s, t):
+    '''Maximum storage level within representative day'''
+    return model.stor_level[z, s, t] <= model.stor_level_max[z, s]
+
+
+def con_hyb_level_inter(model, z, h, d):
+    '''Hybrid storage level chronology across the original sequence of days'''
+    return _level_inter(model, 'hyb_level', z, h, d)
+
+
+def con_hyb_level_inter_min(model, z, h, d):
+    '''Hybrid storage level in each original day is not negative'''
+    return _level_inter_min(model, 'hyb_level', z, h, d)
+
+
+def con_hyb_level_inter_max(model, z, h, d):
+    '''Hybrid storage level in each original day is within maximum charge'''
+    return _level_inter_max(model, 'hyb_level', z, h, d,
+                            1e-3 * model.hyb_cap_op[z, h] * model.hyb_charge_hours[h])
+
+
+def con_hyb_level_intra_min(model, z, h, t):
+    '''Minimum hybrid storage level within representative day'''
+    return model.hyb_level_min[z, h] <= model.hyb_level[z, h, t]
+
+
+def con_hyb_level_intra_max(model, z, h, t):
+    '''Maximum hybrid storage level within representative day'''
+    return model.hyb_level[z, h, t] <= model.hyb_level_max[z, h]
+
+
 def con_hyb_level_max(model, z, h, t):
     '''Hybrid storage charge is limted by collector output.
 
@@ -0,0 +1,133 @@
+'''Read CBC solution files of openCEM instances directly into arrays'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import Var
+from pyomo.opt import SolverFactory
+
+from cemo.carryforward import CARRY_FORWARD_CAP
+from cemo.results import DUAL_FRAMES, SOLUTION_FRAMES, make_frame
+from cemo.warmstart import CAPACITY_VARS
+
+# Variables loaded back into the instance, needed to carry capacity and costs forward
+LOADED_VARS = CAPACITY_VARS + [var for _, var in CARRY_FORWARD_CAP]
+
+# LP column and row names with symbolic solver labels off, e.g. x12 and c_e_x34_
+COLUMN = r'^x(\d+)$'
+ROW = r'^(?:c_[elu]|r_[lu])_x(\d+)_$'
+
+
+def symbol_number(symbol):
+    '''Return number of a numeric LP label (e.g. 12 for x12), -1 if there is no label'''
+    return int(symbol[1:]) if symbol else -1
+
+
+def read_solution(filename):
+    '''Read a CBC solution file (written with -printingOptions all).
+
+    Return the status line, the value of each column and the dual of each row as
+    float64 arrays indexed by the number of their LP label (see symbol_number)'''
+    with open(filename) as f:
+        status = f.readline().strip()
+        # Lines of infeasible rows and columns start with **
+        text = f.read().replace('**', '')
+    table = pd.read_csv(io.StringIO(text), delim_whitespace=True, header=None,
+                        usecols=[1, 2, 3], names=['name', 'value', 'dual'])
+    columns = table.name.str.extract(COLUMN, expand=False).dropna().astype(np.int64)
+    rows = table.name.str.extract(ROW, expand=False).dropna().astype(np.int64)
+    size = 1 + max([int(numbers.max()) for numbers in (columns, rows) if len(numbers)] or [0])
+    primal = np.zeros(size)
+    primal[columns.values] = table.value.values[columns.index.values]
+    dual = np.full(size, np.nan)
+    duals = table.dual.values[rows.index.values]
+    # Ranges have two rows, keep the dual largest in magnitude
+    order = np.argsort(np.abs(duals), kind='stable')
+    dual[rows.values[order]] = duals[order]
+    return status, primal, dual
+
+
+def component_frame(component, smap, array, time):
+    '''Return Frame of the values in array of the elements of a variable (or duals of a
+    constraint) by their LP label. Elements not in the LP (e.g. fixed variables)
+    keep their value in the instance'''
+    keys = list(component.keys())
+    datas = list(component.values())
+    cols = np.array([symbol_number(smap.byObject.get(id(data))) for data in datas],
+                    dtype=np.int64)
+    values = np.where(cols >= 0, array[cols], np.nan)
+    for k in np.flatnonzero(cols < 0):
+        val = getattr(datas[k], 'value', None)
+        values[k] = np.nan if val is None else val
+    return make_frame(keys, values, time)
+
+
+def load_solution(inst, smap, primal, dual, duals):
+    '''Keep the values of all active variables and the duals of constraints in duals as
+    Frames (see cemo.results) on the instance. Only LOADED_VARS are set in the instance'''
+    time = list(inst.t) if hasattr(inst, 't') else None
+    frames = {var.name: component_frame(var, smap, primal, time)
+              for var in inst.component_objects(Var, active=True)}
+    for name in LOADED_VARS:
+        var = getattr(inst, name, None)
+        if var is None:
+            continue
+        for data, val in zip(var.values(), frames[name].values.tolist()):
+            if not data.fixed and val == val:
+                data.value = val
+                data.stale = False
+    setattr(inst, SOLUTION_FRAMES, frames)
+    setattr(inst, DUAL_FRAMES, {name: component_frame(getattr(inst, name), smap, dual, time)
+                                for name in duals})
+
+
+def solver_command(executable, lpfile, solfile, options=None):
+    '''Return CBC command line solving an LP file and writing its solution file'''
+    cmd = [executable]
+    actions = []
+    for key, val in (options or {}).items():
+        if str(val).strip() != '':
+            cmd.extend(['-' + str(key), str(val)])
+        else:
+            actions.append('-' + str(key))
+    return cmd + ['-printingOptions', 'all', '-import', lpfile] + actions \
+        + ['-stat=1', '-solve', '-solu', solfile]
+
+
+def solve_direct(inst, options=None, duals=(), log=False):
+    '''Solve instance with CBC and read its solution file directly into arrays.
+
+    Pyomo does not load the solution: variable values and duals of the constraints in
+    duals are kept as Frames for the outputs (see load_solution). Return the objective'''
+    executable = SolverFactory('cbc').executable()
+    if executable is None:
+        raise RuntimeError("openCEM-solution_reader: cbc executable not found")
+    tmpdir = tempfile.mkdtemp()
+    try:
+        lpfile = os.path.join(tmpdir, 'direct.lp')
+        solfile = os.path.join(tmpdir, 'direct.soln')
+        _, smap_id = inst.write(lpfile, io_options={'symbolic_solver_labels': False})
+        try:
+            subprocess.run(solver_command(executable, lpfile, solfile, options), check=True,
+                           stdout=None if log else subprocess.DEVNULL)
+            status, primal, dual = read_solution(solfile)
+            if not status.startswith('Optimal'):
+                raise RuntimeError("openCEM-solution_reader: %s not solved to optimality (%s)"
+                                   % (inst.name, status))
+            load_solution(inst, inst.solutions.symbol_map[smap_id], primal, dual, duals)
+        finally:
+            inst.solutions.delete_symbol_map(smap_id)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return float(status.split()[-1])
@@ -2,6 +2,8 @@
 import pandas as pd
 from pathlib import Path
 
+from cemo.parquetify import read_dataset
+
 CAPCOLS = ['cap_op', 'cap_new', 'cap_exo', 'cap_ret', 'cap_ret_exo']
 REGIONCOLS_ZT = ['srmc', 'unserved']
 REGIONCOLS_RT = ['region_net_demand']
@@ -13,18 +15,27 @@ COSTCOLS_Z = ['cost_cap_carry_forward']
 COSTCOLS_T = ['fixed_charge_rate', 'opex_fom', 'opex_vom', 'cost_retire']
 INTERCONCAPCOLS = ['intercon_cap_new', 'intercon_cap_exo', 'intercon_cap_op', 'cost_intercon_build']
 INTERCONDISPCOLS = ['intercon_disp']
+# Datasets read to process summaries
+SUMMARY_DATASETS = (CAPCOLS + REGIONCOLS_ZT + REGIONCOLS_RT + EMITCOLS_ZTT + EMITCOLS_ZT
+                    + EMITCOLS_T + COSTCOLS_ZT + COSTCOLS_Z + COSTCOLS_T + INTERCONCAPCOLS
+                    + INTERCONDISPCOLS + ['misc'])
 REGION_IN_ZONE = {1: 2, 2: 2, 3: 2, 4: 2, 5: 1, 6: 1, 7: 1,
                   8: 1, 9: 5, 10: 5, 11: 5, 12: 5, 13: 3, 14: 3, 15: 3, 16: 4}
 
 
 class BaseSummary():
-    """Base Class for Summary"""
+    """Base Class for Summary
+
+    With partial, the summary is assembled from per-year partial summaries saved in
+    each year directory, processing (and saving) only the years without one"""
+    cache_file = None
 
-    def __init__(self, datasource, YEARS, cache=True, save=True):
+    def __init__(self, datasource, YEARS, cache=True, save=True, partial=False):
         self.years = YEARS
         self.scen = Path(datasource)
         self.cache = cache
         self.save = save
+        self.partial = partial
         self.check_cache()
 
     def _load_data(self, VAR):
@@ -33,8 +44,7 @@ class BaseSummary():
                 #print("Loading %s %s" % (self.scen, VAR))
                 data = pd.DataFrame()
             # Load a bunch of data into a dictionary for easy access
-            path = self.scen / Path(str(year)) / VAR
-            tmp = pd.read_parquet(path)
+            tmp = read_dataset(self.scen, year, VAR)
             tmp['year'] = year
             data = data.append(tmp)
         return data
@@ -44,23 +54,13 @@ class BaseSummary():
         self.misc = self._load_data('misc.parquet')
 
     def check_cache(self):
-        pass
-
-    def _append_region(self):
-        """Append region to zone to dataframes in order to filter by region"""
-        self.summary['region'] = self.summary.zone.apply(lambda x: REGION_IN_ZONE[x])
-
-    def get_summary(self):
-        return self.summary
-
-
-class TransSummary(BaseSummary):
-    """Process Transmission stats"""
-
-    def check_cache(self):
+        if self.partial:
+            self.summary = pd.concat([self._load_partial(year) for year in self.years],
+                                     ignore_index=True, sort=False)
+            return
         if self.cache:
             try:
-                self.summary = pd.read_parquet(self.scen/"trans_summary.parquet")
+                self.summary = pd.read_parquet(self.scen/self.cache_file)
                 if set(self.summary.year.unique()) != set(self.years):
                     #print("Not equal!")
                     raise Exception
@@ -73,7 +73,38 @@ class TransSummary(BaseSummary):
             self.save_cache()
 
     def save_cache(self):
-        self.summary.to_parquet(self.scen/"trans_summary.parquet")
+        self.summary.to_parquet(self.scen/self.cache_file)
+
+    def _partial_path(self, year):
+        return self.scen / Path(str(year)) / self.cache_file
+
+    def save_partial(self):
+        """Save summary of each year to its partial summary"""
+        for year in self.years:
+            self.summary[self.summary.year == year].reset_index(
+                drop=True).to_parquet(self._partial_path(year))
+
+    def _load_partial(self, year):
+        """Load partial summary for year, processing it if missing or cache is False"""
+        if self.cache and self._partial_path(year).exists():
+            return pd.read_parquet(self._partial_path(year))
+        part = type(self)(self.scen, [year], cache=False, save=False)
+        if self.save:
+            part.save_partial()
+        return part.summary
+
+    def _append_region(self):
+        """Append region to zone to dataframes in order to filter by region"""
+        self.summary['region'] = self.summary.zone.apply(lambda x: REGION_IN_ZONE[x])
+
+    def get_summary(self):
+        return self.summary
+
+
+class TransSummary(BaseSummary):
+    """Process Transmission stats"""
+
+    cache_file = "trans_summary.parquet"
 
     def process_data(self):
         self._misc()
@@ -124,23 +155,7 @@ class TransSummary(BaseSummary):
 
 
 class CapSummary(BaseSummary):
-    def check_cache(self):
-        if self.cache:
-            try:
-                self.summary = pd.read_parquet(self.scen/"cap_summary.parquet")
-                if set(self.summary.year.unique()) != set(self.years):
-                    #print("Not equal!")
-                    raise Exception
-            except Exception as e:
-                print(e)
-                self.process_data()
-        else:
-            self.process_data()
-        if self.save:
-            self.save_cache()
-
-    def save_cache(self):
-        self.summary.to_parquet(self.scen/"cap_summary.parquet")
+    cache_file = "cap_summary.parquet"
 
     def process_data(self):
         self._capacity()
@@ -213,23 +228,7 @@ class CapSummary(BaseSummary):
 
 
 class ZoneSummary(BaseSummary):
-    def check_cache(self):
-        if self.cache:
-            try:
-                self.summary = pd.read_parquet(self.scen/"zone_summary.parquet")
-                if set(self.summary.year.unique()) != set(self.years):
-                    #print("Not equal!")
-                    raise Exception
-            except Exception as e:
-                print(e)
-                self.process_data()
-        else:
-            self.process_data()
-        if self.save:
-            self.save_cache()
-
-    def save_cache(self):
-        self.summary.to_parquet(self.scen/"zone_summary.parquet")
+    cache_file = "zone_summary.parquet"
 
     def process_data(self):
         self._carry_fwd_costs()
@@ -246,24 +245,7 @@ class ZoneSummary(BaseSummary):
 
 
 class RegSummary(BaseSummary):
-    def check_cache(self):
-        if self.cache:
-            try:
-                self.summary = pd.read_parquet(self.scen/"dual_summary.parquet")
-                if set(self.summary.year.unique()) != set(self.years):
-                    #print("Not equal!")
-                    raise Exception
-            except Exception as e:
-                print(e)
-                self.process_data()
-        else:
-            self.process_data()
-
-        if self.save:
-            self.save_cache()
-
-    def save_cache(self):
-        self.summary.to_parquet(self.scen/"dual_summary.parquet")
+    cache_file = "dual_summary.parquet"
 
     def process_data(self):
         self._duals()
@@ -297,12 +279,25 @@ class RegSummary(BaseSummary):
         self.summary = self.summary.merge(region, on=['year', 'region'])
 
 
+PARTIAL_SUMMARIES = [CapSummary, ZoneSummary, TransSummary, RegSummary]
+
+
+def summarise_year(datasource, year):
+    """Process and save partial summaries of one year of results in datasource"""
+    for summary in PARTIAL_SUMMARIES:
+        summary(datasource, [year], cache=False, save=False).save_partial()
+
+
 class Summary(BaseSummary):
     def check_cache(self):
-        self.cap_summary = CapSummary(self.scen, self.years, self.cache).get_summary()
-        self.zone_summary = ZoneSummary(self.scen, self.years, self.cache).get_summary()
-        self.trans_summary = TransSummary(self.scen, self.years, self.cache).get_summary()
-        self.region_summary = RegSummary(self.scen, self.years, self.cache).get_summary()
+        self.cap_summary = CapSummary(self.scen, self.years, self.cache,
+                                      partial=self.partial).get_summary()
+        self.zone_summary = ZoneSummary(self.scen, self.years, self.cache,
+                                        partial=self.partial).get_summary()
+        self.trans_summary = TransSummary(self.scen, self.years, self.cache,
+                                          partial=self.partial).get_summary()
+        self.region_summary = RegSummary(self.scen, self.years, self.cache,
+                                         partial=self.partial).get_summary()
         self._misc()
 
     def _market_stats():
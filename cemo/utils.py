@@ -7,6 +7,7 @@ __maintainer__ = "José Zapata"
 __email__ = "jose.zapata@itpau.com.au"
 
 import locale
+import math
 import sys
 
 import matplotlib.pyplot as plt
@@ -15,7 +16,16 @@ from pyomo.environ import value
 from si_prefix import si_format
 
 import cemo.const
-import cemo.rules
+from cemo.results import Results
+
+
+def check_arg(config_file, parameter):
+    '''Parse .dat file for parameters that enable constraints, ignoring comments'''
+    with open(config_file + '.dat', 'r') as file:
+        for line in file:
+            if parameter in line.split('#')[0]:
+                return True
+        return False
 
 
 def printonly(instance, key):  # pragma: no cover
@@ -178,89 +188,191 @@ def plotcapacity(instance):  # pragma: no cover
     plt.show()
 
 
-def _printcosts(inst):
+# Time indexed components reported by printstats
+STATS_COMPONENTS = ['gen_disp', 'gen_disp_com', 'gen_disp_com_p', 'stor_disp', 'hyb_disp',
+                    'gen_cap_factor', 'hyb_cap_factor', 'unserved', 'intercon_disp',
+                    'region_net_demand']
+
+# Capacity variables and parameters whose values are reported by printstats
+STATS_VALUES = ['gen_cap_op', 'gen_cap_new', 'gen_cap_ret', 'stor_cap_op', 'stor_cap_new',
+                'hyb_cap_op', 'hyb_cap_new', 'intercon_cap_new', 'cost_gen_build',
+                'cost_stor_build', 'cost_hyb_build', 'gen_cap_exo', 'stor_cap_exo',
+                'hyb_cap_exo', 'cost_gen_fom', 'cost_stor_fom', 'cost_hyb_fom', 'cost_gen_vom',
+                'cost_stor_vom', 'cost_hyb_vom', 'fixed_charge_rate', 'cost_fuel',
+                'fuel_heat_rate', 'fuel_emit_rate', 'cost_retire', 'ret_gen_cap_exo',
+                'cost_intercon_build', 'intercon_cap_exo', 'intercon_fixed_charge_rate',
+                'cost_cap_carry_forward', 'year_correction_factor', 'cost_unserved',
+                'cost_trans', 'cost_emit']
+
+# Sets iterated by printstats
+STATS_SETS = ['regions', 'zones', 'all_tech', 'zones_per_region', 'gen_tech_per_zone',
+              'fuel_gen_tech_per_zone', 'commit_gen_tech_per_zone', 'retire_gen_tech_per_zone',
+              'stor_tech_per_zone', 'hyb_tech_per_zone', 'intercon_per_zone']
+
+
+def _time_totals(results):
+    '''Return totals over time of STATS_COMPONENTS, keyed by index without time'''
+    totals = {}
+    for name in STATS_COMPONENTS:
+        frame = results.frame(name)
+        totals[name] = frame.sum([col for col in frame.columns if col != 'time'])
+    return totals
+
+
+def _cost_components(results, totals):
+    '''Return dictionary of cost components of cemo.rules.system_cost evaluated from
+    totals over time (see _time_totals) and capacity values in results'''
+    val = results.values
+    ycf = val('year_correction_factor')[None]
+    disp, com = totals['gen_disp'], totals['gen_disp_com']
+    costs = dict.fromkeys(['capital', 'repayment', 'fixed', 'unserved', 'operating',
+                           'trans_build', 'trans_flow', 'emissions', 'retirement'], 0.0)
+    operating = 0.0
+    for z in results.members('zones'):
+        for tech_set, build, new, exo, fom, op, vom, dname in [
+                ('gen_tech_per_zone', 'cost_gen_build', 'gen_cap_new', 'gen_cap_exo',
+                 'cost_gen_fom', 'gen_cap_op', 'cost_gen_vom', 'gen_disp'),
+                ('stor_tech_per_zone', 'cost_stor_build', 'stor_cap_new', 'stor_cap_exo',
+                 'cost_stor_fom', 'stor_cap_op', 'cost_stor_vom', 'stor_disp'),
+                ('hyb_tech_per_zone', 'cost_hyb_build', 'hyb_cap_new', 'hyb_cap_exo',
+                 'cost_hyb_fom', 'hyb_cap_op', 'cost_hyb_vom', 'hyb_disp')]:
+            for n in results.members(tech_set)[z]:
+                cost = val(build)[z, n] * val('fixed_charge_rate')[n]
+                costs['capital'] += cost * (val(new)[z, n] + 1e3 * val(exo)[z, n])
+                costs['fixed'] += val(fom)[n] * val(op)[z, n]
+                operating += val(vom)[n] * totals[dname][z, n]
+        commit = set(results.members('commit_gen_tech_per_zone')[z])
+        for f in set(results.members('fuel_gen_tech_per_zone')[z]) - commit:
+            operating += val('cost_fuel')[z, f] * val('fuel_heat_rate')[z, f] * disp[z, f]
+        for n in results.members('commit_gen_tech_per_zone')[z]:
+            mincap = cemo.const.GEN_COMMIT['mincap'].get(n)
+            effrate = cemo.const.GEN_COMMIT['effrate'].get(n)
+            cost_fuel = val('cost_fuel')[z, n]
+            heat_rate = val('fuel_heat_rate')[z, n]
+            operating += cost_fuel * (mincap * com[z, n] * heat_rate / effrate
+                                      + (disp[z, n] - mincap * com[z, n]) * heat_rate
+                                      * (1 - mincap / effrate) / (1 - mincap))
+            operating += cost_fuel * cemo.const.GEN_COMMIT['penalty'].get(n, 0) \
+                * totals['gen_disp_com_p'][z, n]
+        for n in results.members('retire_gen_tech_per_zone')[z]:
+            costs['retirement'] += val('cost_retire')[n] * (
+                1e-3 * val('gen_cap_ret')[z, n] + val('ret_gen_cap_exo')[z, n])
+        for dest in results.members('intercon_per_zone')[z]:
+            cost = val('cost_intercon_build')[z, dest] \
+                * val('intercon_fixed_charge_rate')[None]
+            costs['trans_build'] += cost * (1e-3 * val('intercon_cap_new')[z, dest]
+                                            + val('intercon_cap_exo')[z, dest])
+            costs['trans_flow'] += totals['intercon_disp'][z, dest]
+        costs['repayment'] += val('cost_cap_carry_forward')[z]
+        costs['unserved'] += totals['unserved'][z]
+    costs['operating'] = ycf * operating
+    costs['unserved'] *= math.sqrt(ycf) * val('cost_unserved')[None]
+    costs['trans_flow'] *= ycf * val('cost_trans')[None]
+    costs['emissions'] = ycf * val('cost_emit')[None] * 1e-3 * sum(
+        _emissions(results, totals, r) for r in results.members('regions'))
+    costs['total'] = sum(costs[k] for k in ['capital', 'repayment', 'fixed', 'unserved',
+                                            'operating', 'trans_build', 'trans_flow',
+                                            'emissions', 'retirement'])
+    return costs
+
+
+def _emissions(results, totals, r):
+    '''Return emissions in kg of region r (see cemo.rules.emissions)'''
+    rate = results.values('fuel_emit_rate')
+    zones = results.members('zones_per_region')[r]
+    return sum(rate[n] * totals['gen_disp'][z, n]
+               for z in zones
+               for n in results.members('fuel_gen_tech_per_zone')[z]) \
+        + sum(rate[n] * totals['gen_disp_com_p'][z, n]
+              for z in zones
+              for n in results.members('commit_gen_tech_per_zone')[z])
+
+
+def _dispatch(results, totals, r):
+    '''Return dispatch of region r (see cemo.rules.dispatch)'''
+    return sum(totals[name][z, n]
+               for name, tech_set in [('gen_disp', 'gen_tech_per_zone'),
+                                      ('stor_disp', 'stor_tech_per_zone'),
+                                      ('hyb_disp', 'hyb_tech_per_zone')]
+               for z in results.members('zones_per_region')[r]
+               for n in results.members(tech_set)[z])
+
+
+def system_cost_value(results):
+    '''Return value of cemo.rules.system_cost from results (a cemo.results.Results)'''
+    return _cost_components(results, _time_totals(results))['total']
+
+
+def _printcosts(results, totals):
+    costs = _cost_components(results, totals)
     locale.setlocale(locale.LC_ALL, 'en_AU.UTF-8')
     print("Total Cost:\t %20s" %
-          locale.currency(value(cemo.rules.system_cost(inst)), grouping=True))
+          locale.currency(costs['total'], grouping=True))
     print("Build cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_capital(inst)),
-                          grouping=True))
+          locale.currency(costs['capital'], grouping=True))
     print("Repayment cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_repayment(inst)),
-                          grouping=True))
+          locale.currency(costs['repayment'], grouping=True))
     print("Operating cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_operating(inst)),
-                          grouping=True))
+          locale.currency(costs['operating'], grouping=True))
     print("Fixed cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_fixed(inst)),
-                          grouping=True))
+          locale.currency(costs['fixed'], grouping=True))
     print("Trans. build cost:\t %12s" %
-          locale.currency(value(cemo.rules.cost_trans_build(inst)),
-                          grouping=True))
+          locale.currency(costs['trans_build'], grouping=True))
     print("Trans. flow cost:\t %12s" %
-          locale.currency(value(cemo.rules.cost_trans_flow(inst)),
-                          grouping=True))
+          locale.currency(costs['trans_flow'], grouping=True))
     print("Unserved cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_unserved(inst)),
-                          grouping=True))
+          locale.currency(costs['unserved'], grouping=True))
     print("Emission cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_emissions(inst)),
-                          grouping=True))
+          locale.currency(costs['emissions'], grouping=True))
     print("Retirmt cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_retirement(inst)),
-                          grouping=True))
+          locale.currency(costs['retirement'], grouping=True))
 
 
-def _printemissionrate(instance):
-    emrate = sum(value(cemo.rules.emissions(instance, r))
-                 for r in instance.regions) /\
-        (sum(value(cemo.rules.dispatch(instance, r)) for r in instance.regions) + 1.0e-12)
+def _printemissionrate(results, totals):
+    regions = results.members('regions')
+    emrate = sum(_emissions(results, totals, r) for r in regions) /\
+        (sum(_dispatch(results, totals, r) for r in regions) + 1.0e-12)
     print("Total Emission rate: %6.3f kg/MWh" % emrate)
 
 
-def _printunserved(instance):
-    regions = list(instance.regions)
+def _printunserved(results, totals):
+    regions = list(results.members('regions'))
     unserved = np.zeros(len(regions), dtype=float)
     for region in regions:
         unserved[regions.index(region)] \
-            = 100.0 * sum(value(instance.unserved[zone, time])
-                          for zone in instance.zones_per_region[region]
-                          for time in instance.t) \
-            / sum(value(instance.region_net_demand[region, time]) for time in instance.t)
+            = 100.0 * sum(totals['unserved'][zone]
+                          for zone in results.members('zones_per_region')[region]) \
+            / totals['region_net_demand'][region]
 
     print('Unserved %:' + str(unserved))
 
 
-def _printcapacity(instance):
+def _printcapacity(results, totals):
     tname = _get_textid('technology_type')
-    hours = float(len(instance.t))
-    techtotal = [0] * len(instance.all_tech)
-    disptotal = [0] * len(instance.all_tech)
-    capftotal = [0] * len(instance.all_tech)
-    nperz = [0] * len(instance.all_tech)
-    idx = list(instance.all_tech)
-    for z in instance.zones:
-        for n in instance.gen_tech_per_zone[z]:
-            techtotal[idx.index(n)] += value(1e-3 * instance.gen_cap_op[z, n])
-            disptotal[idx.index(n)] += value(sum(instance.gen_disp[z, n, t]
-                                                 for t in instance.t))
-            capftotal[idx.index(n)] += value(sum(instance.gen_cap_factor[z, n, t]
-                                                 for t in instance.t))
-            nperz[idx.index(n)] += 1
-        for s in instance.stor_tech_per_zone[z]:
-            techtotal[idx.index(s)] += value(1e-3 * instance.stor_cap_op[z, s])
-            disptotal[idx.index(s)] += value(sum(instance.stor_disp[z, s, t]
-                                                 for t in instance.t))
-            capftotal[idx.index(s)] += 0.5 * hours
-            nperz[idx.index(s)] += 1
-
-        for h in instance.hyb_tech_per_zone[z]:
-            techtotal[idx.index(h)] += value(1e-3 * instance.hyb_cap_op[z, h])
-            disptotal[idx.index(h)] += value(sum(instance.hyb_disp[z, h, t]
-                                                 for t in instance.t))
-            capftotal[idx.index(h)] += value(sum(instance.hyb_cap_factor[z, h, t]
-                                                 for t in instance.t))
-            nperz[idx.index(h)] += 1
+    hours = float(len(results.time))
+    all_tech = results.members('all_tech')
+    techtotal = [0] * len(all_tech)
+    disptotal = [0] * len(all_tech)
+    capftotal = [0] * len(all_tech)
+    nperz = [0] * len(all_tech)
+    idx = {tech: k for k, tech in enumerate(all_tech)}
+    for z in results.members('zones'):
+        for n in results.members('gen_tech_per_zone')[z]:
+            techtotal[idx[n]] += 1e-3 * results.values('gen_cap_op')[z, n]
+            disptotal[idx[n]] += totals['gen_disp'][z, n]
+            capftotal[idx[n]] += totals['gen_cap_factor'][z, n]
+            nperz[idx[n]] += 1
+        for s in results.members('stor_tech_per_zone')[z]:
+            techtotal[idx[s]] += 1e-3 * results.values('stor_cap_op')[z, s]
+            disptotal[idx[s]] += totals['stor_disp'][z, s]
+            capftotal[idx[s]] += 0.5 * hours
+            nperz[idx[s]] += 1
+
+        for h in results.members('hyb_tech_per_zone')[z]:
+            techtotal[idx[h]] += 1e-3 * results.values('hyb_cap_op')[z, h]
+            disptotal[idx[h]] += totals['hyb_disp'][z, h]
+            capftotal[idx[h]] += totals['hyb_cap_factor'][z, h]
+            nperz[idx[h]] += 1
 
     NEMcap = sum(techtotal)
     NEMdis = sum(disptotal)
@@ -269,24 +381,29 @@ def _printcapacity(instance):
           si_format(NEMdis * 1e6, precision=2)
           ))
 
-    for j in instance.all_tech:
-        if techtotal[idx.index(j)] > 0:
+    for j in all_tech:
+        if techtotal[idx[j]] > 0:
             print("%17s: %7sW | dispatch: %7sWh | avg cap factor: %.2f(%.2f)" % (
                 tname[j],
-                si_format(techtotal[idx.index(j)] * 1e6, precision=1),
-                si_format(disptotal[idx.index(j)] * 1e6, precision=1),
-                disptotal[idx.index(j)] / hours / techtotal[idx.index(j)],
-                capftotal[idx.index(j)] / hours / nperz[idx.index(j)]
+                si_format(techtotal[idx[j]] * 1e6, precision=1),
+                si_format(disptotal[idx[j]] * 1e6, precision=1),
+                disptotal[idx[j]] / hours / techtotal[idx[j]],
+                capftotal[idx[j]] / hours / nperz[idx[j]]
             ))
 
 
-def printstats(instance):
-    """Print summary of results for model instance"""
-    _printcapacity(instance)
-    _printcosts(instance)
-    _printunserved(instance)
-    _printemissionrate(instance)
-    print("End of results for %s" % instance.name, flush=True)
+def printstats(instance, results=None):
+    """Print summary of results for model instance.
+
+    Values are taken from results (a cemo.results.Results of instance, created if not
+    given) instead of evaluating model expressions. instance may be None with results"""
+    results = results or Results(instance)
+    totals = _time_totals(results)
+    _printcapacity(results, totals)
+    _printcosts(results, totals)
+    _printunserved(results, totals)
+    _printemissionrate(results, totals)
+    print("End of results for %s" % results.name, flush=True)
 
 
 def plotcluster(cluster, row=3, col=4, ylim=None, show=False):  # pragma: no cover
@@ -0,0 +1,64 @@
+'''Warm start openCEM model instances from the solution of a previous investment period'''
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+
+import json
+
+from pyomo.environ import Var
+
+# First stage capacity decisions seeded into cluster runs
+CAPACITY_VARS = ['gen_cap_new', 'stor_cap_new', 'hyb_cap_new', 'intercon_cap_new', 'gen_cap_ret']
+
+
+def year_key(idx):
+    '''Return variable index with timestamps replaced by time of year (MM-DD HH:MM:SS)
+    so they map onto the timestamps of another year'''
+    if not isinstance(idx, tuple):
+        idx = (idx,)
+    return tuple(i[5:] if isinstance(i, str) and len(i) == 19 and i[4] == '-' else i
+                 for i in idx)
+
+
+def solution_snapshot(instance):
+    '''Return primal values of all variables in instance keyed by name and year_key'''
+    snapshot = {}
+    for var in instance.component_objects(Var, active=True):
+        snapshot[var.name] = {year_key(idx): var[idx].value
+                              for idx in var if var[idx].value is not None}
+    return snapshot
+
+
+def apply_warm_start(instance, snapshot):
+    '''Set initial values of variables in instance from a solution snapshot.
+
+    Variables are matched by name, zone, technology and time of year, fixed variables
+    are left untouched. Returns the number of variables set'''
+    count = 0
+    for var in instance.component_objects(Var, active=True):
+        values = snapshot.get(var.name)
+        if not values:
+            continue
+        for idx in var:
+            val = values.get(year_key(idx))
+            if val is not None and not var[idx].fixed:
+                var[idx].value = val
+                count += 1
+    return count
+
+
+def seed_capacity(model, filename):
+    '''Set initial values of capacity decisions from cluster solution data in a JSON file.
+
+    Used in generated runef reference models to seed cluster runs'''
+    with open(filename) as f:
+        data = json.load(f)
+    for name in CAPACITY_VARS:
+        var = getattr(model, name)
+        for idx in var:
+            key = '%s[%s]' % (name, ','.join(str(i) for i in idx))
+            if key in data:
+                var[idx].value = data[key]['solution']
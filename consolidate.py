@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""consolidate.py: Convert openCEM parquet results to the consolidated layout"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+
+import argparse
+
+from cemo.parquetify import consolidate
+
+# create parser object
+parser = argparse.ArgumentParser(
+    description="Convert partitioned openCEM parquet results to one file per dataset and year")
+
+parser.add_argument(
+    "folders",
+    help="Simulation directories containing a directory of results per year",
+    nargs="+",
+    metavar="FOLDER",
+)
+parser.add_argument(
+    "--years",
+    help="Years to convert, default all years in each directory",
+    type=int,
+    nargs="+",
+)
+
+# parse arguments into args structure
+args = parser.parse_args()
+
+for folder in args.folders:
+    converted = consolidate(folder, args.years)
+    print("openCEM consolidate.py: Converted %d datasets in %s" % (len(converted), folder))
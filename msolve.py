@@ -58,7 +58,30 @@ parser.add_argument(
 parser.add_argument(
     "-r",
     "--resume",
-    help="Resume simulation from last succesfully run year",
+    help="Resume simulation from last succesfully run year,"
+    + " or from the last completed phase if checkpoints were saved",
+    action="store_true",
+)
+
+parser.add_argument(
+    "-c",
+    "--checkpoint",
+    help="Save checkpoints after each phase of a simulation year to resume from",
+    action="store_true",
+)
+
+parser.add_argument(
+    "-p",
+    "--pipeline",
+    help="Save results of each year in a background process while the next year solves",
+    action="store_true",
+)
+
+parser.add_argument(
+    "-s",
+    "--speculative",
+    help="Solve the next year in a background process with carry forward capacity"
+    + " predicted from the cluster solution, accepting it if the prediction holds",
     action="store_true",
 )
 
@@ -93,7 +116,10 @@ X = SolveTemplate(
     wrkdir=SIM_DIR,
     resume=args.resume,
     templatetest=args.templatetest,
-    json_output=args.json
+    json_output=args.json,
+    checkpoint=args.checkpoint,
+    pipeline=args.pipeline,
+    speculative=args.speculative
 )
 
 
@@ -18,15 +18,7 @@ from pyomo.opt import SolverFactory, TerminationCondition
 
 import cemo.utils
 from cemo.model import CreateModel, model_options
-
-
-def check_arg(config_file, parameter):
-    '''Parse .dat file for parameters that enable constraints'''
-    with open(config_file + '.dat', 'r') as file:
-        for line in file:
-            if parameter in line:
-                return True
-        return False
+from cemo.profiles import solver_profile
 
 
 # start the clock on the run
@@ -49,6 +41,16 @@ PARSER.add_argument("--solver",
                     type=str,
                     metavar='SOLVER',
                     default="cbc")
+# Solver option profile, e.g. one saved by tune.py
+PARSER.add_argument("--profile",
+                    help="Named solver option profile, default `default`",
+                    type=str,
+                    metavar='PROFILE',
+                    default="default")
+PARSER.add_argument("--profile-file",
+                    help="JSON file with saved solver option profiles",
+                    type=str,
+                    metavar='FILE')
 # Produce only a printout of the instance and exist
 PARSER.add_argument("--printonly",
                     help="Produce model.STR.pprint() output and exit."
@@ -87,7 +89,7 @@ MODEL_NAME = ARGS.name
 # Parse model options from file
 OPTIONS = {'unslim': ARGS.unserved}
 for option in model_options()._fields:
-    if check_arg(MODEL_NAME, option):
+    if cemo.utils.check_arg(MODEL_NAME, option):
         OPTIONS.update({option: True})
 # create cemo model
 MODEL = CreateModel(MODEL_NAME, model_options(**OPTIONS)).create_model()
@@ -103,10 +105,8 @@ if ARGS.printonly:
 # declare a solver for the model instance
 OPT = SolverFactory(ARGS.solver)
 
-# Use multiple threads for CBC solver (if available)
-if ARGS.solver == "cbc":
-    OPT.options['threads'] = 4
-    OPT.options['ratio'] = 0.0001
+# Solver options from profile (e.g. multiple threads for CBC solver)
+OPT.options.update(solver_profile(ARGS.solver, 'single', ARGS.profile, ARGS.profile_file))
 
 # instruct the solver to calculate the solution
 print("openCEM solve.py: Runtime %s (pre solver)" %
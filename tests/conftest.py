@@ -5,7 +5,9 @@ import pytest
 import tempfile
 import shutil
 import gzip
-from pyomo.environ import DataPortal
+import numpy as np
+import pandas as pd
+from pyomo.environ import ConcreteModel, DataPortal, Param, Set
 from pyomo.opt import SolverFactory
 
 from cemo.model import CreateModel, model_options
@@ -97,6 +99,48 @@ def inst_lite():
         return model.create_instance(data)
 
 
+@pytest.fixture(scope="session")
+def trace_instance():
+    '''Instance with the sets and traces used by InstanceCluster, from sample demand'''
+    df = pd.read_csv('tests/SampleDemand.csv.gz', index_col='timestamp', parse_dates=['timestamp'])
+    df = df[df.index.minute == 0]
+    time = [str(t) for t in df.index]
+    wind = 0.4 + 0.3 * np.sin(np.arange(len(time)) / 200.)
+    inst = ConcreteModel()
+    inst.regions = Set(initialize=[1, 2])
+    inst.zones_per_region = Set(inst.regions, initialize={1: [1], 2: [2, 3]})
+    inst.t = Set(initialize=time, ordered=True)
+    inst.region_net_demand = Param(inst.regions, inst.t, initialize={
+        (r, t): d * r for t, d in zip(time, df.poe10) for r in [1, 2]})
+    inst.gen_cap_factor = Param([(1, 11), (2, 12), (3, 2)], inst.t, mutable=True, initialize={
+        (z, n, t): w * z for t, w in zip(time, wind) for (z, n) in [(1, 11), (2, 12), (3, 2)]})
+    inst.hyb_cap_factor = Param([(3, 13)], inst.t, mutable=True, initialize={
+        (3, 13, t): w for t, w in zip(time, wind[::-1])})
+    return inst
+
+
+@pytest.fixture
+def sample_cfg():
+    '''Return function writing a copy of tests/testConfig.cfg to a path, with data file
+    paths made absolute, optionally a different cost of emissions, extra Advanced options
+    and a Solver section'''
+    def write(path, cost_emit=None, advanced='', solver=''):
+        with open('tests/testConfig.cfg') as sample, open(path, 'w') as cfg:
+            for line in sample:
+                if cost_emit is not None and line.startswith('cost_emit'):
+                    line = 'cost_emit = %s\n' % cost_emit
+                if line.startswith('[Advanced]'):
+                    line += advanced
+                for name in ['ISPNeutral.dat', 'sample_custom_costs.csv', 'exocap.csv',
+                             'exotrans.csv']:
+                    line = line.replace(name, str(Path('tests', name).resolve()))
+                cfg.write(line)
+            if solver:
+                cfg.write('\n[Solver]\n' + solver)
+        return path
+    return write
+
+
 @pytest.fixture()
 def delete_sim2025_dat():
     '''Fixture to delete temporary file Sim2025.dat
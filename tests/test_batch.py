@@ -0,0 +1,119 @@
+'''Test suite for batch runner module'''
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import cemo.batch
+from cemo.batch import (BatchRun, Fork, collect_cfgfiles, fork_scenario, input_fingerprint,
+                        plan_prefixes, run_scenario, simulation_dir)
+from cemo.checkpoint import Checkpoint
+from cemo.multi import SolveTemplate
+
+
+def test_collect_cfgfiles():
+    '''Assert cfg files are collected from directories and glob patterns'''
+    expected = [Path('tests/MultiBad.cfg'), Path('tests/testConfig.cfg')]
+    assert collect_cfgfiles(['tests']) == expected
+    assert collect_cfgfiles(['tests/*.cfg', 'tests/testConfig.cfg']) == expected
+    assert collect_cfgfiles(['tests/*.dat']) == []
+
+
+def test_solver_threads():
+    '''Assert batch solver threads are passed to cluster and dispatch solver options'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', threads=2)
+    assert multi_sim.dispatch_solver_options == {'threads': 2}
+    assert multi_sim.cluster_solver_options == 'threads=2'
+
+
+def test_run_scenario_failure(tmp_path):
+    '''Assert a failed scenario is reported rather than raised'''
+    row = run_scenario(tmp_path / 'Nofile.cfg')
+    assert row['status'] == 'failed'
+    assert 'FileNotFoundError' in row['error']
+
+
+def test_batch_retries(tmp_path):
+    '''Assert failed scenarios are retried and the batch completes with a status table'''
+    cfgfiles = [tmp_path / 'A.cfg', tmp_path / 'B.cfg']
+    batch = BatchRun(cfgfiles, cores=4, threads=2, retries=2, status=tmp_path / 'status.csv')
+    assert batch.workers == 2
+    table = batch.run()
+    assert list(table.config) == [str(c) for c in cfgfiles]
+    assert (table.status == 'failed').all()
+    assert (table.attempts == 3).all()
+    assert pd.read_csv(tmp_path / 'status.csv').shape == (2, 7)
+
+
+def test_plan_prefixes(tmp_path, sample_cfg):
+    '''Assert scenarios fork from the earlier scenario sharing most years'''
+    base = sample_cfg(tmp_path / 'A.cfg', '[0.023, 0.023, 0.025, 0.026, 0.026, 0.026, 0.026]')
+    late = sample_cfg(tmp_path / 'B.cfg', '[0.023, 0.023, 0.025, 0.026, 0.026, 0.05, 0.1]')
+    early = sample_cfg(tmp_path / 'C.cfg', '[0.023, 0.023, 0.05, 0.05, 0.05, 0.05, 0.05]')
+    same = sample_cfg(tmp_path / 'D.cfg', '[0.023, 0.023, 0.025, 0.026, 0.026, 0.026, 0.026]')
+    plan = plan_prefixes([base, late, early, same, tmp_path / 'Nofile.cfg'])
+    assert plan[base] == Fork(None, [])
+    assert plan[late] == Fork(base, [2020, 2025, 2030, 2035, 2040])
+    assert plan[early] == Fork(base, [2020, 2025])
+    assert plan[same] == Fork(base, [2020, 2025, 2030, 2035, 2040, 2045, 2050])
+    assert plan[tmp_path / 'Nofile.cfg'] == Fork(None, [])
+
+
+def test_plan_prefixes_outputs(tmp_path, sample_cfg):
+    '''Assert scenarios writing different outputs do not share years'''
+    emit = '[0.023, 0.023, 0.025, 0.026, 0.026, 0.026, 0.026]'
+    minimal = sample_cfg(tmp_path / 'A.cfg', emit, advanced='output_profile = minimal\n')
+    full = sample_cfg(tmp_path / 'B.cfg', emit, advanced='output_profile = full\n')
+    single = sample_cfg(tmp_path / 'C.cfg', emit, advanced='output_profile = minimal\n'
+                        'output_layout = single\n')
+    nodual = sample_cfg(tmp_path / 'D.cfg', emit, advanced='output_profile = minimal\n',
+                        solver='duals = none\n')
+    plan = plan_prefixes([minimal, full, single, nodual])
+    assert plan[full] == Fork(None, [])
+    assert plan[single] == Fork(None, [])
+    assert plan[nodual] == Fork(None, [])
+
+
+def test_fork_scenario(tmp_path):
+    '''Assert shared years are copied from parent and later years removed'''
+    parent, sim_dir = tmp_path / 'A', tmp_path / 'B'
+    for year in [2020, 2025]:
+        (parent / str(year)).mkdir(parents=True)
+        (parent / str(year) / 'cap_op').write_text('A')
+        (parent / ('carry_forward%d.pkl' % year)).write_text('A')
+    (sim_dir / '2025').mkdir(parents=True)
+    (sim_dir / '2025' / 'cap_op').write_text('B')
+    Checkpoint(sim_dir, 2020, 'inputs').complete('template')
+    fork_scenario(parent, sim_dir, [2020], [2020, 2025])
+    assert (sim_dir / '2020' / 'cap_op').read_text() == 'A'
+    assert (sim_dir / 'carry_forward2020.pkl').exists()
+    assert not (sim_dir / '2025').exists()
+    assert not (sim_dir / 'carry_forward2025.pkl').exists()
+    assert not (sim_dir / 'checkpoint2020.json').exists()
+
+
+def fake_run_scenario(cfgfile, checkpoint=False, **kwargs):
+    '''Stand in for run_scenario recording start and end times. Scenario A saves its
+    first two years and keeps solving'''
+    start = time.time()
+    if cfgfile.stem == 'A':
+        simulation_dir(cfgfile).mkdir()
+        for year in [2020, 2025]:
+            Checkpoint(simulation_dir(cfgfile), year,
+                       input_fingerprint(cfgfile)).complete('output')
+        time.sleep(3)
+    return {'config': str(cfgfile), 'status': 'ok', 'start': start, 'end': time.time()}
+
+
+def test_batch_release_forks(tmp_path, monkeypatch, sample_cfg):
+    '''Assert forking scenarios start once the shared years are saved, not when the
+    scenario they fork from finishes'''
+    base = sample_cfg(tmp_path / 'A.cfg', '[0.023, 0.023, 0.025, 0.026, 0.026, 0.026, 0.026]')
+    early = sample_cfg(tmp_path / 'B.cfg', '[0.023, 0.023, 0.05, 0.05, 0.05, 0.05, 0.05]')
+    monkeypatch.setattr(cemo.batch, 'run_scenario', fake_run_scenario)
+    monkeypatch.setattr(BatchRun, 'POLL', 0.1)
+    batch = BatchRun([base, early], cores=2, status=tmp_path / 'status.csv', checkpoint=True,
+                     share_prefix=True)
+    table = batch.run().set_index('config')
+    assert batch.forks[early] == Fork(base, [2020, 2025])
+    assert table.start[str(early)] < table.end[str(base)]
@@ -0,0 +1,62 @@
+'''Test suite for cluster benchmark module'''
+import numpy as np
+import pytest
+
+import cemo.cluster
+from cemo.benchmark import ClusterBenchmark
+
+
+@pytest.fixture(scope="module")
+def bench():
+    '''Benchmark sweep on sample demand data'''
+    bench = ClusterBenchmark(cemo.cluster.CSVCluster(max_d=6),
+                             max_d=[3, 6, 9],
+                             methods=['average', 'complete'])
+    bench.run()
+    return bench
+
+
+def test_benchmark_table(bench):
+    '''Assert benchmark produces one row per setting with valid measures'''
+    assert len(bench.table) == 6
+    for col in ['time', 'peak_mem', 'within_error', 'energy_error', 'peak_error',
+                'duration_rmse']:
+        assert (bench.table[col] >= 0).all()
+    assert (bench.table.within_error <= 1).all()
+
+
+def test_benchmark_plot_data(bench):
+    '''Assert plot data is indexed by cluster number'''
+    data = bench.plot_data()
+    assert list(data.index) == [3, 6, 9]
+    assert ('duration_rmse', 'complete', 'cityblock') in data.columns
+
+
+def test_benchmark_select(bench):
+    '''Assert smallest cluster count is selected within tolerance'''
+    assert bench.select(1).max_d == 3
+    assert bench.select(-1) is None
+
+
+def test_cluster_error():
+    '''Assert cluster error is a ratio that falls with more clusters'''
+    cluster = cemo.cluster.CSVCluster(max_d=6)
+    error6 = cluster.cluster_error()
+    cluster.clusterset(30)
+    assert 0 < error6 < 1
+    assert cluster.cluster_error() < error6
+
+
+def test_benchmark_stress_periods(trace_instance):
+    '''Assert benchmarked instance clusters include the stress weeks appended in simulations'''
+    cluster = cemo.cluster.InstanceCluster(trace_instance, max_d=6)
+    bench = ClusterBenchmark(cluster, max_d=[6])
+    bench.run()
+    assert cluster.max_d == 8
+    assert len(cluster.Xcluster) == 8
+    assert str(cluster.Xcluster['date'][7])[:10] == cluster.system_peak_week()
+    peak = np.datetime64(cluster.system_peak_week())
+    start = np.flatnonzero(cluster.TIME == peak)[0]
+    assert np.allclose(cluster.observation(cluster.Xcluster['date'][7]),
+                       cluster.region_demand[:, start:start + 168].ravel())
+    assert bench.table.energy_error[0] < 0.1
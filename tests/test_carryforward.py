@@ -0,0 +1,114 @@
+'''Test suite for carry forward module'''
+import pytest
+from pyomo.environ import (AbstractModel, ConcreteModel, Constraint, DataPortal,
+                           Param, Set, Var)
+
+import cemo.cluster
+from cemo.carryforward import CarryForward, carry_value, predict_capacity
+
+
+@pytest.fixture
+def carry_forward():
+    '''Carry forward state of a two zone simulation year'''
+    return CarryForward(year=2020,
+                        gen_cap_initial={(1, 2): 1500.125, (9, 4): 1e-5},
+                        stor_cap_initial={(1, 14): 0.0},
+                        hyb_cap_initial={},
+                        intercon_cap_initial={(1, 9): 1/3},
+                        cost_cap_carry_forward_sim={1: 123456789.0123, 9: 0})
+
+
+def carry_model():
+    '''Small model with the parameters set from carry forward state'''
+    m = AbstractModel()
+    m.zones = Set(initialize=[1, 9])
+    m.gen_cap_initial = Param([(1, 2), (9, 4)], default=0)
+    m.stor_cap_initial = Param([(1, 14)], default=0)
+    m.hyb_cap_initial = Param([(1, 13)], default=7)
+    m.intercon_cap_initial = Param([(1, 9)], default=0)
+    m.cost_cap_carry_forward_sim = Param(m.zones, default=0)
+    return m
+
+
+def test_carry_value():
+    '''Assert small negative values due to solver tolerance are caught'''
+    assert carry_value(-1e-7, 1e-3) == 0
+    assert carry_value(-1e-5) == -1e-5
+    assert carry_value(1500, 1e-3) == pytest.approx(1.5)
+
+
+def test_carry_forward_data_portal(carry_forward):
+    '''Assert carried forward state initialises an instance'''
+    m = carry_model()
+    inst = m.create_instance(carry_forward.update(DataPortal(model=m)))
+    assert inst.gen_cap_initial[1, 2] == 1500.125
+    assert inst.intercon_cap_initial[1, 9] == 1/3
+    assert inst.hyb_cap_initial[1, 13] == 7
+    assert inst.cost_cap_carry_forward_sim[1] == 123456789.0123
+
+
+def test_carry_forward_data_commands(carry_forward, tmp_path):
+    '''Assert data commands reproduce carried forward values exactly'''
+    with open(tmp_path / 'cf.dat', 'w') as f:
+        f.write(carry_forward.data_commands())
+    inst = carry_model().create_instance(str(tmp_path / 'cf.dat'))
+    assert inst.gen_cap_initial[9, 4] == 1e-5
+    assert inst.intercon_cap_initial[1, 9] == 1/3
+    assert inst.cost_cap_carry_forward_sim[1] == 123456789.0123
+
+
+def test_carry_forward_dump(carry_forward, tmp_path):
+    '''Assert carry forward state is saved and loaded to resume'''
+    carry_forward.dump(tmp_path / 'carry_forward2020.pkl')
+    assert CarryForward.load(tmp_path / 'carry_forward2020.pkl') == carry_forward
+
+
+def test_carry_forward_cluster_files(carry_forward, model_options_fixture):
+    '''Assert cluster member data files include carried forward values'''
+    clus = cemo.cluster.CSVCluster(max_d=6)
+    test_cluster = cemo.cluster.ClusterRun(
+        clus, 'tests/CNEM.template', model_options_fixture, carry_forward=carry_forward)
+    test_cluster._gen_dat_files()
+    with open(test_cluster.tmpdir + '/S5.dat') as source:
+        assert source.read().endswith(carry_forward.data_commands())
+
+
+def test_carry_forward_difference(carry_forward):
+    '''Assert difference is relative to values of other state'''
+    assert carry_forward.difference(carry_forward) == 0
+    other = carry_forward._replace(gen_cap_initial={(1, 2): 1500.125 * 1.01, (9, 4): 1e-5})
+    assert other.difference(carry_forward) == pytest.approx(0.01)
+    other = carry_forward._replace(gen_cap_initial={(1, 2): 1500.125, (9, 4): 0.5})
+    assert other.difference(carry_forward) == pytest.approx(0.5 - 1e-5)
+
+
+def test_predict_capacity():
+    '''Assert operating capacity is solved from fixed capacity decisions'''
+    m = ConcreteModel()
+    for name in ['gen', 'stor', 'hyb', 'intercon']:
+        setattr(m, name + '_cap_new', Var([(1, 2)], bounds=(100, 100)))
+        setattr(m, name + '_cap_op', Var([(1, 2)]))
+    m.gen_cap_ret = Var([(1, 2)], bounds=(0, None))
+    m.gen_cap_ret[1, 2].value = 40
+    m.con_gen_cap = Constraint([(1, 2)], rule=lambda m, z, n: 1e-3 * m.gen_cap_op[z, n]
+                               == 1.5 + 1e-3 * m.gen_cap_new[z, n] - 1e-3 * m.gen_cap_ret[z, n])
+    m.con_stor_cap = Constraint([(1, 2)], rule=lambda m, z, n: 1e-3 * m.stor_cap_op[z, n]
+                                == 0.25 + 1e-3 * m.stor_cap_new[z, n])
+    m.con_hyb_cap = Constraint([(1, 2)], rule=lambda m, z, n: 1e-3 * m.hyb_cap_op[z, n] == 0)
+    m.con_intercon_cap = Constraint([(1, 2)], rule=lambda m, z, n: 1e-3 * m.intercon_cap_op[z, n]
+                                    == 1 + 1e-3 * m.intercon_cap_new[z, n])
+    predict_capacity(m)
+    assert m.gen_cap_op[1, 2].value == pytest.approx(1560)
+    assert m.stor_cap_op[1, 2].value == pytest.approx(350)
+    assert m.hyb_cap_op[1, 2].value == pytest.approx(0)
+    assert m.intercon_cap_op[1, 2].value == pytest.approx(1100)
+
+
+def test_carry_forward_from_json():
+    '''Assert carry forward state is read from JSON files of earlier simulations'''
+    state = CarryForward.from_json('tests/jsoncarryfwd_test.json', 2020)
+    assert state.year == 2020
+    assert state.stor_cap_initial[9, 15] == 1188.7568
+    assert state.intercon_cap_initial[9, 10] == 8907.0
+    assert state.cost_cap_carry_forward_sim[9] == 333424463.63592917
+    assert len(state.gen_cap_initial) == 20
@@ -0,0 +1,83 @@
+'''Test suite for checkpoint module'''
+import json
+import shutil
+
+import pytest
+
+from cemo.carryforward import CarryForward
+from cemo.checkpoint import Checkpoint, fingerprint
+from cemo.multi import SolveTemplate
+
+
+def test_fingerprint(tmp_path):
+    '''Assert fingerprint changes with file contents'''
+    cfg = tmp_path / 'a.cfg'
+    cfg.write_text('one')
+    first = fingerprint([cfg, tmp_path / 'missing.csv'])
+    assert first == fingerprint([cfg, tmp_path / 'missing.csv'])
+    cfg.write_text('two')
+    assert first != fingerprint([cfg, tmp_path / 'missing.csv'])
+
+
+def test_checkpoint_phases(tmp_path):
+    '''Assert completed phases and saved objects survive a restart'''
+    ckpt = Checkpoint(tmp_path, 2030, 'abc')
+    assert not ckpt.exists
+    ckpt.complete('template', file='Sim2030.dat')
+    ckpt.dump('cluster', {'gen_cap_new[1,2]': {'solution': 3.0}})
+    ckpt.complete('cluster')
+    resumed = Checkpoint(tmp_path, 2030, 'abc')
+    assert resumed.exists
+    assert resumed.done('cluster') and not resumed.done('dispatch')
+    assert resumed.info('template')['file'] == 'Sim2030.dat'
+    assert resumed.load('cluster')['gen_cap_new[1,2]']['solution'] == 3.0
+    changed = Checkpoint(tmp_path, 2030, 'def')
+    assert changed.stale and not changed.exists and not changed.done('template')
+    changed.clear()
+    assert not (tmp_path / 'checkpoint2030.json').exists()
+    assert not (tmp_path / 'checkpoint2030').exists()
+
+
+def test_checkpoint_no_save(tmp_path):
+    '''Assert checkpoints are not written unless requested'''
+    ckpt = Checkpoint(tmp_path, 2030, 'abc', save=False)
+    ckpt.complete('template', file='Sim2030.dat')
+    ckpt.dump('instance', [1])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_resume_completed_years(tmp_path):
+    '''Assert resumed simulation skips years whose checkpoints are complete'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', wrkdir=tmp_path, resume=True)
+    inputs = fingerprint(multi_sim.input_files())
+    for year in multi_sim.Years:
+        Checkpoint(tmp_path, year, inputs).complete('output')
+    multi_sim.solve()
+    with open(tmp_path / 'testConfig_meta.json') as meta:
+        assert json.load(meta)['meta']['Years'] == multi_sim.Years
+
+
+def test_resume_dispatch_checkpoint(tmp_path):
+    '''Assert a year resumed after dispatch is saved from its checkpointed carry forward
+    state and output snapshot, without the model instance'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', wrkdir=tmp_path, resume=True)
+    ckpt = Checkpoint(tmp_path, 2025, 'abc')
+    ckpt.complete('template', file='Sim2025.dat')
+    solved = (CarryForward(2025, {(1, 2): 1500.0}, {}, {}, {}, {1: 1e6}), {'snapshot': 1})
+    ckpt.dump('dispatch', solved)
+    ckpt.complete('dispatch')
+    saved = []
+    multi_sim.save_year = lambda *args, **kwargs: saved.append(args)
+    multi_sim.solve_year(2025, Checkpoint(tmp_path, 2025, 'abc'))
+    assert saved == [(2025,) + solved]
+    assert not (tmp_path / 'checkpoint2025' / 'instance.pkl').exists()
+
+
+def test_resume_legacy_carry_forward(tmp_path):
+    '''Assert resumed simulations read the carry forward JSON of earlier versions'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', wrkdir=tmp_path, resume=True)
+    with pytest.raises(FileNotFoundError, match='openCEM'):
+        multi_sim.previous_carry_forward(2025)
+    shutil.copy('tests/jsoncarryfwd_test.json', str(tmp_path / 'gen_cap_op2020.json'))
+    state = multi_sim.previous_carry_forward(2025)
+    assert state.year == 2020 and state.intercon_cap_initial[9, 10] == 8907.0
@@ -3,10 +3,16 @@
 from difflib import SequenceMatcher
 
 import datetime
+import json
+import os
+import pickle
+import subprocess
+import numpy as np
+import pandas as pd
 import pytest
 
 import cemo.cluster
-from cemo.cluster import next_weekday, prev_weekday
+from cemo.cluster import circular_moving_average, next_weekday, prev_weekday
 from cemo.utils import plotcluster
 
 
@@ -72,6 +78,66 @@ def test_cluster_gen_ref_model(model_options_fixture):
     assert sequence.ratio() >= 1
 
 
+class FakeRunef:
+    '''Stand in for runef writing a solution in its working directory'''
+
+    def __init__(self):
+        self.cwd = None
+
+    def __call__(self, cmd, cwd=None, stdout=None):
+        self.cwd = cwd
+        with open(os.path.join(cwd or '.', 'ef_solution.json'), 'w') as f:
+            json.dump({'node solutions': {'Root': {'variables': {'gen_cap_new': {}}}}}, f)
+        return subprocess.CompletedProcess(cmd, 0)
+
+
+def test_cluster_run_solution_dir(model_options_fixture, tmp_path, monkeypatch):
+    '''Assert runef runs in its own directory and its solution is moved from there'''
+    (tmp_path / 'Sim2020.dat').write_text('')
+    test_cluster = cemo.cluster.ClusterRun(
+        None, str(tmp_path / 'Sim2020.dat'), model_options_fixture)
+    for method in ['_gen_dat_files', '_gen_scen_struct', '_gen_ref_model']:
+        monkeypatch.setattr(test_cluster, method, lambda: None)
+    runef = FakeRunef()
+    monkeypatch.setattr(cemo.cluster.subprocess, 'run', runef)
+    monkeypatch.chdir(tmp_path)
+    test_cluster.run_cluster()
+    assert runef.cwd == test_cluster.tmpdir
+    assert not (tmp_path / 'ef_solution.json').exists()
+    assert (tmp_path / 'ef_sol2020.json').exists()
+    assert test_cluster.data == {'gen_cap_new': {}}
+
+
+def test_circular_moving_average():
+    '''Assert moving average matches boxcar rolling mean of wrap padded series'''
+    data = np.random.rand(500)
+    for width in [6, 7, 168]:
+        half = int(width / 2)
+        ref = pd.Series(np.pad(data, (half, half), 'wrap')).rolling(
+            width, center=True, win_type='boxcar').mean()[half:-half].values
+        assert np.allclose(circular_moving_average(data, width), ref)
+
+
+def test_instance_cluster_stress_weeks(trace_instance):
+    '''Assert extreme weeks match the moving average of the stress index definitions'''
+    cluster = cemo.cluster.InstanceCluster(trace_instance, max_d=6)
+    time = pd.DatetimeIndex(list(trace_instance.t))
+    demand = np.array([[trace_instance.region_net_demand[r, t] for t in trace_instance.t]
+                       for r in [1, 2]])
+    wind = np.array([[trace_instance.gen_cap_factor[z, n, t].value for t in trace_instance.t]
+                     for z, n in [(1, 11), (2, 12)]])
+    wind[1] += [trace_instance.hyb_cap_factor[3, 13, t].value for t in trace_instance.t]
+    ratio = (wind / np.maximum(demand, 100)).sum(axis=0) * demand.max()
+    winter = pd.Series(circular_moving_average(ratio, 168), index=time)
+    winter = winter[~time.month.isin([11, 12, 1, 2])]
+    assert cluster.dunkelflaute_week() == str(winter.idxmin() - np.timedelta64(3, 'D'))[:10]
+    peak = pd.Series(circular_moving_average(demand.sum(axis=0), 168), index=time)
+    assert cluster.system_peak_week() == str(peak.idxmax() - np.timedelta64(3, 'D'))[:10]
+    assert list(cluster.stress_index.columns) == ['dunkelflaute', 'peak']
+    assert cluster.max_d == 8
+    assert cluster.X.shape == (cluster.periods, 2 * 168)
+
+
 def test_cluster_next_weekday():
     '''assert next_weekday works as intended'''
     assert next_weekday(datetime.date(2019, 4, 2), 2) == datetime.date(2019, 4, 3)
@@ -130,3 +196,104 @@ def test_plot_cluster(inst_lite):
     cluster = cemo.cluster.InstanceCluster(inst_lite, max_d=6)
     plt = plotcluster(cluster, row=2, col=3, ylim=(0, 14000))
     assert plt.gcf().number == 1
+
+
+def test_adaptive_cluster_threshold():
+    '''Assert adaptive mode picks smallest cluster number within error threshold'''
+    cluster = cemo.cluster.CSVCluster(max_d=12, error_threshold=0.7)
+    assert cluster.max_d == 6
+    assert cluster.selection['error'] <= 0.7
+    cluster = cemo.cluster.CSVCluster(max_d=4, error_threshold=0.1)
+    assert cluster.max_d == 4
+
+
+def test_adaptive_cluster_budget():
+    '''Assert adaptive mode picks largest cluster number within time budget'''
+    cluster = cemo.cluster.CSVCluster(max_d=12, time_budget=100, period_solve_time=10)
+    assert cluster.max_d == 10
+    assert cluster.selection['estimated_time'] == 100
+    cluster = cemo.cluster.CSVCluster(max_d=12, error_threshold=0.5,
+                                      time_budget=50, period_solve_time=10)
+    assert cluster.max_d == 5
+
+
+def test_daily_cluster_chronology():
+    '''Assert daily clusters map every day of the year to a representative day'''
+    cluster = cemo.cluster.CSVCluster(max_d=8, daily=True)
+    assert cluster.periods == 366
+    assert cluster.X.shape == (366, 5 * 48)
+    assert len(cluster.chronology) == 366
+    cluster.append_to_cluster('2020-01-10')
+    weights = np.bincount(cluster.chronology)[1:] / cluster.periods
+    assert weights == pytest.approx(cluster.Xcluster.weight.values)
+    assert cluster.chronology[cluster.Xcluster.week.iloc[-1] - 1] == cluster.max_d
+
+
+def test_append_same_date_once():
+    '''Assert a date appended twice (e.g. dunkelflaute and peak day) is added once'''
+    cluster = cemo.cluster.CSVCluster(max_d=8, daily=True)
+    cluster.append_to_cluster('2020-01-10')
+    cluster.append_to_cluster('2020-01-10')
+    assert cluster.max_d == 9 and len(cluster.Xcluster) == 9
+    assert (cluster.Xcluster.weight > 0).all()
+    weights = np.bincount(cluster.chronology)[1:] / cluster.periods
+    assert weights == pytest.approx(cluster.Xcluster.weight.values)
+
+
+def test_daily_cluster_run_files(model_options_fixture):
+    '''Assert daily clusters generate chronology data and chronological reference model'''
+    clus = cemo.cluster.CSVCluster(max_d=6, daily=True)
+    test_cluster = cemo.cluster.ClusterRun(
+        clus, 'tests/CNEM.template', model_options_fixture)
+    test_cluster._gen_dat_files()
+    test_cluster._gen_scen_struct()
+    test_cluster._gen_ref_model()
+    with open(test_cluster.tmpdir + '/S2.dat') as source:
+        scenario = source.read()
+    assert "'2020-01-28 00:00:00' AND '2020-01-28 23:59:59'" in scenario
+    assert 'param rep := 2;' in scenario
+    with open(test_cluster.tmpdir + '/ScenarioStructure.dat') as source:
+        assert 'stor_level_inter[*,*,*] hyb_level_inter[*,*,*];' in source.read()
+    with open(test_cluster.tmpdir + '/ReferenceModel.py') as source:
+        assert 'create_model(chrono=True)' in source.read()
+
+
+class ScaledCSVCluster(cemo.cluster.CSVCluster):
+    '''CSV cluster with demand rescaled and perturbed, as a later investment period'''
+
+    def __init__(self, scale, noise, **kwargs):
+        self.scale = scale
+        self.noise = noise
+        cemo.cluster.CSVCluster.__init__(self, **kwargs)
+
+    def _data_query(self, region):
+        df = cemo.cluster.CSVCluster._data_query(self, region)
+        rand = np.random.RandomState(region).rand(*df.shape)
+        return df * self.scale + self.noise * rand * df.values.mean()
+
+
+@pytest.mark.parametrize("noise,reuse", [
+    (0, 'match'),
+    (0.02, 'resemble'),
+    (2, None),
+])
+def test_incremental_cluster(noise, reuse):
+    '''Assert previous partition is reused for rescaled profiles'''
+    previous = cemo.cluster.CSVCluster(max_d=6)
+    cluster = ScaledCSVCluster(1.3, noise, max_d=6, previous=previous)
+    assert cluster.reuse == reuse
+    if reuse == 'match':
+        assert (cluster.cluster == previous.cluster).all()
+        assert cluster.Xcluster.weight.values == pytest.approx(previous.Xcluster.weight.values)
+    assert cluster.Xcluster.weight.sum() == pytest.approx(1)
+
+
+def test_instance_cluster_pickle(trace_instance):
+    '''Assert instance clusters pickle without their instance and are reused once loaded'''
+    cluster = cemo.cluster.InstanceCluster(trace_instance, max_d=6)
+    loaded = pickle.loads(pickle.dumps(cluster))
+    assert loaded.regions == [1, 2]
+    assert loaded.zones_per_region == {1: [1], 2: [2, 3]}
+    assert len(pickle.dumps(cluster)) < len(pickle.dumps(trace_instance))
+    reused = cemo.cluster.InstanceCluster(trace_instance, max_d=6, previous=loaded)
+    assert reused.reuse == 'match'
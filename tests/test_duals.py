@@ -0,0 +1,88 @@
+'''Test suite for duals module'''
+import os
+
+import pytest
+from pyomo.environ import ConcreteModel, Constraint, Objective, Set, Var
+from pyomo.opt import SolverResults, SolverStatus
+
+from cemo.duals import load_results, parse_duals
+from cemo.model import CreateModel, model_options
+from cemo.results import Results
+
+
+def con_balance(model, zone, time):
+    '''Balance constraint of test model'''
+    return model.x[zone, time] == zone
+
+
+def con_other(model):
+    '''Constraint whose duals are not imported'''
+    return model.x[1, 'a'] + model.x[2, 'a'] >= 1
+
+
+@pytest.fixture
+def solved(tmp_path):
+    '''Model and solver results with a dual for each constraint row'''
+    m = ConcreteModel()
+    m.t = Set(initialize=['b', 'a'], ordered=True)
+    m.x = Var([1, 2], m.t, bounds=(0, 5))
+    m.ldbal = Constraint([1, 2], m.t, rule=con_balance)
+    m.other = Constraint(rule=con_other)
+    m.obj = Objective(expr=sum(m.x.values()))
+    _, smap_id = m.write(os.path.join(str(tmp_path), 'test.lp'),
+                         io_options={'symbolic_solver_labels': False})
+    smap = m.solutions.symbol_map[smap_id]
+    results = SolverResults()
+    results.solver.status = SolverStatus.ok
+    soln = results.solution.add()
+    for i in m.x:
+        soln.variable[smap.byObject[id(m.x[i])]] = {'Value': float(i[0])}
+    for i in m.ldbal:
+        soln.constraint['c_e_%s_' % smap.byObject[id(m.ldbal[i])]] = {'Dual': 10.0 * i[0]}
+    soln.constraint['c_l_%s_' % smap.byObject[id(m.other)]] = {'Dual': 1.0}
+    results._smap_id = smap_id
+    return m, results
+
+
+def test_load_results(solved):
+    '''Variables are loaded and duals imported only for the listed constraints'''
+    m, results = solved
+    load_results(m, results, ['ldbal'])
+    assert [m.x[i].value for i in m.x] == [1, 1, 2, 2]
+    frame = Results(m).dual('ldbal', ['zone', 'time'])
+    assert frame.index() == list(m.ldbal.keys())
+    assert frame.sum(['zone']) == {1: 20.0, 2: 40.0}
+    assert Results(m).has_dual('ldbal')
+    assert not Results(m).has_dual('other')
+
+
+def test_load_results_no_duals(solved):
+    '''Variables are loaded without importing duals'''
+    m, results = solved
+    load_results(m, results, [])
+    assert m.x[2, 'a'].value == 2
+    assert not Results(m).has_dual('ldbal')
+
+
+@pytest.mark.parametrize("option,duals", [
+    ('ldbal', ['ldbal']),
+    ('ldbal, con_uns', ['ldbal', 'con_uns']),
+    ('all', None),
+    ('none', []),
+    ('', []),
+])
+def test_parse_duals(option, duals):
+    '''Assert dual import options are parsed'''
+    assert parse_duals(option) == duals
+
+
+def test_parse_duals_bad():
+    '''Assert all and none cannot be combined with constraint names'''
+    with pytest.raises(ValueError):
+        parse_duals('all, ldbal')
+
+
+def test_model_dual_suffix():
+    '''Dual suffix is only declared when importing all duals'''
+    assert hasattr(CreateModel('test', model_options()).create_model(), 'dual')
+    assert not hasattr(CreateModel('test', model_options(), ['ldbal']).create_model(), 'dual')
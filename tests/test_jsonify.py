@@ -1,9 +1,14 @@
 '''Test suite for jsonify module'''
 
+import io
 import json
+import shutil
 
-from cemo.jsonify import (json_readr, json_readr_meta, json_readr_year,
-                          jsoninit, jsonify, json_carry_forward_cap, jsonopcap0)
+from cemo.jsonify import (build_json_index, dataset_components, json_readr, json_readr_component,
+                          json_readr_meta, json_readr_year, json_snapshot, json_stream, jsoninit,
+                          jsonify, json_carry_forward_cap, jsonopcap0, objective_value,
+                          save_json_index)
+from cemo.results import Results
 
 
 def sort_func(item):
@@ -77,6 +82,27 @@ def test_jsonify_sol(solution):
                 data2['2020'][bunch])
 
 
+def test_json_stream(solution):
+    '''Assert that streamed JSON output matches dumped jsonify output'''
+    out = io.StringIO()
+    json_stream(solution, '2020', out)
+    assert out.getvalue() == json.dumps(jsonify(solution, '2020'))
+    out = io.StringIO()
+    json_stream(solution, '2020', out, {'cap_op', 'srmc'})
+    data = json.loads(out.getvalue())['2020']
+    assert data['sets'] == {} and list(data['duals']) == ['srmc']
+    assert sorted(data['vars']) == ['gen_cap_op', 'hyb_cap_op', 'stor_cap_op']
+
+
+def test_json_stream_snapshot(solution):
+    '''Assert JSON output written from a results snapshot matches that of the instance'''
+    results = Results(solution)
+    snapshot = results.snapshot(objective=objective_value(solution, results), **json_snapshot())
+    out = io.StringIO()
+    json_stream(None, '2020', out, results=snapshot)
+    assert out.getvalue() == json.dumps(jsonify(solution, '2020'))
+
+
 def test_json_readr():
     '''Assert that a one per line openCEM JSON file reads as a conventional dictionary'''
     with open('tests/test_reading.json') as known:
@@ -100,3 +126,39 @@ def test_json_readr_year():
     assert {
         "2025": full_data['2025']
     } == json_readr_year('tests/test_reader_one_per_line.json', 2025)
+
+
+def test_dataset_components():
+    '''Assert JSON components of output datasets are variables, parameters and duals'''
+    assert dataset_components({'disp', 'srmc', 'misc'}) >= {
+        'gen_disp', 'hyb_disp', 'stor_disp', 'srmc', 'cost_unserved'}
+    assert 'gen_cap_factor' not in dataset_components({'disp', 'srmc', 'misc'})
+
+
+def test_json_index(tmp_path):
+    '''Assert that indexed openCEM JSON files read the same as without index'''
+    filename = tmp_path / 'run.json'
+    shutil.copy('tests/test_reader_one_per_line.json', str(filename))
+    meta = json_readr_meta(filename)
+    year = json_readr_year(filename, 2025)
+    build_json_index(filename)
+    assert json_readr_meta(filename) == meta
+    assert json_readr_year(filename, 2025) == year
+    group = next(iter(year['2025']))
+    name = next(iter(year['2025'][group]))
+    assert json_readr_component(filename, 2025, group, name) == year['2025'][group][name]
+
+
+def test_json_index_components(tmp_path):
+    '''Assert that components of years are read from their indexed offsets'''
+    filename = tmp_path / 'run.json'
+    meta = json.dumps({'meta': {'Years': [2020]}})
+    year = json.dumps({'2020': {'vars': {'gen_cap_op': [{'index': [1, 2], 'value': 3.5}]}}})
+    with open(filename, 'w') as out:
+        out.write(meta + '\n' + year + '\n')
+    start = year.index('[{')
+    save_json_index(filename, [[0, len(meta)], [len(meta) + 1, len(year)]], [2020],
+                    {2020: {'vars': {'gen_cap_op': [start, year.index('}]') + 2 - start]}}})
+    assert json_readr_component(filename, 2020, 'vars', 'gen_cap_op') == [
+        {'index': [1, 2], 'value': 3.5}]
+    assert json_readr_year(filename, 2020) == json.loads(year)
@@ -1,4 +1,5 @@
 '''Unit test suite for multi.py module (multi year simulations)'''
+from concurrent.futures import Future, ProcessPoolExecutor
 import filecmp
 from difflib import SequenceMatcher
 import json
@@ -6,7 +7,12 @@ import tempfile
 from pathlib import Path
 import pytest
 
-from cemo.multi import SolveTemplate, sql_tech_pairs, sql_list, roundup, parse_solver_options
+from cemo.carryforward import CarryForward
+from cemo.checkpoint import Checkpoint
+from cemo.multi import (SolveTemplate, SpeculativeYear, parse_portfolio, parse_solver_options,
+                        roundup, sql_list, sql_tech_pairs)
+from cemo.portfolio import SolverConfig
+from cemo.profiles import save_profile
 
 
 @pytest.mark.parametrize(
@@ -153,3 +159,130 @@ def test_multi_get_model_options(year, value):
 def test_parse_solver_options(value, result):
     '''Test behaviour of sql_tech_pairs'''
     assert parse_solver_options(value) == result
+
+
+def test_multi_output_pipeline(tmp_path):
+    '''Assert queued outputs are bounded, checkpointed and errors raised at the end'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', wrkdir=tmp_path, pipeline=True,
+                              checkpoint=True)
+    multi_sim._output_pool = ProcessPoolExecutor(max_workers=1)
+    ckpts = [Checkpoint(tmp_path, year, 'abc') for year in [2020, 2025, 2030]]
+    multi_sim._queue_output(ckpts[0], len, [1, 2])
+    multi_sim._queue_output(ckpts[1], json.loads, '{bad json')
+    multi_sim._queue_output(ckpts[2], len, [1])
+    assert len(multi_sim._output) <= multi_sim.OUTPUT_QUEUE
+    multi_sim._drain_output()
+    multi_sim._output_pool.shutdown()
+    assert ckpts[0].done('output') and ckpts[2].done('output')
+    assert not ckpts[1].done('output')
+    assert isinstance(multi_sim._output_errors[0], json.JSONDecodeError)
+
+
+def test_multi_accept_speculative(tmp_path):
+    '''Assert speculative solutions are accepted if carry forward is within tolerance,
+    taking on what the speculative solve learnt about clusters and solvers'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', wrkdir=tmp_path, speculative=True)
+    multi_sim.cluster_incremental = True
+    actual = CarryForward(2020, {(1, 2): 1500.0}, {}, {}, {}, {1: 1e6})
+    multi_sim._carry_forward = actual
+    spec = SpeculativeYear(actual._replace(year=2025), {'snapshot': 1},
+                           {'gen_cap_new[1,2]': {'solution': 10}},
+                           {'gen_cap_new': {(1, 2): 10}}, {'clusters': 4}, 'clusters', 2.5,
+                           {'dispatch': 'glpk'})
+    for predicted, accepted in [(actual, True),
+                                (actual._replace(gen_cap_initial={(1, 2): 1500.1}), True),
+                                (actual._replace(gen_cap_initial={(1, 2): 1600.0}), False)]:
+        future = Future()
+        future.set_result(spec)
+        multi_sim._speculation[2025] = (predicted, future)
+        assert (multi_sim.accept_speculative(2025) is spec) == accepted
+    assert multi_sim.cluster_selection == {2025: {'clusters': 4}}
+    assert multi_sim.portfolio_wins['dispatch'] == {2025: 'glpk'}
+    assert multi_sim._prev_cluster == 'clusters'
+    assert multi_sim.cluster_period_solve_time == 2.5
+    # rejected solution warm starts the solve of the year
+    assert multi_sim._prev_solution['gen_cap_new'] == {(1, 2): 10}
+    assert 2025 not in multi_sim._speculation
+
+
+def test_parse_portfolio():
+    '''Assert solver portfolio is parsed into solver configurations'''
+    assert parse_portfolio('cbc threads=2 ratio=0.001; glpk;') == [
+        SolverConfig('cbc', {'threads': 2, 'ratio': 0.001}), SolverConfig('glpk', {})]
+
+
+def test_portfolio_order():
+    '''Assert portfolio configurations that won more often are raced first'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg')
+    assert multi_sim.portfolio_order('dispatch') is None
+    multi_sim.portfolio = parse_portfolio('cbc; glpk; highs')
+    multi_sim.portfolio_size = 2
+    multi_sim.portfolio_wins['dispatch'] = {2020: 'highs', 2025: 'glpk', 2030: 'highs'}
+    assert [c.solver for c in multi_sim.portfolio_order('dispatch')] == ['highs', 'glpk']
+    assert [c.solver for c in multi_sim.portfolio_order('cluster')] == ['cbc', 'glpk']
+
+
+def test_multi_duals(tmp_path, sample_cfg):
+    '''Assert duals of load balance are imported unless configured otherwise'''
+    cfg = sample_cfg(tmp_path / 'duals.cfg')
+    assert SolveTemplate(cfgfile=cfg, wrkdir=tmp_path).duals == ['ldbal']
+    cfg = sample_cfg(tmp_path / 'duals.cfg', solver='duals = all\n')
+    assert SolveTemplate(cfgfile=cfg, wrkdir=tmp_path).duals is None
+
+
+def test_multi_solution_reader(tmp_path, sample_cfg):
+    '''Assert the solution reader is opt in and requires a list of duals'''
+    cfg = sample_cfg(tmp_path / 'reader.cfg', solver='solution_reader = yes\n')
+    assert SolveTemplate(cfgfile=cfg, wrkdir=tmp_path).solution_reader
+    cfg = sample_cfg(tmp_path / 'reader.cfg', solver='solution_reader = yes\nduals = all\n')
+    with pytest.raises(ValueError):
+        SolveTemplate(cfgfile=cfg, wrkdir=tmp_path)
+
+
+def test_multi_solver_profile(tmp_path, sample_cfg):
+    '''Assert stage solver options come from a named profile unless set explicitly'''
+    save_profile(tmp_path / 'profiles.json', 'cbc', 'tuned', ['cluster', 'dispatch'],
+                 {'threads': 2, 'ratio': 0.001})
+    solver = 'profile = tuned\nprofile_file = profiles.json\n'
+    cfg = sample_cfg(tmp_path / 'profile.cfg', solver=solver)
+    multi_sim = SolveTemplate(cfgfile=cfg, wrkdir=tmp_path)
+    assert multi_sim.cluster_solver_options == 'threads=2 ratio=0.001'
+    assert multi_sim.dispatch_solver_options == {'threads': 2, 'ratio': 0.001}
+    cfg = sample_cfg(tmp_path / 'profile.cfg',
+                     solver=solver + 'dispatch_solver_options = threads=1\n')
+    multi_sim = SolveTemplate(cfgfile=cfg, wrkdir=tmp_path)
+    assert multi_sim.dispatch_solver_options == {'threads': 1}
+
+
+def test_multi_accepted_speculative_checkpoint(tmp_path):
+    '''Assert an accepted speculative year is checkpointed and saved from its solution'''
+    multi_sim = SolveTemplate(cfgfile='tests/testConfig.cfg', wrkdir=tmp_path, speculative=True,
+                              checkpoint=True)
+    actual = CarryForward(2020, {(1, 2): 1500.0}, {}, {}, {}, {1: 1e6})
+    multi_sim._carry_forward = actual
+    spec = SpeculativeYear(actual._replace(year=2025), {'snapshot': 1},
+                           {'gen_cap_new[1,2]': {'solution': 10}}, {}, {'clusters': 4}, None,
+                           None, {})
+    future = Future()
+    future.set_result(spec)
+    multi_sim._speculation[2025] = (actual, future)
+    saved = []
+    multi_sim.save_year = lambda *args, **kwargs: saved.append(args)
+    multi_sim.solve_year(2025, Checkpoint(tmp_path, 2025, 'abc'))
+    assert saved == [(2025, spec.carry_forward, spec.snapshot)]
+    ckpt = Checkpoint(tmp_path, 2025, 'abc')
+    assert ckpt.load('cluster') == spec.capacity
+    assert ckpt.info('cluster')['selection'] == {'clusters': 4}
+    assert ckpt.load('dispatch') == (spec.carry_forward, spec.snapshot)
+
+
+def test_multi_cluster_time_budget(tmp_path, sample_cfg):
+    '''Assert a cluster time budget requires an initial solve time per cluster'''
+    advanced = 'cluster_time_budget = 600\n'
+    cfg = sample_cfg(tmp_path / 'budget.cfg', advanced=advanced)
+    with pytest.raises(ValueError):
+        SolveTemplate(cfgfile=cfg, wrkdir=tmp_path)
+    cfg = sample_cfg(tmp_path / 'budget.cfg',
+                     advanced=advanced + 'cluster_period_solve_time = 30\n')
+    multi_sim = SolveTemplate(cfgfile=cfg, wrkdir=tmp_path)
+    assert multi_sim.cluster_time_budget == 600
@@ -1,7 +1,10 @@
 """Test suite for parquetify module"""
 import pandas as pd
-from cemo.parquetify import parquetify
-from cemo.summary import Summary
+from pyomo.environ import ConcreteModel, Param, Set, Var
+from cemo.parquetify import (consolidate, output_datasets, parquet_snapshot, parquetify,
+                             read_dataset, remove_datasets)
+from cemo.results import Results
+from cemo.summary import Summary, ZoneSummary
 import pytest
 import shutil
 
@@ -23,3 +26,104 @@ def test_parquetify(solution):
     assert srmc.srmc.min() == pytest.approx(460.13092)
     assert gen_cap_op.query('tech==18 & zone==16').cap_op.values[0] == pytest.approx(2280)
     assert cdu.loc[2022, 16, 18].cap_op == pytest.approx(2280)
+
+
+def test_parquetify_typed(tmp_path):
+    """Test that datasets are written with typed columns and partitioned by zone and tech"""
+    m = ConcreteModel()
+    m.t = Set(initialize=['2020-01-01 00:00:00', '2020-01-01 01:00:00'], ordered=True)
+    m.gen_disp = Var([(1, 2), (3, 4)], m.t, initialize=2.5)
+    m.gen_cap_op = Var([(1, 2), (3, 4)], initialize=1000)
+    m.gen_cap_ret = Var([(1, 2)])
+    m.cost_gen_fom = Param([2, 4], initialize={2: 1.5, 4: 3})
+    m.cost_unserved = Param(initialize=960)
+    parquetify(m, tmp_path, 2022)
+    disp = pd.read_parquet(tmp_path / '2022' / 'disp')
+    cap_op = pd.read_parquet(tmp_path / '2022' / 'cap_op')
+    assert sorted((tmp_path / '2022' / 'disp').glob('zone=*/tech=*'))[0].name == 'tech=2'
+    assert len(disp) == 4
+    assert disp.time.iloc[0] == '2020-01-01 00:00:00'
+    assert disp.disp.sum() == pytest.approx(10)
+    assert cap_op.tech.dtype == 'int16'
+    assert cap_op.query('zone==3').cap_op.values[0] == pytest.approx(1)
+    assert pd.read_parquet(tmp_path / '2022' / 'cap_ret').cap_ret.isna().all()
+    assert pd.read_parquet(tmp_path / '2022' / 'opex_fom').opex_fom.sum() == pytest.approx(4.5)
+
+
+@pytest.fixture
+def results():
+    """Instance with dispatch and carry forward costs of two zones"""
+    m = ConcreteModel()
+    m.t = Set(initialize=['2020-01-01 00:00:00', '2020-01-01 01:00:00'], ordered=True)
+    m.gen_disp = Var([(9, 2), (1, 2), (1, 4)], m.t, initialize=lambda m, z, n, t: z * n)
+    m.cost_cap_carry_forward = Param([1, 9], initialize={1: 10.0, 9: 20.0})
+    m.cost_unserved = Param(initialize=960)
+    return m
+
+
+def test_consolidated_layout(results, tmp_path):
+    """Test that consolidated datasets read back as partitioned ones, pruned by filters"""
+    parquetify(results, tmp_path / 'part', 2022)
+    parquetify(results, tmp_path / 'cons', 2022, layout='consolidated')
+    assert (tmp_path / 'cons' / '2022' / 'disp.parquet').is_file()
+    part = read_dataset(tmp_path / 'part', 2022, 'disp')
+    cons = read_dataset(tmp_path / 'cons', 2022, 'disp')
+    assert list(cons.zone) == [1, 1, 1, 1, 9, 9]
+    assert cons.disp.sum() == pytest.approx(part.disp.sum())
+    for path in [tmp_path / 'part', tmp_path / 'cons']:
+        disp = read_dataset(path, 2022, 'disp', [('zone', '=', 1), ('tech', 'in', [4])])
+        assert list(disp.disp) == [4, 4]
+    with pytest.raises(ValueError):
+        parquetify(results, tmp_path, 2022, layout='nolayout')
+
+
+def test_consolidate(results, tmp_path):
+    """Test that partitioned results are converted and summarised as before"""
+    parquetify(results, tmp_path, 2022)
+    before = ZoneSummary(tmp_path, [2022], cache=False, save=False).get_summary()
+    converted = consolidate(tmp_path)
+    assert sorted(p.name for p in converted) == ['cost_cap_carry_forward', 'disp']
+    assert not (tmp_path / '2022' / 'disp').exists()
+    assert read_dataset(tmp_path, 2022, 'disp').zone.dtype == 'int16'
+    after = ZoneSummary(tmp_path, [2022], cache=False, save=False).get_summary()
+    assert after.cost_cap_carry_forward.sum() == pytest.approx(
+        before.cost_cap_carry_forward.sum())
+
+
+def test_parquetify_workers(results, tmp_path):
+    """Test that datasets written by a thread pool match those written sequentially"""
+    timings = parquetify(results, tmp_path / 'seq', 2022)
+    assert parquetify(results, tmp_path / 'par', 2022, workers=3).keys() == timings.keys()
+    assert sorted(timings) == ['cost_cap_carry_forward', 'disp', 'misc']
+    for key in timings:
+        pd.testing.assert_frame_equal(read_dataset(tmp_path / 'seq', 2022, key),
+                                      read_dataset(tmp_path / 'par', 2022, key))
+
+
+def test_output_datasets():
+    """Test that output profiles and lists of datasets are resolved"""
+    assert output_datasets('full') is None
+    assert 'cap_op' in output_datasets('minimal') and 'disp' not in output_datasets('minimal')
+    assert output_datasets('standard') > output_datasets('minimal')
+    assert output_datasets('disp, cap_op') == {'disp', 'cap_op'}
+    with pytest.raises(ValueError):
+        output_datasets('disp nodataset')
+
+
+def test_parquetify_datasets(results, tmp_path):
+    """Test that only selected datasets are written and that they can be removed"""
+    assert sorted(parquetify(results, tmp_path, 2022, datasets={'disp', 'misc'})) == ['disp',
+                                                                                       'misc']
+    assert not (tmp_path / '2022' / 'cost_cap_carry_forward').exists()
+    remove_datasets(tmp_path, 2022, ['disp', 'misc'])
+    assert list((tmp_path / '2022').iterdir()) == []
+
+
+def test_parquetify_snapshot(results, tmp_path):
+    """Assert datasets written from a results snapshot match those of the instance"""
+    parquetify(results, tmp_path / 'inst', 2022)
+    snapshot = Results(results).snapshot(**parquet_snapshot())
+    parquetify(None, tmp_path / 'snap', 2022, results=snapshot)
+    for key in ['disp', 'cost_cap_carry_forward', 'misc.parquet']:
+        expected = pd.read_parquet(tmp_path / 'inst' / '2022' / key)
+        assert pd.read_parquet(tmp_path / 'snap' / '2022' / key).equals(expected)
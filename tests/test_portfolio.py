@@ -0,0 +1,36 @@
+'''Test suite for solver portfolio module'''
+import sys
+
+from pyomo.environ import ConcreteModel, Constraint, Objective, Var
+
+from cemo.portfolio import SolverConfig, config_label, race_commands, solve_portfolio
+
+
+def test_config_label():
+    '''Assert solver configurations are labelled with solver and options'''
+    assert config_label(SolverConfig('cbc', {'threads': 2})) == 'cbc threads=2'
+    assert config_label(SolverConfig('glpk', {})) == 'glpk'
+
+
+def test_race_commands(tmp_path):
+    '''Assert first successful command wins and slower commands are terminated'''
+    cmds = [[sys.executable, '-c', 'import sys; sys.exit(1)'],
+            [sys.executable, '-c', 'import time; time.sleep(0.5); open("done", "w")'],
+            [sys.executable, '-c', 'import time; time.sleep(30); open("done", "w")']]
+    cwds = []
+    for k in range(3):
+        (tmp_path / str(k)).mkdir()
+        cwds.append(str(tmp_path / str(k)))
+    assert race_commands(cmds, cwds) == 1
+    assert (tmp_path / '1' / 'done').exists()
+    assert not (tmp_path / '2' / 'done').exists()
+    assert race_commands(cmds[:1], cwds[:1]) is None
+
+
+def test_solve_portfolio_no_solver():
+    '''Assert a portfolio without an available solver returns no winner'''
+    m = ConcreteModel()
+    m.x = Var(bounds=(0, 1))
+    m.obj = Objective(expr=m.x)
+    m.con = Constraint(expr=m.x >= 0.5)
+    assert solve_portfolio(m, [SolverConfig('nosolver', {})]) is None
@@ -0,0 +1,35 @@
+'''Test suite for solver option profiles module'''
+import pytest
+
+from cemo.profiles import load_profiles, options_string, save_profile, solver_profile
+
+
+def test_solver_profile_default():
+    '''Assert default profiles keep solver defaults except for single CBC solves'''
+    assert solver_profile('cbc', 'single') == {'threads': 4, 'ratio': 0.0001}
+    assert solver_profile('cbc', 'dispatch') == {}
+    assert solver_profile('glpk', 'single') == {}
+
+
+def test_solver_profile_errors():
+    '''Assert unknown stages and profiles are reported'''
+    with pytest.raises(ValueError):
+        solver_profile('cbc', 'nostage')
+    with pytest.raises(ValueError):
+        solver_profile('cbc', 'dispatch', 'noprofile')
+
+
+def test_save_profile(tmp_path):
+    '''Assert saved profiles are loaded alongside built in profiles'''
+    filename = tmp_path / 'profiles.json'
+    save_profile(filename, 'cbc', 'tuned', ['cluster', 'dispatch'], {'threads': 2})
+    save_profile(filename, 'cbc', 'tuned', ['single'], {'presolve': 'more'})
+    assert solver_profile('cbc', 'dispatch', 'tuned', filename) == {'threads': 2}
+    assert solver_profile('cbc', 'single', 'tuned', filename) == {'presolve': 'more'}
+    assert 'default' in load_profiles(filename)['cbc']
+
+
+def test_options_string():
+    '''Assert options are formatted as key=value pairs'''
+    assert options_string({'threads': 2, 'ratio': 0.001}) == 'threads=2 ratio=0.001'
+    assert options_string({}) == ''
@@ -0,0 +1,103 @@
+"""Test suite for results module"""
+import pickle
+
+import numpy as np
+import pytest
+from pyomo.environ import ConcreteModel, Constraint, Param, Set, Suffix, Var
+
+from cemo.cluster import timeseries_array
+from cemo.results import Results, make_frame
+
+TIME = ['2020-01-01 01:00:00', '2020-01-01 00:00:00', '2020-01-01 02:00:00']
+
+
+@pytest.fixture
+def model():
+    """Small solved-like model with variables, parameters and duals"""
+    m = ConcreteModel()
+    m.t = Set(initialize=TIME, ordered=True)
+    m.regions = Set(initialize=[1, 2])
+    m.zones_per_region = Set(m.regions, initialize={1: [3, 1], 2: [2]})
+    m.gen_disp = Var([(3, 8), (1, 8), (2, 5)], m.t, initialize={
+        (z, n, t): z * 10 + n + i for z, n in [(3, 8), (1, 8), (2, 5)]
+        for i, t in enumerate(TIME)})
+    m.gen_cap_op = Var([(3, 8), (1, 8), (2, 5)], initialize={(3, 8): 1.5, (1, 8): 2})
+    m.cost_gen_fom = Param([8, 5], initialize={8: 1.5, 5: 3})
+    m.x = Var([1, 2], m.t, initialize=1)
+    m.ldbal = Constraint([1, 2], m.t, rule=lambda m, z, t: m.x[z, t] >= 0)
+    m.dual = Suffix(direction=Suffix.IMPORT)
+    for z, t in m.ldbal:
+        m.dual[m.ldbal[z, t]] = z * 100.0
+    return m
+
+
+def test_frame_columns(model):
+    """Index columns are coded with sorted levels, time in instance order"""
+    frame = Results(model).frame('gen_disp', ['zone', 'tech', 'time'])
+    assert frame.columns == ['zone', 'tech', 'time']
+    assert frame.index() == list(model.gen_disp.keys())
+    assert list(frame.levels[0]) == [1, 2, 3]
+    assert list(frame.levels[2]) == TIME
+    assert frame.column('zone', np.int16).dtype == np.int16
+    assert list(frame.values) == [model.gen_disp[i].value for i in model.gen_disp]
+
+
+def test_frame_missing_values(model):
+    """Missing values are NaN and parameters are extracted as variables are"""
+    results = Results(model)
+    cap = results.frame('gen_cap_op')
+    assert np.isnan(cap.values[2])
+    assert results.frame('cost_gen_fom').index() == [8, 5]
+    assert results.frame('gen_disp') is results.frame('gen_disp')
+
+
+def test_frame_sum(model):
+    """Values are summed by index columns and by groups of labels"""
+    results = Results(model)
+    frame = results.frame('gen_disp', ['zone', 'tech', 'time'])
+    assert frame.sum(['tech']) == {8: pytest.approx(3 * 38 + 3 * 18 + 6),
+                                   5: pytest.approx(3 * 25 + 3)}
+    assert frame.sum(['zone'], {'zone': results.region_of_zone()}) == {
+        1: pytest.approx(3 * 38 + 3 * 18 + 6), 2: pytest.approx(3 * 25 + 3)}
+    assert frame.sum() == {None: pytest.approx(frame.values.sum())}
+    assert frame.sum(['zone', 'tech'])[(2, 5)] == pytest.approx(3 * 25 + 3)
+
+
+def test_frame_timeseries(model):
+    """Timeseries match timeseries_array of the component values"""
+    keys, array = Results(model).frame('gen_disp').timeseries()
+    ekeys, earray = timeseries_array(model.gen_disp.extract_values(), model.t)
+    assert keys == ekeys
+    assert np.array_equal(array, earray)
+
+
+def test_dual_frame(model):
+    """Duals of a constraint are extracted into a frame"""
+    frame = Results(model).dual('ldbal', ['zone', 'time'])
+    assert frame.index() == list(model.ldbal.keys())
+    assert frame.sum(['zone']) == {1: 300.0, 2: 600.0}
+
+
+def test_make_frame_empty():
+    """Empty components give empty frames"""
+    frame = make_frame([], [])
+    assert frame.size == 0
+    assert frame.index() == []
+    assert frame.timeseries()[0] == []
+
+
+def test_snapshot(model):
+    """Snapshots keep the extracted components only and pickle without the instance"""
+    results = Results(model)
+    snapshot = pickle.loads(pickle.dumps(results.snapshot(
+        frames=['gen_disp', 'unserved'], duals=['ldbal'], values=['cost_gen_fom'],
+        members=['regions', 'zones_per_region'], objective=12.5)))
+    assert snapshot.instance is None and snapshot.objective == 12.5
+    assert snapshot.frame('gen_disp').index() == results.frame('gen_disp').index()
+    assert np.array_equal(snapshot.dual('ldbal').values, results.dual('ldbal').values)
+    assert snapshot.values('cost_gen_fom') == {8: 1.5, 5: 3}
+    assert snapshot.members('regions') == [1, 2]
+    assert snapshot.region_of_zone() == results.region_of_zone() == {3: 1, 1: 1, 2: 2}
+    assert snapshot.has('gen_disp') and snapshot.has('regions')
+    assert not snapshot.has('unserved') and not snapshot.has('gen_cap_op')
+    assert snapshot.has_dual('ldbal') and not snapshot.has_dual('other')
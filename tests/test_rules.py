@@ -1,10 +1,10 @@
 '''Test suite to check model rules and initialisers'''
 
 import pytest
-from pyomo.environ import value
+from pyomo.environ import ConcreteModel, Constraint, Param, Set, Var, value
 
 from cemo.initialisers import init_zone_demand_factors
-from cemo.rules import con_caplim, con_maxcap, con_gen_cap, dispatch
+from cemo.rules import con_caplim, con_maxcap, con_gen_cap, con_stor_level_inter, dispatch
 from cemo.const import ZONE_DEMAND_PCT
 
 
@@ -61,3 +61,23 @@ def test_dispatch(solution, region):
 def test_zone_factor(zone, time, result):
     '''Assert initialiser returns correct factor for zone demand proportioning'''
     assert result == pytest.approx(init_zone_demand_factors(None, zone, time))
+
+
+def test_con_stor_level_inter():
+    '''Assert storage chronology only links days represented by scenario'''
+    m = ConcreteModel()
+    m.t = Set(initialize=['2020-01-01 00:00:00', '2020-01-01 01:00:00'], ordered=True)
+    m.days = Set(initialize=[1, 2, 3], ordered=True)
+    m.day_rep = Param(m.days, initialize={1: 1, 2: 2, 3: 1})
+    m.rep = Param(initialize=1)
+    m.stor_level = Var([(1, 14)], m.t, initialize=5)
+    m.stor_level_start = Var([(1, 14)], initialize=2)
+    m.stor_level_inter = Var([(1, 14)], m.days, initialize={(1, 14, 1): 1, (1, 14, 2): 4,
+                                                            (1, 14, 3): 0})
+    assert con_stor_level_inter(m, 1, 14, 2) is Constraint.Skip
+    # Level at start of day 2 is level at start of day 1 plus net charge in rep day
+    assert value(con_stor_level_inter(m, 1, 14, 1))
+    # Last day wraps to first day
+    assert not value(con_stor_level_inter(m, 1, 14, 3))
+    m.stor_level_inter[1, 14, 3] = -2
+    assert value(con_stor_level_inter(m, 1, 14, 3))
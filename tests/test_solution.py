@@ -0,0 +1,89 @@
+'''Test suite for solution module'''
+import os
+
+import numpy as np
+import pytest
+from pyomo.environ import ConcreteModel, Constraint, Objective, Set, Var
+
+from cemo.results import Results
+from cemo.solution import load_solution, read_solution, solver_command
+
+
+def con_balance(model, zone, time):
+    '''Balance constraint of test model'''
+    return model.gen_disp[zone, 8, time] == zone
+
+
+def con_cap(model, zone):
+    '''Capacity constraint of test model'''
+    return model.gen_cap_op[zone, 8] >= 1
+
+
+@pytest.fixture
+def written(tmp_path):
+    '''Model written as an LP file and a CBC solution file of it'''
+    m = ConcreteModel()
+    m.t = Set(initialize=['b', 'a'], ordered=True)
+    m.gen_disp = Var([(1, 8), (2, 8)], m.t)
+    m.gen_cap_op = Var([(1, 8), (2, 8)])
+    m.gen_cap_new = Var([(1, 8), (2, 8)])
+    m.gen_cap_new[2, 8].fix(7)
+    m.ldbal = Constraint([1, 2], m.t, rule=con_balance)
+    m.con_gen_cap = Constraint([1, 2], rule=con_cap)
+    m.obj = Objective(expr=sum(m.gen_disp.values()) + sum(m.gen_cap_op.values())
+                      + m.gen_cap_new[1, 8])
+    _, smap_id = m.write(os.path.join(str(tmp_path), 'test.lp'),
+                         io_options={'symbolic_solver_labels': False})
+    smap = m.solutions.symbol_map[smap_id]
+    rows = ['c_e_%s_ %s %s' % (smap.byObject[id(m.ldbal[i])], i[0], 10.0 * i[0])
+            for i in m.ldbal]
+    rows += ['c_l_%s_ 1 1' % smap.byObject[id(m.con_gen_cap[i])] for i in m.con_gen_cap]
+    cols = ['%s %s 0' % (smap.byObject[id(m.gen_disp[i])], i[0]) for i in m.gen_disp]
+    cols += ['%s %s 0' % (smap.byObject[id(m.gen_cap_op[i])], 100.0 * i[0])
+             for i in m.gen_cap_op]
+    cols += ['** %s -1e-9 0' % smap.byObject[id(m.gen_cap_new[1, 8])]]
+    solfile = tmp_path / 'test.soln'
+    with open(solfile, 'w') as f:
+        f.write('Optimal - objective value 206.00000000\n')
+        for number, line in enumerate(rows):
+            f.write('%7d %s\n' % (number, line))
+        for number, line in enumerate(cols):
+            f.write('%7d %s\n' % (number, line))
+    return m, smap, solfile
+
+
+def test_read_solution(written):
+    '''Column values and row duals are indexed by LP label number'''
+    m, smap, solfile = written
+    status, primal, dual = read_solution(solfile)
+    assert status.startswith('Optimal')
+    number = int(smap.byObject[id(m.gen_cap_op[2, 8])][1:])
+    assert primal[number] == 200
+    number = int(smap.byObject[id(m.ldbal[2, 'a'])][1:])
+    assert dual[number] == 20
+
+
+def test_load_solution(written):
+    '''Only capacity variables are set in the instance, all values are kept as frames'''
+    m, smap, solfile = written
+    _, primal, dual = read_solution(solfile)
+    load_solution(m, smap, primal, dual, ['ldbal'])
+    assert m.gen_cap_op[2, 8].value == 200
+    assert m.gen_cap_new[1, 8].value == pytest.approx(0, abs=1e-6)
+    assert m.gen_cap_new[2, 8].value == 7
+    assert m.gen_disp[1, 8, 'a'].value is None
+    results = Results(m)
+    assert results.solution_read
+    disp = results.frame('gen_disp', ['zone', 'tech', 'time'])
+    assert disp.index() == list(m.gen_disp.keys())
+    assert disp.sum(['zone']) == {1: 2.0, 2: 4.0}
+    assert list(results.frame('gen_cap_new').values) == pytest.approx([0, 7], abs=1e-6)
+    assert np.array_equal(results.dual('ldbal').values, [10, 10, 20, 20])
+    assert not results.has_dual('con_gen_cap')
+
+
+def test_solver_command():
+    '''Options with values precede the problem and actions follow it'''
+    cmd = solver_command('cbc', 'a.lp', 'a.soln', {'threads': 2, 'primalS': ''})
+    assert cmd == ['cbc', '-threads', '2', '-printingOptions', 'all', '-import', 'a.lp',
+                   '-primalS', '-stat=1', '-solve', '-solu', 'a.soln']
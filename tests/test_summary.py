@@ -0,0 +1,33 @@
+"""Test suite for summary module"""
+import pandas as pd
+import pytest
+
+from cemo.summary import ZoneSummary
+
+
+@pytest.fixture
+def carry_forward(tmp_path):
+    '''Carry forward costs for two years saved as parquet results'''
+    for year in [2020, 2025]:
+        (tmp_path / str(year)).mkdir()
+        pd.DataFrame({'zone': [1, 9], 'cost_cap_carry_forward': [year * 1.0, year * 2.0]}
+                     ).to_parquet(tmp_path / str(year) / 'cost_cap_carry_forward')
+    return tmp_path
+
+
+def test_partial_summary(carry_forward):
+    '''Assert summary assembled from partial summaries matches full summary'''
+    full = ZoneSummary(carry_forward, [2020, 2025], cache=False, save=False).get_summary()
+    part = ZoneSummary(carry_forward, [2020, 2025], partial=True).get_summary()
+    assert (carry_forward / '2020' / 'zone_summary.parquet').exists()
+    pd.testing.assert_frame_equal(part, full.reset_index(drop=True), check_like=True)
+
+
+def test_partial_summary_cached(carry_forward):
+    '''Assert saved partial summaries are reused instead of processing results again'''
+    ZoneSummary(carry_forward, [2020], partial=True)
+    pd.DataFrame({'zone': [1], 'cost_cap_carry_forward': [0.0]}
+                 ).to_parquet(carry_forward / '2020' / 'cost_cap_carry_forward')
+    part = ZoneSummary(carry_forward, [2020, 2025], partial=True).get_summary()
+    assert part[part.year == 2020].cost_cap_carry_forward.sum() == pytest.approx(3 * 2020)
+    assert len(part[part.year == 2025]) == 2
@@ -1,10 +1,83 @@
 '''Test suite for utils module'''
+import random
+import re
+
 import pytest
+from pyomo.environ import DataPortal, Var, value
 
-from cemo.utils import printstats
+import cemo.rules
+from cemo.model import CreateModel, model_options
+from cemo.results import Results
+from cemo.utils import (_cost_components, _dispatch, _emissions, _time_totals, check_arg,
+                        printstats)
 from cemo.rules import region_in_zone
 
 
+@pytest.fixture(scope="module")
+def priced_instance(tmp_path_factory):
+    '''CTV_trans instance with the costs it queries from MySQL set in memory instead,
+    exogenous capacity and arbitrary variable values'''
+    with open('tests/CTV_trans.dat') as f:
+        dat = re.sub(r'load "opencem-isp2020[^;]*;', '', f.read())
+    local = tmp_path_factory.mktemp('priced') / 'CTV_local.dat'
+    local.write_text(dat)
+    options = model_options(unslim=True, nem_emit_limit=True, nem_disp_ratio=True,
+                            nem_re_disp_ratio=True, nem_ret_ratio=True, nem_ret_gwh=True,
+                            region_ret_ratio=True)
+    model = CreateModel('CTV_trans', options).create_model()
+    data = DataPortal(model=model)
+    data.load(filename=str(local))
+    zones, techs = [9, 10, 11, 12, 16], range(1, 20)
+    data['build_cost'] = {n: 1000.0 + n for n in techs}
+    data['regional_cost_factor'] = {(z, n): 1 + z / 100 for z in zones for n in techs}
+    data['connection_cost'] = {(z, n): 10.0 * n for z in zones for n in techs}
+    data['cost_emit'] = {None: 25.0}
+    data['gen_cap_exo'] = {(9, 7): 0.2}
+    data['stor_cap_exo'] = {(9, 14): 0.1}
+    data['hyb_cap_exo'] = {(10, 13): 0.1}
+    data['ret_gen_cap_exo'] = {(9, 2): 0.3}
+    data['intercon_cap_exo'] = {(9, 10): 0.5}
+    inst = model.create_instance(data)
+    rng = random.Random(3)
+    for var in inst.component_objects(Var):
+        for v in var.values():
+            if not v.fixed:
+                v.value = rng.random() * 100
+    return inst
+
+
+@pytest.mark.parametrize("component,rule", [
+    ('capital', 'cost_capital'),
+    ('repayment', 'cost_repayment'),
+    ('fixed', 'cost_fixed'),
+    ('unserved', 'cost_unserved'),
+    ('operating', 'cost_operating'),
+    ('trans_build', 'cost_trans_build'),
+    ('trans_flow', 'cost_trans_flow'),
+    ('emissions', 'cost_emissions'),
+    ('retirement', 'cost_retirement'),
+    ('total', 'system_cost'),
+])
+def test_cost_components(priced_instance, component, rule):
+    '''Assert printstats cost components match the cemo.rules expressions they mirror'''
+    results = Results(priced_instance)
+    costs = _cost_components(results, _time_totals(results))
+    expected = value(getattr(cemo.rules, rule)(priced_instance))
+    assert expected != 0
+    assert costs[component] == pytest.approx(expected, rel=1e-9)
+
+
+def test_region_totals(priced_instance):
+    '''Assert regional emissions and dispatch match cemo.rules expressions'''
+    results = Results(priced_instance)
+    totals = _time_totals(results)
+    for r in priced_instance.regions:
+        assert _emissions(results, totals, r) == pytest.approx(
+            value(cemo.rules.emissions(priced_instance, r)), rel=1e-9)
+        assert _dispatch(results, totals, r) == pytest.approx(
+            value(cemo.rules.dispatch(priced_instance, r)), rel=1e-9)
+
+
 def test_printstats(request, solution, capfd):
     '''Assert that solution stats printout matches known value'''
     printstats(solution)
@@ -18,6 +91,13 @@ def test_printstats(request, solution, capfd):
     assert captured.out == array
 
 
+def test_check_arg(tmp_path):
+    '''Assert model options are enabled by data commands but not by comments'''
+    (tmp_path / 'Sim.dat').write_text("# nem_ret_ratio not used\nparam nem_emit_limit := 10;\n")
+    assert check_arg(str(tmp_path / 'Sim'), 'nem_emit_limit')
+    assert not check_arg(str(tmp_path / 'Sim'), 'nem_ret_ratio')
+
+
 @pytest.mark.parametrize("zone,result", [
     (6, 1),  # CAN in NSW
     (2, 2),  # CQ in QLD
@@ -0,0 +1,67 @@
+'''Test suite for warm start module'''
+import json
+
+import pytest
+from pyomo.environ import ConcreteModel, Set, Var
+
+import cemo.cluster
+from cemo.warmstart import (CAPACITY_VARS, apply_warm_start, seed_capacity,
+                            solution_snapshot, year_key)
+
+
+def year_instance(year):
+    '''Small instance with capacity and hourly dispatch variables for a year'''
+    m = ConcreteModel()
+    m.t = Set(initialize=['%d-01-01 00:00:00' % year, '%d-01-01 01:00:00' % year], ordered=True)
+    m.gen_cap_new = Var([(1, 2), (1, 4)])
+    m.gen_disp = Var([(1, 2), (1, 4)], m.t)
+    return m
+
+
+def test_year_key():
+    '''Assert timestamps in indices are replaced by time of year'''
+    assert year_key((3, 11, '2030-02-01 13:00:00')) == (3, 11, '02-01 13:00:00')
+    assert year_key((3, 11)) == (3, 11)
+    assert year_key(5) == (5,)
+
+
+def test_apply_warm_start():
+    '''Assert solution of one year is mapped onto instance of another year'''
+    prev = year_instance(2020)
+    prev.gen_cap_new[1, 2].value = 100
+    prev.gen_disp[1, 2, '2020-01-01 01:00:00'].value = 50
+    inst = year_instance(2025)
+    inst.gen_cap_new[1, 4].fix(10)
+    prev.gen_cap_new[1, 4].value = 20
+    assert apply_warm_start(inst, solution_snapshot(prev)) == 2
+    assert inst.gen_cap_new[1, 2].value == 100
+    assert inst.gen_disp[1, 2, '2025-01-01 01:00:00'].value == 50
+    assert inst.gen_disp[1, 2, '2025-01-01 00:00:00'].value is None
+    assert inst.gen_cap_new[1, 4].value == 10
+
+
+def test_seed_capacity(tmp_path):
+    '''Assert capacity decisions from a cluster solution seed initial values'''
+    m = ConcreteModel()
+    for name in CAPACITY_VARS:
+        setattr(m, name, Var([(1, 2), (3, 4)]))
+    data = {'gen_cap_new[1,2]': {'solution': 30.0}, 'gen_cap_ret[3,4]': {'solution': 5.0}}
+    with open(tmp_path / 'seed.json', 'w') as f:
+        json.dump(data, f)
+    seed_capacity(m, tmp_path / 'seed.json')
+    assert m.gen_cap_new[1, 2].value == pytest.approx(30)
+    assert m.gen_cap_ret[3, 4].value == pytest.approx(5)
+    assert m.stor_cap_new[1, 2].value is None
+
+
+def test_seed_ref_model(model_options_fixture):
+    '''Assert seeded cluster run reference model declares the seed'''
+    clus = cemo.cluster.CSVCluster(max_d=6)
+    data = {'gen_cap_new[1,2]': {'solution': 30.0}}
+    test_cluster = cemo.cluster.ClusterRun(
+        clus, 'tests/CNEM.template', model_options_fixture, seed=data)
+    test_cluster._gen_ref_model()
+    with open(test_cluster.tmpdir + '/ReferenceModel.py') as source:
+        assert 'seed_capacity(m, ' in source.read()
+    with open(test_cluster.tmpdir + '/seed.json') as source:
+        assert json.load(source) == data
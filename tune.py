@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""tune.py: Solver option tuning for openCEM"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+
+import argparse
+import json
+
+from cemo.model import CreateModel, model_options
+from cemo.profiles import STAGES, options_string, save_profile, tune
+from cemo.utils import check_arg
+
+# create parser object
+parser = argparse.ArgumentParser(description="openCEM solver option tuning")
+
+parser.add_argument(
+    "name",
+    help="Data command file of a representative instance (e.g. a clustered or short year)."
+    + " Do not include data command file extension `.dat`",
+    type=str,
+    metavar="NAME",
+)
+parser.add_argument(
+    "--solver",
+    help="Specify solver used by model."
+    + " For Pyomo supported solvers installed in your system ",
+    type=str,
+    metavar="SOLVER",
+    default="cbc",
+)
+parser.add_argument(
+    "--grid",
+    help="JSON list of solver option dictionaries to try,"
+    + " default the built in grid of the solver",
+    type=str,
+    metavar="JSON",
+)
+parser.add_argument(
+    "--stages",
+    help="Stages that use the fastest options, default all",
+    type=str,
+    nargs="+",
+    choices=STAGES,
+    default=STAGES,
+)
+parser.add_argument(
+    "--profile",
+    help="Name of profile to save fastest options as, default `tuned`",
+    type=str,
+    metavar="PROFILE",
+    default="tuned",
+)
+parser.add_argument(
+    "--profile-file",
+    help="JSON file to save profile in, default solver_profiles.json",
+    type=str,
+    metavar="FILE",
+    default="solver_profiles.json",
+)
+parser.add_argument(
+    "--log",
+    help="Print solver output",
+    action="store_true",
+)
+
+# parse arguments into args structure
+args = parser.parse_args()
+
+# Enable model options that are set in the data command file (as in ssolve.py)
+options = {}
+for option in model_options()._fields:
+    if check_arg(args.name, option):
+        options.update({option: True})
+model = CreateModel(args.name, model_options(**options)).create_model()
+instance = model.create_instance(args.name + '.dat')
+
+grid = json.loads(args.grid) if args.grid else None
+timings = tune(instance, args.solver, grid, log=args.log)
+for opts, seconds in timings:
+    print("openCEM tune.py: %6.1fs %s" % (seconds, options_string(opts) or 'defaults'))
+if not timings:
+    raise SystemExit("openCEM tune.py: No solver options reached an optimal solution")
+
+save_profile(args.profile_file, args.solver, args.profile, args.stages, timings[0][0])
+print("openCEM tune.py: Saved %s profile %s for %s in %s"
+      % (args.solver, args.profile, ', '.join(args.stages), args.profile_file))